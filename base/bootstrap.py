@@ -0,0 +1,223 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class _InlineExecutor:
+    """在调用线程中依次执行阶段，不创建线程"""
+
+    def submit(self, fn, *args):
+        future = Future()
+        fn(*args)
+        future.set_result(None)
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class Phase:
+    def __init__(self, name: str, fn, depends=(), required: bool = True):
+        """
+        启动阶段
+
+        :param name: 阶段名称
+        :param fn: 无参数的阶段函数
+        :param depends: 依赖的阶段名称，依赖全部成功后才会执行
+        :param required: 为 True 时阶段失败会在启动结束后抛出异常，否则只记录错误并跳过依赖它的阶段
+        """
+        self.name = name
+        self.fn = fn
+        self.depends = tuple(depends)
+        self.required = required
+        self.status = 'pending'  # pending / ok / failed / skipped
+        self.start = None  # 相对启动开始的秒数
+        self.duration = None
+        self.thread = None
+        self.error = None
+
+
+class Bootstrap:
+    """
+    启动阶段管理器。
+
+    每个阶段声明自己依赖的阶段，没有依赖关系的阶段在线程中并行执行。
+    记录每个阶段的开始时间、耗时和执行线程，启动完成后输出启动耗时报告。
+        bootstrap = Bootstrap("project")
+
+        @bootstrap.phase("sql_db", depends=("config",))
+        def init_sql():
+            ...
+
+        bootstrap.run()
+
+    run 只执行尚未执行的阶段，可以先注册并执行一部分阶段，之后再注册其余阶段并再次 run，
+    后注册的阶段可以依赖已经执行过的阶段。
+    模块导入过程中不能启动线程执行阶段：阶段中 from 该模块 import 会等待导入锁，而导入线程在等待阶段完成，
+    此时使用 run(parallel=False) 在导入线程中依次执行，需要并行的阶段放到模块导入完成后执行。
+    """
+
+    def __init__(self, name: str = 'bootstrap', max_workers: int = 4):
+        """
+        :param name: 名称，用于日志
+        :param max_workers: 并行执行阶段的最大线程数
+        """
+        self.name = name
+        self.max_workers = max(max_workers, 1)
+        self.phases = {}
+        self.elapsed = None
+        self._t0 = None
+        self._last_run = []
+
+    def phase(self, name: str, depends=(), required: bool = True):
+        """
+        装饰器，将函数注册为启动阶段，参数含义同 add_phase。
+        """
+        def decorator(fn):
+            self.add_phase(name, fn, depends, required)
+            return fn
+        return decorator
+
+    def add_phase(self, name: str, fn, depends=(), required: bool = True):
+        """
+        注册启动阶段。
+
+        :param name: 阶段名称
+        :param fn: 无参数的阶段函数
+        :param depends: 依赖的阶段名称
+        :param required: 阶段失败时是否终止启动
+        :raises ValueError: 如果阶段已存在
+        """
+        if name in self.phases:
+            raise ValueError(f"Phase '{name}' already exists.")
+        self.phases[name] = Phase(name, fn, depends, required)
+
+    def _check(self):
+        """检查依赖是否存在以及是否有循环依赖"""
+        for phase in self.phases.values():
+            for dep in phase.depends:
+                if dep not in self.phases:
+                    raise ValueError(f"Phase '{phase.name}' depends on unknown phase '{dep}'.")
+        remaining = {name: set(phase.depends) for name, phase in self.phases.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Circular dependency between phases: {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def _execute(self, phase: Phase):
+        phase.thread = threading.current_thread().name
+        start = time.perf_counter()
+        phase.start = start - self._t0
+        try:
+            phase.fn()
+            phase.status = 'ok'
+        except Exception as e:
+            phase.status = 'failed'
+            phase.error = e
+        finally:
+            phase.duration = time.perf_counter() - start
+
+    def run(self, parallel: bool = True):
+        """
+        执行尚未执行的阶段并输出启动耗时报告。
+
+        :param parallel: 为 False 时在调用线程中按依赖顺序依次执行，不创建线程
+        :raises Exception: 必需阶段失败时，抛出该阶段的异常
+        """
+        self._check()
+        self._t0 = time.perf_counter()
+        pending = [name for name, phase in self.phases.items() if phase.status == 'pending']
+        self._last_run = pending
+        # 已经执行过的依赖不再等待
+        remaining = {name: {dep for dep in self.phases[name].depends if self.phases[dep].status == 'pending'}
+                     for name in pending}
+        dependents = {name: [] for name in pending}
+        for name in pending:
+            for dep in remaining[name]:
+                dependents[dep].append(name)
+
+        failed = None
+        ready = []
+        finished = []
+
+        def release(name):
+            child = self.phases[name]
+            blocked = [dep for dep in child.depends if self.phases[dep].status != 'ok']
+            if blocked:
+                # 依赖的阶段失败，跳过该阶段，并继续处理依赖它的阶段
+                child.status = 'skipped'
+                child.error = f"依赖的阶段 {', '.join(blocked)} 未成功"
+                finished.append(child)
+            else:
+                ready.append(name)
+
+        for name, deps in remaining.items():
+            if not deps:
+                release(name)
+        if parallel:
+            executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        else:
+            executor = _InlineExecutor()
+        with executor:
+            running = {}
+            while True:
+                while finished:
+                    phase = finished.pop()
+                    if phase.status == 'failed' and phase.required and failed is None:
+                        failed = phase
+                    for name in dependents[phase.name]:
+                        remaining[name].discard(phase.name)
+                        if not remaining[name]:
+                            release(name)
+                if failed is None:
+                    for name in ready:
+                        running[executor.submit(self._execute, self.phases[name])] = self.phases[name]
+                ready = []
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                finished = [running.pop(future) for future in done]
+        self.elapsed = time.perf_counter() - self._t0
+        self.report()
+        if failed is not None:
+            raise failed.error
+
+    def profile(self) -> list:
+        """
+        获取启动耗时数据。
+
+        :return: 每个阶段的名称、状态、开始时间、耗时（秒）、线程和错误信息组成的列表，按开始时间排序
+        """
+        rows = [{
+            'name': phase.name,
+            'status': phase.status,
+            'start': phase.start,
+            'duration': phase.duration,
+            'thread': phase.thread,
+            'error': None if phase.error is None else str(phase.error),
+        } for phase in self.phases.values()]
+        return sorted(rows, key=lambda row: (row['start'] is None, row['start'] or 0))
+
+    def report(self):
+        """将最近一次 run 执行的阶段的启动耗时报告写入日志"""
+        from project import logger
+        rows = [row for row in self.profile() if row['name'] in self._last_run]
+        busy = sum(row['duration'] or 0 for row in rows)
+        logger.info(f"初始化:{self.name}启动耗时{self.elapsed * 1000:.1f}ms，各阶段累计耗时{busy * 1000:.1f}ms")
+        for row in rows:
+            if row['start'] is None:
+                logger.warning(f"  - {row['name']:<20} {row['status']:<8} {row['error']}")
+                continue
+            line = (f"  - {row['name']:<20} {row['status']:<8} 开始 {row['start'] * 1000:8.1f}ms  "
+                    f"耗时 {row['duration'] * 1000:8.1f}ms  {row['thread']}")
+            if row['error'] is None:
+                logger.info(line)
+            else:
+                logger.error(f"{line}  {row['error']}")
@@ -1,6 +1,7 @@
 # import configparser
 # import os
 import threading
+import time
 from collections import OrderedDict
 
 from project import config
@@ -20,32 +21,121 @@ _cache_lock = threading.Lock()
 
 class SingletonLRUCache:
     def __init__(self, maxsize=maximum_of_results_cached):
+        # 键 -> (值, 过期时间)，过期时间为 None 表示不过期
         self.cache = OrderedDict()
         self.maxsize = maxsize
         self._lock = threading.Lock()
+        # 命中和未命中次数，用于 /metrics 中的命中率
+        self.hits = 0
+        self.misses = 0
 
-    def get(self, key):
+    def get(self, key, default=None):
+        """
+        获取缓存的值，命中时该项成为最新使用的项。
+
+        :param key: 缓存键
+        :param default: 未命中或已过期时的返回值
+        """
         with self._lock:
-            return self.cache.pop(key, None) if key in self.cache else None
+            item = self.cache.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires = item
+            if expires is not None and expires <= time.monotonic():
+                del self.cache[key]
+                self.misses += 1
+                return default
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return value
 
-    def set(self, key, value):
+    def set(self, key, value, ttl: float = None):
+        """
+        存储缓存的值，缓存已满时淘汰最久未使用的项。
+
+        :param key: 缓存键
+        :param value: 值
+        :param ttl: 有效期（秒），默认不过期
+        """
+        expires = time.monotonic() + ttl if ttl is not None else None
         with self._lock:
-            if len(self.cache) >= self.maxsize:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+            elif len(self.cache) >= self.maxsize:
                 self.cache.popitem(last=False)  # 弹出最老的项
-            self.cache[key] = value
+            self.cache[key] = (value, expires)
+
+    def __contains__(self, key):
+        """是否有该键的缓存项（可能已过期），不计入命中次数，也不改变使用顺序"""
+        return key in self.cache
+
+    def resize(self, maxsize):
+        """
+        修改最大缓存数量，缩小时淘汰最久未使用的项。
+
+        :param maxsize: 最大缓存数量
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be greater than 0")
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self.cache) > maxsize:
+                self.cache.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self.cache.pop(key, None)
 
     def clear(self):
         with self._lock:
             self.cache.clear()
 
+    def stats(self) -> dict:
+        """
+        获取缓存的使用情况。
+
+        :return: 包含缓存项数、最大项数、命中次数、未命中次数和命中率的字典
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.cache),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
 # 获取单例缓存实例
 def get_singleton_cache():
     if '_singleton_cache' not in _global_cache:
         with _cache_lock:
             if '_singleton_cache' not in _global_cache:
-                _global_cache['_singleton_cache'] = SingletonLRUCache()
+                _global_cache['_singleton_cache'] = SingletonLRUCache(maximum_of_results_cached)
     return _global_cache['_singleton_cache']
 
+
+def on_config_changed(changes):
+    """
+    config/changed 事件的处理器：[cache] maximum_of_results_cached 修改后调整单例缓存的容量，已有的缓存项保留。
+    调整失败时记录错误日志，不抛出异常，同一事件的其他处理器仍然执行。
+
+    :param changes: {(节, 配置项): (旧值, 新值)}
+    """
+    global maximum_of_results_cached
+    _, maxsize = changes.get(('cache', 'maximum_of_results_cached'), (None, None))
+    if maxsize is None:
+        return
+    maximum_of_results_cached = maxsize
+    singleton = _global_cache.get('_singleton_cache')
+    if singleton is not None:
+        try:
+            singleton.resize(maxsize)
+        except Exception as e:
+            from project import logger
+            logger.error(f"缓存:调整容量失败：{e}")
+
 class Cache:
     # 装饰器函数
     @staticmethod
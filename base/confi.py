@@ -1,8 +1,212 @@
 import configparser
+import os
+import sys
+import threading
+
+CONFIG_FILE = 'config/config.ini'
 
 # 创建ConfigParser对象
 config = configparser.ConfigParser()
 
 # 读取配置文件
-config.read('config/config.ini')
+config.read(CONFIG_FILE)
+
+LOG_LEVELS = ('TRACE', 'DEBUG', 'INFO', 'SUCCESS', 'WARNING', 'ERROR', 'CRITICAL')
+
+
+def _positive_int(value):
+    value = int(value)
+    if value < 1:
+        raise ValueError("必须大于 0")
+    return value
+
+
+def _non_negative_int(value):
+    value = int(value)
+    if value < 0:
+        raise ValueError("不能小于 0")
+    return value
+
+
+def _positive_float(value):
+    value = float(value)
+    if value <= 0:
+        raise ValueError("必须大于 0")
+    return value
+
+
+def _boolean(value):
+    states = configparser.ConfigParser.BOOLEAN_STATES
+    if value.strip().lower() not in states:
+        raise ValueError("必须是 True 或 False")
+    return states[value.strip().lower()]
+
+
+def _log_level(value):
+    value = value.strip().upper()
+    if value not in LOG_LEVELS:
+        raise ValueError(f"必须是 {', '.join(LOG_LEVELS)} 之一")
+    return value
+
+
+# 运行中修改后立即生效的配置项 -> 把字符串转换为值的函数，转换失败时抛出 ValueError。
+# 其他配置项修改后同样会更新到 config 并出现在 config/changed 事件中，但读取它们的模块需要重启才会使用新的值
+LIVE_SCHEMA = {
+    ('thread', 'thread_pool_not_used_cpu_num'): _non_negative_int,
+    ('thread', 'thread_pool_used_cpu_percentage'): _positive_float,
+    ('thread', 'auto_tune'): _boolean,
+    ('thread', 'auto_tune_min_workers'): _positive_int,
+    ('thread', 'auto_tune_max_workers'): _positive_int,
+    ('cache', 'maximum_of_results_cached'): _positive_int,
+    ('logger', 'log_level'): _log_level,
+}
+
+
+def _typed(section, option, value):
+    convert = LIVE_SCHEMA.get((section, option))
+    if convert is None or value is None:
+        return value
+    try:
+        return convert(value)
+    except ValueError as e:
+        raise ValueError(f"[{section}] {option} = {value}: {e}") from None
+
+
+def validate(parser: configparser.ConfigParser) -> dict:
+    """
+    按 LIVE_SCHEMA 检查配置。
+
+    :return: (节, 配置项) -> 转换后的值，只包含 LIVE_SCHEMA 中存在的配置项
+    :raises ValueError: 有配置项的值不正确
+    """
+    values = {}
+    for section, option in LIVE_SCHEMA:
+        if parser.has_option(section, option):
+            values[(section, option)] = _typed(section, option, parser.get(section, option))
+    low = values.get(('thread', 'auto_tune_min_workers'))
+    high = values.get(('thread', 'auto_tune_max_workers'))
+    if low is not None and high is not None and low > high:
+        raise ValueError(f"[thread] auto_tune_min_workers = {low} 大于 auto_tune_max_workers = {high}")
+    return values
+
+
+class ConfigWatcher:
+    """
+    定期检查配置文件的修改时间，文件改变时重新读取并按 LIVE_SCHEMA 检查，
+    检查通过后更新 config，并在 EventManager 上触发 config/changed 事件，参数为
+    {(节, 配置项): (旧值, 新值)}，LIVE_SCHEMA 中的配置项为转换后的值，其他为字符串，删除的配置项新值为 None。
+    检查不通过时记录错误日志，config 保持不变，文件再次修改后重新检查。
+
+        ev.register("config/changed", on_config_changed)
+        config_watcher.start(ev)
+    """
+
+    def __init__(self, config, path=CONFIG_FILE, interval=2.0):
+        """
+        :param config: 要更新的 ConfigParser
+        :param path: 配置文件路径
+        :param interval: 检查的间隔（秒）
+        """
+        self.config = config
+        self.path = path
+        self.interval = interval
+        self.ev = None
+        self._mtime = self._read_mtime()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _read_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def start(self, ev=None):
+        """
+        启动后台检查线程。
+
+        :param ev: 触发 config/changed 事件的 EventManager
+        """
+        if ev is not None:
+            self.ev = ev
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='ConfigWatcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                sys.stderr.write(f"检查配置文件失败 {self.path}: {e}\n")
+
+    def check(self) -> dict:
+        """
+        检查一次配置文件，文件改变时重新读取。
+
+        :return: 生效的修改，{(节, 配置项): (旧值, 新值)}；文件没有改变或检查不通过时为空字典
+        """
+        with self._lock:
+            mtime = self._read_mtime()
+            if mtime is None or mtime == self._mtime:
+                return {}
+            self._mtime = mtime
+            parser = configparser.ConfigParser()
+            try:
+                parser.read(self.path)
+                validate(parser)
+            except (configparser.Error, ValueError) as e:
+                from project import logger
+                logger.error(f"配置文件 {self.path} 有错误，修改没有生效：{e}")
+                return {}
+            changes = {}
+            for section in set(parser.sections()) | set(self.config.sections()):
+                new = dict(parser.items(section, raw=True)) if parser.has_section(section) else {}
+                old = dict(self.config.items(section, raw=True)) if self.config.has_section(section) else {}
+                for option in set(new) | set(old):
+                    if new.get(option) != old.get(option):
+                        try:
+                            old_value = _typed(section, option, old.get(option))
+                        except ValueError:
+                            # 启动时的值本身不正确（读取它的模块使用了默认值），按字符串报告
+                            old_value = old.get(option)
+                        changes[(section, option)] = (old_value, _typed(section, option, new.get(option)))
+            if not changes:
+                return {}
+            for (section, option), (_, value) in changes.items():
+                if value is None:
+                    self.config.remove_option(section, option)
+                    continue
+                if not self.config.has_section(section):
+                    self.config.add_section(section)
+                self.config.set(section, option, parser.get(section, option, raw=True))
+        from project import logger
+        restart = sorted(f"[{s}] {o}" for s, o in changes if (s, o) not in LIVE_SCHEMA)
+        logger.info(f"配置文件已修改：{', '.join(f'[{s}] {o}' for s, o in sorted(changes))}")
+        if restart:
+            logger.warning(f"以下配置项需要重启才能生效：{', '.join(restart)}")
+        if self.ev is not None:
+            self.ev.emit("config/changed", changes)
+        return changes
+
+    def _after_fork_in_child(self):
+        """子进程中后台线程不存在了，重新启动"""
+        running = self._thread is not None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if running:
+            self.start()
+
 
+config_watcher = ConfigWatcher(config)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=config_watcher._after_fork_in_child)
@@ -0,0 +1,338 @@
+"""
+按列存储的数值表，用于指标、时间序列等数值数据。
+
+每一列是一个定长类型的数组，保存为单独的列文件并通过 mmap 读写，数值不再是 Python 对象，
+内存占用约为 TableDB 的十分之一，扫描和聚合直接在列的内存上进行。安装了 NumPy 时列以 numpy 数组返回，
+过滤和聚合使用 NumPy 的向量化运算；否则使用 memoryview 和内置函数。
+
+    table = ColumnTable('database/mul_table_db/cpu.columns', {'ts': 'float64', 'value': 'float32'}, key='ts')
+    table.append({'ts': time.time(), 'value': 0.5})
+    table.extend([(t, v) for t, v in samples])              # 按列的顺序的元组，或字典
+    start, stop = table.key_range(t0, t1)                   # 键列有序，二分查找 t0 <= ts < t1 的行
+    table.aggregate('value', 'mean', low=t0, high=t1)      # sum / min / max / mean / count
+    table.filter('value', '>', 0.9, start, stop)            # 满足条件的行号
+
+表的目录中 meta.json 保存列的定义和行数，<列名>.col 保存列的数据（本机字节序）。
+追加时先写入列文件，再写入 meta.json，中途退出时多写入的数据会被忽略。
+只支持一个进程写入。
+"""
+import bisect
+import json
+import mmap
+import operator
+import os
+import threading
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 列的类型 -> array 的类型码（同时也是 memoryview.cast 的格式）
+COLUMN_TYPES = {
+    'int8': 'b', 'uint8': 'B',
+    'int16': 'h', 'uint16': 'H',
+    'int32': 'i', 'uint32': 'I',
+    'int64': 'q', 'uint64': 'Q',
+    'float32': 'f', 'float64': 'd',
+}
+
+_OPERATORS = {
+    '<': operator.lt, '<=': operator.le,
+    '>': operator.gt, '>=': operator.ge,
+    '==': operator.eq, '!=': operator.ne,
+}
+
+AGGREGATES = ('sum', 'min', 'max', 'mean', 'count')
+
+_META_FILE = 'meta.json'
+# 列文件的最小大小，之后每次容量不足时加倍
+_MIN_CAPACITY_BYTES = 4096
+
+
+class _Column:
+    """一个列文件和它的 mmap"""
+
+    def __init__(self, path, typecode):
+        self.path = path
+        self.typecode = typecode
+        self.itemsize = array(typecode).itemsize
+        exists = os.path.exists(path)
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        size = os.fstat(self.file.fileno()).st_size
+        if size < _MIN_CAPACITY_BYTES:
+            self._resize(_MIN_CAPACITY_BYTES)
+        else:
+            self.mmap = mmap.mmap(self.file.fileno(), size)
+
+    @property
+    def capacity(self) -> int:
+        """能保存的行数"""
+        return len(self.mmap) // self.itemsize
+
+    def _resize(self, size):
+        # 已经返回给调用方的视图仍然引用旧的 mmap，这里不关闭旧的 mmap，由垃圾回收释放
+        if os.name != 'nt':
+            # Windows 上创建更大的 mmap 时会自动扩展文件，而文件被映射时不能 truncate
+            self.file.truncate(size)
+        self.mmap = mmap.mmap(self.file.fileno(), size)
+
+    def reserve(self, rows):
+        """确保至少能保存 rows 行"""
+        if rows > self.capacity:
+            size = len(self.mmap)
+            while size < rows * self.itemsize:
+                size *= 2
+            self._resize(size)
+
+    def write(self, start, values):
+        data = array(self.typecode, values).tobytes()
+        offset = start * self.itemsize
+        self.mmap[offset:offset + len(data)] = data
+
+    def view(self, start, stop):
+        """第 start 到 stop 行的只读视图，不复制数据"""
+        if np is not None:
+            view = np.frombuffer(self.mmap, dtype=self.typecode, count=stop - start, offset=start * self.itemsize)
+            view.flags.writeable = False
+            return view
+        return memoryview(self.mmap)[start * self.itemsize:stop * self.itemsize].cast(self.typecode).toreadonly()
+
+    def close(self):
+        try:
+            self.mmap.close()
+        except BufferError:
+            # 仍有视图引用 mmap，由垃圾回收关闭
+            pass
+        self.file.close()
+
+
+class ColumnTable:
+    """
+    定长类型列组成的表，只能追加。可以指定一列作为键列（例如时间戳），键列的值必须不减，用于按范围查找。
+    """
+
+    def __init__(self, path, columns=None, key=None):
+        """
+        打开或创建表。
+
+        :param path: 表的目录
+        :param columns: 列名 -> 类型（见 COLUMN_TYPES），或 [(列名, 类型), ...]。创建表时必须提供；
+                        打开已有的表时可以省略，提供时必须与已有的定义相同
+        :param key: 键列的列名，值必须不减
+        :raises ValueError: 列的定义不正确或与已有的表不同
+        """
+        self.path = path
+        self.name = os.path.basename(os.path.normpath(path)).rsplit('.', 1)[0]
+        self.lock = threading.RLock()
+        meta_path = os.path.join(path, _META_FILE)
+        if columns is not None:
+            columns = list(columns.items()) if isinstance(columns, dict) else [tuple(c) for c in columns]
+            for name, column_type in columns:
+                if column_type not in COLUMN_TYPES:
+                    raise ValueError(f"列 {name} 的类型 {column_type} 不支持，可用的类型：{', '.join(COLUMN_TYPES)}")
+            if not columns:
+                raise ValueError("至少需要一列")
+            if key is not None and key not in dict(columns):
+                raise ValueError(f"键列 {key} 不在列中")
+        if os.path.exists(meta_path):
+            with open(meta_path, encoding='utf-8') as file:
+                meta = json.load(file)
+            stored = [tuple(c) for c in meta['columns']]
+            if columns is not None and (stored != columns or meta['key'] != key):
+                raise ValueError(f"表 {self.name} 已经存在，列的定义不同：{stored}，键列 {meta['key']}")
+            columns, key, self._rows = stored, meta['key'], meta['rows']
+        elif columns is None:
+            raise ValueError(f"表 {self.name} 不存在，创建时需要提供列的定义")
+        else:
+            os.makedirs(path, exist_ok=True)
+            self._rows = 0
+        self.columns = dict(columns)
+        self.key = key
+        self._columns = {name: _Column(os.path.join(path, f"{name}.col"), COLUMN_TYPES[column_type])
+                         for name, column_type in columns}
+        if not os.path.exists(meta_path):
+            self._save_meta()
+
+    def _save_meta(self):
+        meta_path = os.path.join(self.path, _META_FILE)
+        temp = f"{meta_path}.{os.getpid()}.tmp"
+        with open(temp, 'w', encoding='utf-8') as file:
+            json.dump({'columns': list(self.columns.items()), 'key': self.key, 'rows': self._rows}, file)
+        os.replace(temp, meta_path)
+
+    def __len__(self):
+        return self._rows
+
+    def append(self, row):
+        """
+        追加一行。
+
+        :param row: 列名 -> 值的字典，或按列的顺序的元组
+        """
+        self.extend((row,))
+
+    def extend(self, rows):
+        """
+        追加多行，只写入一次 meta.json。批量追加时比多次调用 append 快得多。
+
+        :param rows: 字典或元组组成的可迭代对象
+        :raises ValueError: 缺少列，或键列的值小于已有的最后一个值
+        """
+        names = list(self.columns)
+        values = {name: [] for name in names}
+        for row in rows:
+            if isinstance(row, dict):
+                try:
+                    row = [row[name] for name in names]
+                except KeyError as e:
+                    raise ValueError(f"缺少列 {e.args[0]}") from None
+            elif len(row) != len(names):
+                raise ValueError(f"需要 {len(names)} 列，得到 {len(row)} 列")
+            for name, value in zip(names, row):
+                values[name].append(value)
+        count = len(values[names[0]])
+        if not count:
+            return
+        with self.lock:
+            if self.key is not None:
+                keys = values[self.key]
+                last = self._columns[self.key].view(self._rows - 1, self._rows)[0] if self._rows else None
+                if any(b < a for a, b in zip(keys, keys[1:])) or (last is not None and keys[0] < last):
+                    raise ValueError(f"键列 {self.key} 的值必须不减")
+            start = self._rows
+            for name, column in self._columns.items():
+                column.reserve(start + count)
+                column.write(start, values[name])
+            self._rows = start + count
+            self._save_meta()
+
+    def column(self, name, start=0, stop=None):
+        """
+        列的只读视图，不复制数据。安装了 NumPy 时为 numpy 数组，否则为 memoryview。
+
+        :param name: 列名
+        :param start: 开始的行
+        :param stop: 结束的行（不包含），默认到最后一行
+        """
+        start, stop = self._bounds(start, stop)
+        return self._columns[name].view(start, stop)
+
+    def row(self, index) -> dict:
+        """第 index 行，列名 -> 值"""
+        index = range(self._rows)[index]
+        return {name: column.view(index, index + 1).tolist()[0] for name, column in self._columns.items()}
+
+    def rows(self, start=0, stop=None) -> list:
+        """第 start 到 stop 行，每行为一个字典"""
+        start, stop = self._bounds(start, stop)
+        data = {name: column.view(start, stop).tolist() for name, column in self._columns.items()}
+        return [dict(zip(data, values)) for values in zip(*data.values())]
+
+    def key_range(self, low=None, high=None):
+        """
+        二分查找键列在 [low, high) 中的行。
+
+        :param low: 最小的键（包含），None 表示不限
+        :param high: 最大的键（不包含），None 表示不限
+        :return: (开始的行, 结束的行)
+        :raises ValueError: 表没有键列
+        """
+        if self.key is None:
+            raise ValueError(f"表 {self.name} 没有键列")
+        keys = self.column(self.key)
+        if np is not None:
+            start = 0 if low is None else int(np.searchsorted(keys, low, 'left'))
+            stop = len(keys) if high is None else int(np.searchsorted(keys, high, 'left'))
+        else:
+            start = 0 if low is None else bisect.bisect_left(keys, low)
+            stop = len(keys) if high is None else bisect.bisect_left(keys, high)
+        return start, max(start, stop)
+
+    def between(self, low=None, high=None, columns=None) -> dict:
+        """
+        键列在 [low, high) 中的行。
+
+        :param columns: 需要的列名，默认全部
+        :return: 列名 -> 列的只读视图
+        """
+        start, stop = self.key_range(low, high)
+        return {name: self.column(name, start, stop) for name in (columns or self.columns)}
+
+    def filter(self, name, op, value, start=0, stop=None, low=None, high=None):
+        """
+        满足条件的行号。
+
+            table.filter('value', '>=', 0.9)
+
+        :param name: 列名
+        :param op: <、<=、>、>=、== 或 !=
+        :param value: 比较的值
+        :param start: 开始的行
+        :param stop: 结束的行（不包含）
+        :param low: 键列的最小值（包含），与 high 一起代替 start 和 stop
+        :param high: 键列的最大值（不包含）
+        :return: 行号，安装了 NumPy 时为 numpy 数组，否则为列表
+        """
+        compare = _OPERATORS[op]
+        start, stop = self._range(start, stop, low, high)
+        data = self._columns[name].view(start, stop)
+        if np is not None:
+            return np.flatnonzero(compare(data, value)) + start
+        return [start + i for i, v in enumerate(data) if compare(v, value)]
+
+    def aggregate(self, name, func, start=0, stop=None, low=None, high=None):
+        """
+        对列的一段行求聚合值。
+
+            table.aggregate('value', 'max', low=t0, high=t1)
+
+        :param name: 列名
+        :param func: sum、min、max、mean 或 count
+        :param start: 开始的行
+        :param stop: 结束的行（不包含）
+        :param low: 键列的最小值（包含），与 high 一起代替 start 和 stop
+        :param high: 键列的最大值（不包含）
+        :return: 聚合值，没有行时 min、max、mean 返回 None
+        """
+        if func not in AGGREGATES:
+            raise ValueError(f"不支持的聚合 {func}，可用的聚合：{', '.join(AGGREGATES)}")
+        start, stop = self._range(start, stop, low, high)
+        count = stop - start
+        if func == 'count':
+            return count
+        data = self._columns[name].view(start, stop)
+        if not count:
+            return 0 if func == 'sum' else None
+        if np is not None:
+            # 整数列求和时使用 64 位，浮点列使用 float64 累加
+            wide = np.float64 if data.dtype.kind == 'f' else None
+            result = {'sum': lambda: data.sum(dtype=wide), 'min': data.min, 'max': data.max,
+                      'mean': lambda: data.mean(dtype=np.float64)}[func]()
+            return result.item()
+        if func == 'mean':
+            return sum(data) / count
+        return {'sum': sum, 'min': min, 'max': max}[func](data)
+
+    def flush(self):
+        """把列文件的修改写入磁盘"""
+        with self.lock:
+            for column in self._columns.values():
+                column.mmap.flush()
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            for column in self._columns.values():
+                column.close()
+
+    def _bounds(self, start, stop):
+        rows = self._rows
+        start, stop, _ = slice(start, stop).indices(rows)
+        return start, max(start, stop)
+
+    def _range(self, start, stop, low, high):
+        if low is not None or high is not None:
+            return self.key_range(low, high)
+        return self._bounds(start, stop)
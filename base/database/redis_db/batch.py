@@ -0,0 +1,231 @@
+"""
+Redis 命令批处理。每条命令单独发送时，网络往返时间占了大部分耗时；把命令合并到一个 pipeline 中只需要一次往返。
+
+自动批处理：多个线程在很短的时间窗口（[redis_db] batch_window_ms）内发出的命令合并为一个 pipeline 发送，
+每条命令返回一个 Future，结果按命令分别设置：
+
+    batcher = om.get("redis_batcher")
+    value = batcher.get("user:1").result()
+
+显式批处理：with 块中发出的命令在块结束时一次发送：
+
+    with redis_batch() as batch:
+        a = batch.get("a")
+        b = batch.incr("counter")
+    print(a.result(), b.result())
+
+大量键的读写使用 mget / mset，按 chunk_size 分块，所有块在同一个 pipeline 中发送。
+"""
+import contextvars
+import os
+import threading
+import weakref
+from concurrent.futures import Future
+from contextlib import contextmanager
+from itertools import islice
+from typing import Iterable, List
+
+from project import config
+
+batch_window = float(config['redis_db'].get('batch_window_ms', fallback=1)) / 1000
+batch_max_commands = int(config['redis_db'].get('batch_max_commands', fallback=512))
+
+# 所有的 RedisBatcher，fork 后在子进程中重置
+_batchers = weakref.WeakSet()
+
+
+def _execute(client, commands: list):
+    """在一个 pipeline 中执行命令，并设置每条命令的 Future"""
+    try:
+        pipe = client.pipeline(transaction=False)
+        for future, name, args, kwargs in commands:
+            getattr(pipe, name)(*args, **kwargs)
+        results = pipe.execute(raise_on_error=False)
+    except Exception as e:
+        for future, *_ in commands:
+            future.set_exception(e)
+        return
+    for (future, *_), result in zip(commands, results):
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+
+class RedisBatcher:
+    def __init__(self, client, window: float = batch_window, max_commands: int = batch_max_commands):
+        """
+        :param client: redis.Redis 客户端（或接口相同的对象）
+        :param window: 自动批处理的时间窗口（秒），收到第一条命令后最多等待这么久再发送
+        :param max_commands: 每个 pipeline 的最大命令数，达到后立即发送
+        """
+        self.client = client
+        self.window = window
+        self.max_commands = max_commands
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        # 当前 with batch() 块收集的命令
+        self._block = contextvars.ContextVar(f'redis_batch_{id(self)}', default=None)
+        _batchers.add(self)
+
+    def call(self, name: str, *args, **kwargs) -> Future:
+        """
+        发出一条命令。
+
+        :param name: 命令方法名，例如 "get"、"set"
+        :return: 命令结果的 Future
+        :raises AttributeError: 如果客户端没有这个命令
+        """
+        if not callable(getattr(self.client, name, None)):
+            raise AttributeError(f"Redis client has no command {name!r}")
+        future = Future()
+        command = (future, name, args, kwargs)
+        block = self._block.get()
+        if block is not None:
+            block.append(command)
+            return future
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("RedisBatcher is closed")
+            self._pending.append(command)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='RedisBatcher', daemon=True)
+                self._thread.start()
+            if len(self._pending) == 1 or len(self._pending) >= self.max_commands:
+                self._cond.notify()
+        return future
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def command(*args, **kwargs) -> Future:
+            return self.call(name, *args, **kwargs)
+        command.__name__ = name
+        return command
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+                # 收到第一条命令后等待一个时间窗口，让其他线程的命令加入同一个 pipeline
+                if len(self._pending) < self.max_commands and not self._closed:
+                    self._cond.wait_for(lambda: len(self._pending) >= self.max_commands or self._closed,
+                                        self.window)
+                commands = self._pending[:self.max_commands]
+                del self._pending[:self.max_commands]
+            _execute(self.client, commands)
+
+    @contextmanager
+    def batch(self):
+        """
+        with 块中（同一线程或同一协程上下文）发出的命令在块结束时一次发送，嵌套的块合并到最外层。
+        块中抛出异常时命令不会发送，Future 被取消。
+        """
+        outer = self._block.get()
+        if outer is not None:
+            yield self
+            return
+        commands = []
+        token = self._block.set(commands)
+        try:
+            yield self
+        except BaseException:
+            for future, *_ in commands:
+                future.cancel()
+            raise
+        finally:
+            self._block.reset(token)
+        for start in range(0, len(commands), self.max_commands):
+            _execute(self.client, commands[start:start + self.max_commands])
+
+    def _after_fork_in_child(self):
+        """子进程中后台线程不存在了，父进程中等待发送的命令由父进程发送，子进程从空的队列开始"""
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def close(self):
+        """发送剩余的命令并停止后台线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def _after_fork_in_child():
+    for batcher in list(_batchers):
+        batcher._after_fork_in_child()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+@contextmanager
+def redis_batch(batcher: RedisBatcher = None):
+    """
+    显式批处理，默认使用 om 中的 redis_batcher。
+
+    :param batcher: 使用的 RedisBatcher
+    """
+    if batcher is None:
+        from project import om
+        batcher = om.get("redis_batcher")
+    with batcher.batch() as batch:
+        yield batch
+
+
+def _chunks(iterable, size: int):
+    if size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def mget(client, keys: Iterable, chunk_size: int = 500) -> List:
+    """
+    批量读取，按 chunk_size 分成多条 MGET，在一次往返中发送。
+
+    :param client: redis.Redis 客户端
+    :param keys: 键
+    :param chunk_size: 每条 MGET 的键数
+    :return: 与 keys 顺序相同的值列表，不存在的键为 None
+    """
+    pipe = client.pipeline(transaction=False)
+    for chunk in _chunks(keys, chunk_size):
+        pipe.mget(chunk)
+    return [value for values in pipe.execute() for value in values]
+
+
+def mset(client, mapping: dict, chunk_size: int = 500, ex: int = None) -> int:
+    """
+    批量写入，按 chunk_size 分成多条 MSET，在一次往返中发送。
+    MSET 不支持过期时间，指定 ex 时每个键使用一条 SET ... EX。
+
+    :param client: redis.Redis 客户端
+    :param mapping: 键 -> 值
+    :param chunk_size: 每条 MSET 的键数
+    :param ex: 过期时间（秒）
+    :return: 写入的键数
+    """
+    pipe = client.pipeline(transaction=False)
+    for chunk in _chunks(mapping.items(), chunk_size):
+        if ex is None:
+            pipe.mset(dict(chunk))
+        else:
+            for key, value in chunk:
+                pipe.set(key, value, ex=ex)
+    pipe.execute()
+    return len(mapping)
+
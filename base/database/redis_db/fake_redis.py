@@ -0,0 +1,173 @@
+"""
+进程内的 Redis 替身，实现常用命令的一个子集，接口与 redis.Redis 相同（返回 bytes）。
+用于没有 Redis 服务时的开发、演示和基准测试：
+
+    from base.database.redis_db.fake_redis import FakeRedis
+    client = FakeRedis(latency=0.0005)  # 每次往返模拟 0.5ms 的网络延迟
+
+pipeline() 中的命令在 execute() 时一次执行，只计一次往返延迟。
+"""
+import threading
+import time
+
+
+def _encode(value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    if isinstance(value, (int, float)):
+        return repr(value).encode('utf-8')
+    raise TypeError(f"Invalid input of type: {type(value).__name__!r}. Convert to a bytes, string, int or float first.")
+
+
+class FakeRedis:
+    def __init__(self, latency: float = 0.0):
+        """
+        :param latency: 每次往返（单个命令或一次 pipeline.execute）模拟的延迟（秒）
+        """
+        self.latency = latency
+        self.round_trips = 0
+        self._data = {}
+        # 键 -> 过期时间（time.monotonic）
+        self._expires = {}
+        self._lock = threading.RLock()
+
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _alive(self, key) -> bool:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def _execute(self, name: str, *args, **kwargs):
+        command = getattr(self, f'_cmd_{name}', None)
+        if command is None:
+            raise AttributeError(f"FakeRedis does not support command: {name}")
+        with self._lock:
+            return command(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if not hasattr(type(self), f'_cmd_{name}'):
+            raise AttributeError(f"FakeRedis does not support command: {name}")
+
+        def command(*args, **kwargs):
+            self._round_trip()
+            return self._execute(name, *args, **kwargs)
+        return command
+
+    def pipeline(self, transaction: bool = True) -> 'FakePipeline':
+        return FakePipeline(self)
+
+    # 命令实现
+    def _cmd_ping(self):
+        return True
+
+    def _cmd_get(self, name):
+        name = _encode(name)
+        return self._data.get(name) if self._alive(name) else None
+
+    def _cmd_set(self, name, value, ex=None, px=None, nx=False, xx=False):
+        name = _encode(name)
+        exists = self._alive(name)
+        if (nx and exists) or (xx and not exists):
+            return None
+        self._data[name] = _encode(value)
+        self._expires.pop(name, None)
+        if ex is not None:
+            self._expires[name] = time.monotonic() + ex
+        elif px is not None:
+            self._expires[name] = time.monotonic() + px / 1000
+        return True
+
+    def _cmd_mget(self, keys, *args):
+        keys = list(keys) if isinstance(keys, (list, tuple)) else [keys]
+        return [self._cmd_get(key) for key in keys + list(args)]
+
+    def _cmd_mset(self, mapping):
+        for key, value in mapping.items():
+            self._cmd_set(key, value)
+        return True
+
+    def _cmd_delete(self, *names):
+        count = 0
+        for name in map(_encode, names):
+            if self._alive(name):
+                del self._data[name]
+                self._expires.pop(name, None)
+                count += 1
+        return count
+
+    def _cmd_exists(self, *names):
+        return sum(1 for name in map(_encode, names) if self._alive(name))
+
+    def _cmd_incr(self, name, amount=1):
+        name = _encode(name)
+        value = int(self._data[name]) + amount if self._alive(name) else amount
+        self._data[name] = _encode(value)
+        return value
+
+    def _cmd_expire(self, name, time_):
+        name = _encode(name)
+        if not self._alive(name):
+            return False
+        self._expires[name] = time.monotonic() + time_
+        return True
+
+    def _cmd_ttl(self, name):
+        name = _encode(name)
+        if not self._alive(name):
+            return -2
+        expires = self._expires.get(name)
+        return -1 if expires is None else max(int(round(expires - time.monotonic())), 0)
+
+    def _cmd_flushdb(self):
+        self._data.clear()
+        self._expires.clear()
+        return True
+
+
+class FakePipeline:
+    def __init__(self, client: FakeRedis):
+        self._client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if not hasattr(FakeRedis, f'_cmd_{name}'):
+            raise AttributeError(f"FakeRedis does not support command: {name}")
+
+        def command(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return command
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._commands.clear()
+
+    def __len__(self):
+        return len(self._commands)
+
+    def execute(self, raise_on_error: bool = True) -> list:
+        commands, self._commands = self._commands, []
+        self._client._round_trip()
+        results = []
+        for name, args, kwargs in commands:
+            try:
+                results.append(self._client._execute(name, *args, **kwargs))
+            except Exception as e:
+                if raise_on_error:
+                    raise
+                results.append(e)
+        return results
@@ -1,8 +1,38 @@
+import asyncio
+
 import redis
+import redis.asyncio
 from redis.connection import ConnectionPool
 
 
 redis_db =None
+async_redis_db = None
+
+
+def _connection_kwargs(config) -> dict:
+    """
+    从配置 [redis_db] 读取连接参数，同步和异步连接池共用。
+    redis-py 的连接池不支持最小空闲连接数和空闲超时，空闲连接由 health_check_interval 在使用前检查。
+    """
+    redis_section = 'redis_db'
+    redis_password = config[redis_section].get('redis_password', fallback=None)
+    # 配置中 '' 表示没有密码
+    if redis_password in ('', "''", '""'):
+        redis_password = None
+    return {
+        'host': config[redis_section]['redis_host'],
+        'port': int(config[redis_section]['redis_port']),
+        'password': redis_password,
+        'db': int(config[redis_section].get('redis_db_index', fallback=0)),  # 默认数据库索引为0
+        'max_connections': int(config[redis_section].get('redis_max_connections', fallback=100)),
+        'socket_connect_timeout': float(config[redis_section].get('redis_connect_timeout', fallback=5)),
+        'socket_timeout': float(config[redis_section].get('redis_socket_timeout', fallback=5)),
+        'socket_keepalive': True,
+        # 连接空闲超过该秒数后，下次使用前先发送 PING 检查
+        'health_check_interval': int(config[redis_section].get('redis_health_check_interval', fallback=30)),
+    }
+
+
 def create_redis_client(config):
     """
     根据提供的配置对象创建并返回一个Redis客户端对象。
@@ -12,32 +42,72 @@ def create_redis_client(config):
     如果配置中use_redis为false，则返回 None
     """
     redis_section = 'redis_db'
-    use_redis = config[redis_section]['use_redis']
+    use_redis = config[redis_section].getboolean('use_redis', fallback=False)
     if not use_redis:
         return None
-    redis_host = config[redis_section]['redis_host']
-    redis_port = int(config[redis_section]['redis_port'])
-    redis_password = config[redis_section].get('redis_password', fallback=None)
-    redis_db_index = int(config[redis_section].get('redis_db_index', fallback=0))  # 默认数据库索引为0
-
-    # 连接池配置
-    max_connections = int(config[redis_section].get('redis_max_connections', fallback=100))
-    min_idle_connections = int(config[redis_section].get('redis_min_idle_connections', fallback=10))
-    socket_connect_timeout = int(config[redis_section].get('redis_connect_timeout', fallback=5))
-    idle_timeout = int(config[redis_section].get('redis_idle_timeout', fallback=300))
-
-    # 创建连接池
-    pool = ConnectionPool(
-        host=redis_host,
-        port=redis_port,
-        password=redis_password,
-        max_connections=max_connections,
-        min_idle_connections=min_idle_connections,
-        socket_connect_timeout=socket_connect_timeout,
-        max_idle_time=idle_timeout,
-    )
+
+    # 创建连接池，数据库索引需要设置在连接池上，传给 redis.Redis 的 db 在指定连接池时不生效
+    pool = ConnectionPool(**_connection_kwargs(config))
     global redis_db
-    # 创建Redis客户端并设置数据库索引
-    redis_db = redis.Redis(connection_pool=pool, db=redis_db_index)
+    # 创建Redis客户端
+    redis_db = redis.Redis(connection_pool=pool)
 
     return redis_db
+
+
+def create_async_redis_client(config):
+    """
+    根据配置创建异步 Redis 客户端（redis.asyncio），供 FastAPI 的异步接口使用。
+    连接池达到 redis_max_connections 时，请求等待空闲连接（最多 redis_pool_timeout 秒），而不是立即报错。
+    连接在第一次使用时才建立，应用启动时由 warm_async_redis 预先建立。
+    客户端绑定到使用它的事件循环，只能在应用的事件循环中使用。
+
+    :param config: 一个包含Redis配置信息的configparser.ConfigParser对象。
+    :return: redis.asyncio.Redis 客户端，如果配置中use_redis为false，则返回 None
+    """
+    redis_section = 'redis_db'
+    if not config[redis_section].getboolean('use_redis', fallback=False):
+        return None
+    pool = redis.asyncio.BlockingConnectionPool(
+        timeout=float(config[redis_section].get('redis_pool_timeout', fallback=5)),
+        **_connection_kwargs(config),
+    )
+    global async_redis_db
+    async_redis_db = redis.asyncio.Redis(connection_pool=pool)
+    return async_redis_db
+
+
+async def warm_async_redis(client, connections: int) -> int:
+    """
+    预先建立连接并发送 PING，避免第一批请求承担建立连接的延迟。
+
+    :param client: redis.asyncio.Redis 客户端
+    :param connections: 建立的连接数，不超过连接池的最大连接数
+    :return: 成功建立的连接数
+    """
+    pool = client.connection_pool
+    connections = min(connections, pool.max_connections)
+    # 同时取出多个连接，连接池只能新建连接，不会复用同一个
+    acquired = await asyncio.gather(*(pool.get_connection() for _ in range(connections)), return_exceptions=True)
+    acquired = [connection for connection in acquired if not isinstance(connection, BaseException)]
+    try:
+        results = await asyncio.gather(*(_ping(connection) for connection in acquired), return_exceptions=True)
+    finally:
+        for connection in acquired:
+            await pool.release(connection)
+    return sum(1 for result in results if result is True)
+
+
+async def _ping(connection) -> bool:
+    await connection.send_command('PING')
+    response = await connection.read_response()
+    return response in (b'PONG', 'PONG', True)
+
+
+async def close_async_redis():
+    """关闭异步客户端和连接池中的所有连接，应用关闭时调用"""
+    global async_redis_db
+    if async_redis_db is not None:
+        await async_redis_db.aclose()
+        await async_redis_db.connection_pool.disconnect()
+        async_redis_db = None
@@ -1,6 +1,7 @@
 import configparser
 import importlib
 import os
+import threading
 
 from sqlalchemy import Engine
 from sqlalchemy.orm import declarative_base
@@ -12,13 +13,39 @@ from sqlalchemy.orm import declarative_base
 # config.read(CONFIG_FILE)
 from project import config
 # 获取配置值
+from base.database import table_db
 from base.database.table_db import MultiTableDB
 
 simple_db_dir_path = config['mul_table_db']['mul_table_db_dir_path']
+# 后台清理过期键的间隔（秒）和每个表每次最多清理的键数
+table_db.expirer.interval = float(config['mul_table_db'].get('expire_interval', fallback=1.0))
+table_db.expirer.batch = int(config['mul_table_db'].get('expire_batch', fallback=1000))
+# 每个表在内存中保留的最近的修改数，供 changes_since 补齐错过的修改事件
+table_db.change_log_size = int(config['mul_table_db'].get('change_log_size', fallback=10000))
 
 
+_mt_db = None
+_mt_db_lock = threading.Lock()
+
+
+def get_mt_db() -> MultiTableDB:
+    """
+    获取多表单数据库。第一次调用时才从文件中加载全部表。
+    """
+    global _mt_db
+    if _mt_db is None:
+        with _mt_db_lock:
+            if _mt_db is None:
+                _mt_db = MultiTableDB(simple_db_dir_path)
+    return _mt_db
+
+
+def __getattr__(name):
+    # mt_db 和 simple_mul_tab_db 在第一次访问时才创建，from base.database.space import mt_db 仍然可用
+    if name in ('mt_db', 'simple_mul_tab_db'):
+        return get_mt_db()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-mt_db = simple_mul_tab_db = MultiTableDB(simple_db_dir_path)
 
 from base.database.sql.sql_db_engine import get_main_sql_session
 sql_db = None
@@ -31,6 +58,14 @@ def init_sql_engine():
     global main_sql_session
     main_sql_session = get_main_sql_session()
     return sql_db
+
+
+async_sql_db = None
+def init_async_sql_engine():
+    from base.database.sql.sql_db_engine import create_async_sql_engine
+    global async_sql_db
+    async_sql_db = create_async_sql_engine(config)
+    return async_sql_db
 #数据库基类
 
 
@@ -95,4 +130,12 @@ def create_redis_client():
     from base.database.redis_db.redis_db import create_redis_client as _create_redis_client
     global redis_db
     redis_db =_create_redis_client(config)
-    return redis_db
\ No newline at end of file
+    return redis_db
+
+
+async_redis_db = None
+def create_async_redis_client():
+    from base.database.redis_db.redis_db import create_async_redis_client as _create_async_redis_client
+    global async_redis_db
+    async_redis_db = _create_async_redis_client(config)
+    return async_redis_db
@@ -0,0 +1,146 @@
+"""
+sql_base_class 模型的批量写入和流式读取。
+
+    from base.database.sql.bulk import bulk_insert, upsert, stream
+    from base.database.sql.tables.test_db import TestDB
+
+    bulk_insert(TestDB, ({'name': f'user{i}'} for i in range(1000000)), batch_size=5000)
+    upsert(TestDB, [{'id': 1, 'name': 'alice'}])
+    for row in stream(TestDB, TestDB.id > 100, chunk=1000):
+        ...
+
+写入使用 Core 的 insert 和 executemany，不创建 ORM 对象；读取使用 yield_per 分批取数（MySQL 使用服务端游标），
+内存占用与总行数无关。bind 可以是 Engine、Connection 或 Session，默认使用 om 中的 sql_engine。
+传入 Engine 时所有批次在一个事务中写入；传入 Connection 或 Session 时使用调用方的事务，由调用方提交。
+"""
+from contextlib import contextmanager
+from itertools import islice
+from typing import Iterable, Iterator
+
+from sqlalchemy import Connection, Engine, insert, select
+from sqlalchemy.orm import Session
+
+
+def _batches(rows: Iterable[dict], batch_size: int) -> Iterator[list]:
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+@contextmanager
+def _connection(bind) -> Iterator[Connection]:
+    if bind is None:
+        from project import om
+        bind = om.get("sql_engine")
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            yield conn
+    elif isinstance(bind, Session):
+        yield bind.connection()
+    elif isinstance(bind, Connection):
+        yield bind
+    else:
+        raise TypeError(f"bind must be an Engine, Connection or Session, got {type(bind)}")
+
+
+def bulk_insert(model, rows: Iterable[dict], batch_size: int = 1000, bind=None) -> int:
+    """
+    批量插入。
+
+    :param model: sql_base_class 的子类
+    :param rows: 行数据，每行是列名 -> 值的字典，可以是生成器
+    :param batch_size: 每次 executemany 的行数
+    :param bind: Engine、Connection 或 Session，默认使用 om 中的 sql_engine
+    :return: 插入的行数
+    """
+    table = model.__table__
+    count = 0
+    with _connection(bind) as conn:
+        stmt = insert(table)
+        for batch in _batches(rows, batch_size):
+            conn.execute(stmt, batch)
+            count += len(batch)
+    return count
+
+
+def _upsert_statement(dialect: str, table, index_elements, update_columns):
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        if not update_columns:
+            return stmt.on_conflict_do_nothing(index_elements=index_elements)
+        return stmt.on_conflict_do_update(
+            index_elements=index_elements,
+            set_={name: stmt.excluded[name] for name in update_columns},
+        )
+    if dialect in ('mysql', 'mariadb'):
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        if not update_columns:
+            return stmt.prefix_with('IGNORE')
+        # MySQL 根据主键和唯一索引判断冲突，index_elements 不参与语句
+        return stmt.on_duplicate_key_update({name: stmt.inserted[name] for name in update_columns})
+    raise NotImplementedError(f"Upsert is not supported for dialect: {dialect}")
+
+
+def upsert(model, rows: Iterable[dict], index_elements=None, update_columns=None,
+           batch_size: int = 1000, bind=None) -> int:
+    """
+    批量插入，冲突时更新（SQLite/PostgreSQL 使用 ON CONFLICT，MySQL 使用 ON DUPLICATE KEY UPDATE）。
+
+    :param model: sql_base_class 的子类
+    :param rows: 行数据，每行是列名 -> 值的字典，可以是生成器
+    :param index_elements: 判断冲突的列名，默认为主键
+    :param update_columns: 冲突时更新的列名，默认为 index_elements 以外的所有列；为空列表时冲突的行被忽略
+    :param batch_size: 每次 executemany 的行数
+    :param bind: Engine、Connection 或 Session，默认使用 om 中的 sql_engine
+    :return: 写入的行数（包括更新和忽略的行）
+    :raises NotImplementedError: 如果数据库不支持
+    """
+    table = model.__table__
+    if index_elements is None:
+        index_elements = [column.name for column in table.primary_key.columns]
+    if update_columns is None:
+        update_columns = [column.name for column in table.columns if column.name not in index_elements]
+    count = 0
+    with _connection(bind) as conn:
+        stmt = _upsert_statement(conn.dialect.name, table, index_elements, update_columns)
+        for batch in _batches(rows, batch_size):
+            conn.execute(stmt, batch)
+            count += len(batch)
+    return count
+
+
+def stream(model, *criteria, chunk: int = 1000, order_by=None, session: Session = None) -> Iterator:
+    """
+    流式读取模型对象，每次从数据库取 chunk 行，内存占用与总行数无关。
+
+    :param model: sql_base_class 的子类
+    :param criteria: 过滤条件，例如 TestDB.id > 100
+    :param chunk: 每批读取的行数
+    :param order_by: 排序列或排序列的列表，默认按主键
+    :param session: 使用的会话，默认从 om 中的 sql_db 创建一个只读会话，读取结束后关闭
+    :return: 模型对象的生成器。调用方不应保留已经处理过的对象，否则它们不会被释放
+    """
+    stmt = select(model).where(*criteria)
+    if order_by is None:
+        order_by = model.__table__.primary_key.columns
+    elif not isinstance(order_by, (list, tuple)):
+        order_by = (order_by,)
+    stmt = stmt.order_by(*order_by)
+    # yield_per 同时开启 stream_results，支持的驱动使用服务端游标
+    stmt = stmt.execution_options(yield_per=chunk)
+    if session is not None:
+        yield from session.scalars(stmt)
+        return
+    from project import om
+    with om.get("sql_db")() as session:
+        yield from session.scalars(stmt)
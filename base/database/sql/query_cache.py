@@ -0,0 +1,199 @@
+"""
+SQL 读查询结果缓存。
+
+    from base.database.sql.query_cache import query_cache
+
+    rows = query_cache.all(session, select(TestDB).where(TestDB.name == 'alice'))
+    rows = await query_cache.all_async(async_session, stmt, ttl=5)
+
+结果存放在项目的缓存层（base.cache 的单例 LRU 缓存）中，键为语句的结构缓存键（与 SQLAlchemy 编译缓存使用的相同，
+不需要重新编译 SQL）加上参数值和涉及的表的版本号。写入通过引擎的 after_execute 事件记录涉及的表，
+数据库完成提交后表的版本号加一，旧结果不再命中，同时在 EventManager 上广播 sql/invalidate 事件。
+引擎的 commit 事件在数据库提交之前触发，此时失效的话，并发的读查询可能按新的版本号缓存提交之前的数据，
+因此失效在方言的 do_commit 返回之后进行。
+ORM 的 flush、session.execute 执行的 DML 和 bulk 中的批量写入都会经过 after_execute 事件。
+text() 中的写入无法识别涉及的表，需要手动调用 query_cache.invalidate。
+
+缓存的是列组成的行（Row），不是 ORM 对象，可以在会话和线程之间共享。
+会话中有未提交的写入涉及查询的表时不使用缓存，避免缓存未提交的数据。
+"""
+import functools
+import threading
+from typing import Iterable
+
+from sqlalchemy import Connection, Engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import TableClause
+from sqlalchemy.sql.util import find_tables
+
+from project import config
+from base.cache import get_singleton_cache
+
+query_cache_enabled = config['cache'].getboolean('query_cache', fallback=True)
+query_cache_ttl = float(config['cache'].get('query_cache_ttl', fallback=60))
+
+# 连接的 info 中记录未提交的写入涉及的表
+_PENDING = 'query_cache_pending_tables'
+
+
+def _hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    return value
+
+
+class QueryCache:
+    def __init__(self, cache=None, ttl: float = query_cache_ttl, enabled: bool = query_cache_enabled):
+        """
+        :param cache: 存放结果的缓存，默认使用项目的单例 LRU 缓存
+        :param ttl: 默认有效期（秒）
+        :param enabled: 为 False 时所有查询直接执行
+        """
+        self.cache = cache if cache is not None else get_singleton_cache()
+        self.ttl = ttl
+        self.enabled = enabled
+        # 表名 -> 版本号
+        self._versions = {}
+        # 语句结构 -> 涉及的表名，避免每次查询都遍历语句
+        self._statement_tables = {}
+        self._lock = threading.Lock()
+
+    max_statements = 1024
+
+    @staticmethod
+    def tables(stmt) -> tuple:
+        """语句涉及的表名（包括连接和子查询中的表）"""
+        return tuple(sorted({table.name for table in find_tables(stmt, include_joins=True, include_aliases=True)
+                             if isinstance(table, TableClause)}))
+
+    def _prepare(self, stmt, tables):
+        """返回 (键, 涉及的表, 缓存的结果)，不能缓存时键为 None"""
+        if not self.enabled:
+            return None, (), None
+        cache_key = stmt._generate_cache_key()
+        if cache_key is None:
+            return None, (), None
+        if tables is None:
+            tables = self._statement_tables.get(cache_key.key)
+            if tables is None:
+                tables = self.tables(stmt)
+                if len(self._statement_tables) >= self.max_statements:
+                    self._statement_tables.clear()
+                self._statement_tables[cache_key.key] = tables
+        else:
+            tables = tuple(tables)
+        if not tables:
+            return None, tables, None
+        try:
+            params = tuple(_hashable(bind.effective_value) for bind in cache_key.bindparams)
+            versions = tuple(self._versions.get(table, 0) for table in tables)
+            key = ('sql_query', cache_key.key, params, versions)
+            return key, tables, self.cache.get(key)
+        except TypeError:
+            # 参数值不可哈希
+            return None, tables, None
+
+    def _has_pending_writes(self, session, tables: Iterable[str]) -> bool:
+        if isinstance(session, Session):
+            if session.new or session.dirty or session.deleted:
+                return True
+            if not session.in_transaction():
+                return False
+            connection = session.connection()
+        else:
+            connection = session
+        pending = connection.info.get(_PENDING)
+        return bool(pending and pending.intersection(tables))
+
+    def all(self, session, stmt, ttl: float = None, tables=None) -> list:
+        """
+        执行读查询并返回所有行，结果缓存 ttl 秒。
+
+        :param session: Session 或 Connection
+        :param stmt: select 语句
+        :param ttl: 有效期（秒），默认使用配置 [cache] query_cache_ttl
+        :param tables: 语句涉及的表名，默认从语句中分析
+        :return: Row 的列表，调用方不应修改
+        """
+        key, tables, result = self._prepare(stmt, tables)
+        if key is not None and self._has_pending_writes(session, tables):
+            key, result = None, None
+        if result is not None:
+            return result
+        if isinstance(session, Session):
+            session.flush()
+            connection = session.connection()
+        else:
+            connection = session
+        result = connection.execute(stmt).all()
+        if key is not None and not self._has_pending_writes(session, tables):
+            self.cache.set(key, result, self.ttl if ttl is None else ttl)
+        return result
+
+    def scalars(self, session, stmt, ttl: float = None, tables=None) -> list:
+        """与 all 相同，但只返回每行的第一列"""
+        return [row[0] for row in self.all(session, stmt, ttl, tables)]
+
+    async def all_async(self, session, stmt, ttl: float = None, tables=None) -> list:
+        """
+        AsyncSession 版本的 all，命中时不访问数据库。
+
+        :param session: AsyncSession
+        """
+        # 会话在事务中时可能有已经 flush 的写入，交给同步版本检查
+        if not session.in_transaction():
+            key, tables, result = self._prepare(stmt, tables)
+            if result is not None:
+                return result
+        return await session.run_sync(lambda sync_session: self.all(sync_session, stmt, ttl, tables))
+
+    def invalidate(self, tables: Iterable[str]):
+        """
+        使涉及这些表的缓存结果失效，并广播 sql/invalidate 事件。
+
+        :param tables: 表名
+        """
+        tables = tuple(sorted(set(tables)))
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+        from project import ev
+        if ev is not None:
+            ev.emit("sql/invalidate", tables)
+
+    # 引擎事件
+    def attach(self, engine: Engine):
+        """
+        监听引擎的写入和提交，自动失效缓存。异步引擎传入 async_engine.sync_engine。
+        """
+        event.listen(engine, "after_execute", self._after_execute)
+        event.listen(engine, "rollback", self._on_rollback)
+        dialect = engine.dialect
+        if getattr(dialect, '_query_cache_do_commit', None) is None:
+            # SQLAlchemy 没有提交完成后的引擎事件，包装方言的 do_commit，在它返回之后失效
+            dialect._query_cache_do_commit = dialect.do_commit
+            dialect.do_commit = functools.partial(self._do_commit, dialect._query_cache_do_commit)
+
+    def _after_execute(self, conn: Connection, clauseelement, multiparams, params, execution_options, result):
+        if getattr(clauseelement, 'is_dml', False):
+            table = getattr(clauseelement, 'table', None)
+            name = getattr(table, 'name', None)
+            if name is not None:
+                conn.info.setdefault(_PENDING, set()).add(name)
+
+    def _do_commit(self, do_commit, dbapi_connection):
+        do_commit(dbapi_connection)
+        # dbapi_connection 是连接池中的连接，info 与 Connection.info 相同
+        tables = dbapi_connection.info.pop(_PENDING, None)
+        if tables:
+            self.invalidate(tables)
+
+    def _on_rollback(self, conn: Connection):
+        conn.info.pop(_PENDING, None)
+
+
+query_cache = QueryCache()
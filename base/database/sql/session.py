@@ -0,0 +1,68 @@
+"""
+请求作用域的数据库会话，作为 FastAPI 依赖使用：
+
+    from fastapi import Depends
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from base.database.sql.session import get_async_session
+
+    @app.get("/users/{user_id}")
+    async def read_user(user_id: int, session: AsyncSession = Depends(get_async_session)):
+        return await session.get(User, user_id)
+
+每个请求使用独立的会话，请求正常结束时提交，抛出异常时回滚，最后关闭会话并把连接还给连接池。
+同步接口（def 定义，在线程池中执行）使用 get_sql_session。
+"""
+from contextlib import asynccontextmanager, contextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Iterator
+
+from sqlalchemy.orm import Session, sessionmaker
+
+if TYPE_CHECKING:
+    # sqlalchemy.ext.asyncio 依赖 greenlet，只使用同步会话时不需要安装
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+
+@asynccontextmanager
+async def async_session_scope(session_factory: 'async_sessionmaker') -> AsyncIterator['AsyncSession']:
+    """
+    异步会话作用域：正常结束时提交，异常时回滚，最后关闭。
+
+    :param session_factory: 异步会话工厂
+    """
+    async with session_factory() as session:
+        try:
+            yield session
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+
+
+@contextmanager
+def session_scope(session_factory: sessionmaker) -> Iterator[Session]:
+    """
+    同步会话作用域：正常结束时提交，异常时回滚，最后关闭。
+
+    :param session_factory: 会话工厂
+    """
+    with session_factory() as session:
+        try:
+            yield session
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+
+
+async def get_async_session() -> AsyncIterator['AsyncSession']:
+    """FastAPI 依赖，每个请求一个 AsyncSession，会话工厂为 om 中的 async_sql_db"""
+    from project import om
+    async with async_session_scope(om.get("async_sql_db")) as session:
+        yield session
+
+
+def get_sql_session() -> Iterator[Session]:
+    """FastAPI 依赖，每个请求一个同步 Session，会话工厂为 om 中的 sql_db"""
+    from project import om
+    with session_scope(om.get("sql_db")) as session:
+        yield session
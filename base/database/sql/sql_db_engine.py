@@ -1,18 +1,98 @@
 import os
 import configparser
-from sqlalchemy import create_engine, Column, Integer, String, Sequence, Engine
+from sqlalchemy import create_engine, Column, Integer, String, Sequence, Engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 
 sql_engine = None
 mian_sql_session = None
-def create_sql_engine(config: configparser.ConfigParser) ->  Engine:
-    # 获取数据库类型
+async_sql_engine = None
+async_sql_session = None
+
+# 数据库类型 -> (同步驱动, 异步驱动)
+DRIVERS = {
+    'sqlite': ('sqlite', 'sqlite+aiosqlite'),
+    'mysql': ('mysql+pymysql', 'mysql+asyncmy'),
+}
+
+# SQLite 性能配置，连接建立时执行。WAL 允许读写并发，synchronous=NORMAL 在 WAL 模式下只在检查点时同步磁盘，
+# mmap 和 cache_size 减少读取时的系统调用，busy_timeout 让写锁冲突时等待而不是立即报错
+SQLITE_PERFORMANCE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # 负数表示 KiB，即 64 MiB
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+
+
+def pool_options(config: configparser.ConfigParser) -> dict:
+    """
+    从配置 [sql_db] 读取连接池参数。
+
+    :return: create_engine 的连接池关键字参数
+    """
+    section = config['sql_db']
+    return {
+        'pool_size': section.getint('pool_size', fallback=5),
+        'max_overflow': section.getint('max_overflow', fallback=10),
+        'pool_recycle': section.getint('pool_recycle', fallback=3600),
+        'pool_pre_ping': section.getboolean('pool_pre_ping', fallback=False),
+        'pool_timeout': section.getfloat('pool_timeout', fallback=30),
+    }
+
+
+def sqlite_pragmas(config: configparser.ConfigParser) -> dict:
+    """
+    从配置 [sql_db] 读取 SQLite 的 PRAGMA。sqlite_profile = performance 时使用 SQLITE_PERFORMANCE_PRAGMAS，
+    其中每一项都可以用 sqlite_<pragma> 覆盖，例如 sqlite_mmap_size = 0。
+
+    :return: PRAGMA 名称 -> 值，sqlite_profile = default 时为空
+    """
+    section = config['sql_db']
+    profile = section.get('sqlite_profile', fallback='performance')
+    if profile == 'default':
+        return {}
+    if profile != 'performance':
+        raise ValueError(f"Unsupported sqlite_profile: {profile}")
+    return {name: section.get(f'sqlite_{name}', fallback=value)
+            for name, value in SQLITE_PERFORMANCE_PRAGMAS.items()}
+
+
+def apply_sqlite_pragmas(engine: Engine, pragmas: dict):
+    """
+    在引擎的每个新连接上执行 PRAGMA。
+
+    :param engine: SQLite 引擎
+    :param pragmas: PRAGMA 名称 -> 值
+    """
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def connection_string(config: configparser.ConfigParser, use_async: bool = False) -> str:
+    """
+    根据配置 [sql_db] 构建连接字符串。
+
+    :param use_async: 是否使用异步驱动（aiosqlite / asyncmy）
+    :raises ValueError: 如果数据库类型不支持
+    """
     from project import logger
     db_type = config['sql_db']['type']
-    logger.info(f"主数据库类型: {db_type}")
-    echo = config['sql_db'].getboolean('echo')  # 读取echo配置，并转换为布尔值
+    if db_type not in DRIVERS:
+        logger.error(f"主数据库: 连接失败 "+ f"Unsupported database type: {db_type}")
+        raise ValueError(f"Unsupported database type: {db_type}")
+    driver = DRIVERS[db_type][1 if use_async else 0]
 
     # 根据数据库类型构建连接字符串
     if db_type == 'sqlite':
@@ -21,23 +101,33 @@ def create_sql_engine(config: configparser.ConfigParser) ->  Engine:
         # 确保sqlite_path是绝对路径或正确拼接为绝对路径
         sqlite_path = os.path.abspath(sqlite_path) if not os.path.isabs(sqlite_path) else sqlite_path
         # 注意：这里可能需要处理路径分隔符问题，但在大多数情况下，os.path.abspath 会正确处理
-        connection_string = f'sqlite:///{sqlite_path}'
-    elif db_type == 'mysql':
-        # MySQL 数据库连接字符串（需要额外配置）
-        username = config['sql_db']['username']  # 你需要在配置文件中添加这个字段
-        password = config['sql_db']['password']  # 你需要在配置文件中添加这个字段
-        hostname = config['sql_db']['hostname']  # 你需要在配置文件中添加这个字段
-        dbname = config['sql_db']['dbname']  # 你需要在配置文件中添加这个字段
-        # 构建 MySQL 连接字符串
-        connection_string = f'mysql+pymysql://{username}:{password}@{hostname}/{dbname}'
-    else:
+        return f'{driver}:///{sqlite_path}'
+    # MySQL 数据库连接字符串（需要额外配置）
+    username = config['sql_db']['username']  # 你需要在配置文件中添加这个字段
+    password = config['sql_db']['password']  # 你需要在配置文件中添加这个字段
+    hostname = config['sql_db']['hostname']  # 你需要在配置文件中添加这个字段
+    dbname = config['sql_db']['dbname']  # 你需要在配置文件中添加这个字段
+    # 构建 MySQL 连接字符串
+    return f'{driver}://{username}:{password}@{hostname}/{dbname}'
 
-        logger.error(f"主数据库: 连接失败 "+ f"Unsupported database type: {db_type}")
-        raise ValueError(f"Unsupported database type: {db_type}")
+
+def create_sql_engine(config: configparser.ConfigParser) ->  Engine:
+    # 获取数据库类型
+    from project import logger
+    db_type = config['sql_db']['type']
+    logger.info(f"主数据库类型: {db_type}")
+    echo = config['sql_db'].getboolean('echo')  # 读取echo配置，并转换为布尔值
+
+    # 根据数据库类型构建连接字符串
+    connection_string_ = connection_string(config)
     logger.info(f"主数据库: 连接成功")
     # 创建数据库引擎
     global sql_engine
-    sql_engine = create_engine(connection_string, echo=echo)
+    sql_engine = create_engine(connection_string_, echo=echo, **pool_options(config))
+    if db_type == 'sqlite':
+        pragmas = sqlite_pragmas(config)
+        apply_sqlite_pragmas(sql_engine, pragmas)
+        logger.info(f"主数据库: SQLite PRAGMA {pragmas}")
     #在引擎创建之时，主会话也开始连接
     global mian_sql_session
     mian_sql_session = sessionmaker(bind=sql_engine)
@@ -54,3 +144,57 @@ def get_main_sql_session() :
         mian_sql_session = sessionmaker(bind=sql_engine)
         return mian_sql_session
     return mian_sql_session
+
+
+def create_async_sql_engine(config: configparser.ConfigParser):
+    """
+    创建异步引擎（SQLite 使用 aiosqlite，MySQL 使用 asyncmy），连接池和 PRAGMA 配置与同步引擎相同。
+    同时创建的异步会话工厂通过 get_async_main_sql_session 获取。
+    同时使用的连接数不超过 pool_size + max_overflow，连接用完时请求会等待，最多等待 pool_timeout 秒。
+    sqlalchemy.ext.asyncio 依赖 greenlet，只在创建异步引擎时导入。
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from project import logger
+    echo = config['sql_db'].getboolean('echo')
+    global async_sql_engine, async_sql_session
+    async_sql_engine = create_async_engine(connection_string(config, use_async=True), echo=echo,
+                                           **pool_options(config))
+    if config['sql_db']['type'] == 'sqlite':
+        # 异步引擎的连接事件注册在其同步代理引擎上
+        apply_sqlite_pragmas(async_sql_engine.sync_engine, sqlite_pragmas(config))
+    # 提交后不过期对象，响应序列化时访问属性不会触发隐式的数据库查询
+    async_sql_session = async_sessionmaker(bind=async_sql_engine, expire_on_commit=False)
+    logger.info(f"主数据库: 异步引擎创建成功")
+    return async_sql_engine
+
+
+def get_async_main_sql_session():
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    global async_sql_session
+    if async_sql_session is None:
+        async_sql_session = async_sessionmaker(bind=async_sql_engine, expire_on_commit=False)
+    return async_sql_session
+
+
+async def dispose_async_sql_engine():
+    """关闭异步引擎的所有连接，应用关闭时调用。异步引擎没有创建时什么都不做"""
+    global async_sql_engine, async_sql_session
+    if async_sql_engine is not None:
+        await async_sql_engine.dispose()
+        async_sql_engine = None
+        async_sql_session = None
+
+
+def _dispose_after_fork():
+    """
+    fork 出的子进程不能使用父进程连接池中的连接（多个进程共用一个连接会导致数据错乱）。
+    close=False 只丢弃连接池而不关闭连接，父进程中的连接不受影响，子进程需要时建立新的连接。
+    """
+    if sql_engine is not None:
+        sql_engine.dispose(close=False)
+    if async_sql_engine is not None:
+        async_sql_engine.sync_engine.dispose(close=False)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_after_fork)
@@ -1,6 +1,98 @@
+import atexit
+import heapq
+import itertools
 import pickle
+import sys
 import threading
 import os
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from base.database.column_table import ColumnTable
+from base.metrics import registry
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+# 每次把表写入文件的耗时，按写入的原因统计：write 为插入、修改、删除等写操作，expire 为保存过期删除。
+# 表名不作为标签，表可以在运行中任意创建，标签的取值数量有限
+persist_seconds = registry.histogram("table_db_persist_seconds", "TableDB 把表写入文件的耗时（秒）", ("source",))
+
+# 有键设置了有效期的表以这种格式保存：{_FORMAT_KEY: _FORMAT_VERSION, 'data': 数据, 'expires': {键: 过期时间}}，
+# 没有有效期的表仍然直接保存数据字典，与旧版本的文件相同
+_FORMAT_KEY = '__table_db_format__'
+_FORMAT_VERSION = 2
+
+# 每个表在内存中保留的最近的修改数，changes_since 只能查到这些修改
+change_log_size = 10000
+
+# 多个进程同时使用同一批表文件时为 True（python -m serve 以多个工作进程运行时由主进程设置）。
+# 写入时加文件锁并先加载其他进程的写入，读取时文件发生变化则重新加载。
+process_shared = False
+
+
+class FileLock:
+    """进程间的排他文件锁，Linux/macOS 使用 fcntl.flock，Windows 使用 msvcrt.locking"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            while True:
+                try:
+                    # LK_LOCK 重试 10 秒后仍然失败时抛出 OSError
+                    msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class Change:
+    """
+    表的一次修改。op 为 insert、update 或 delete（包括过期），
+    insert 时 old 为 None，delete 时 new 为 None。
+    """
+    seq: int
+    op: str
+    key: Any
+    old: Any = None
+    new: Any = None
+
+
+def _stamp(st) -> tuple:
+    # 文件通过 os.replace 整体替换，inode 每次写入都会变化，修改时间精度不够时也能识别
+    return st.st_ino, st.st_mtime_ns, st.st_size
 
 class TableDB:
     def __init__(self, filename):
@@ -10,8 +102,22 @@ class TableDB:
         :param filename: 数据库文件的名称，用于持久化存储数据。
         """
         self.filename = filename  # 数据库文件名
+        self.name = os.path.splitext(os.path.basename(filename))[0]  # 表名，用于事件名
         self.lock = threading.Lock()  # 线程锁，用于确保线程安全
         self.data = {}  # 使用字典来存储数据库数据
+        self._expires = {}  # 键 -> 过期时间（time.time()），只包含设置了有效期的键
+        # (过期时间, 序号, 键) 的最小堆。键的有效期改变或键被删除后，旧的项留在堆中，弹出时跳过
+        self._expiry_heap = []
+        self._sequence = itertools.count()
+        self._dirty = False  # 是否有尚未写入文件的过期删除
+        # 修改记录：每次修改分配一个递增的序号，写入文件后成批发布到 EventManager
+        self._changes = deque(maxlen=change_log_size)
+        self._change_seq = 0  # 最后一次修改的序号
+        self._persisted_seq = 0  # 已经写入文件的最后一次修改的序号
+        self._published_seq = 0  # 已经发布的最后一次修改的序号
+        self._publish_lock = threading.Lock()  # 保证多个线程按顺序发布
+        self._publisher = None  # 正在发布的线程
+        self._file_stamp = None  # 最后一次读取或写入的文件的标识，用于识别其他进程的写入
         self._load_data()  # 从文件中加载数据（如果存在）
 
     def _load_data(self):
@@ -22,27 +128,220 @@ class TableDB:
         """
         if os.path.exists(self.filename):
             with open(self.filename, 'rb') as file:
-                self.data = pickle.load(file)
-
-    def _save_data(self):
+                self._file_stamp = _stamp(os.fstat(file.fileno()))
+                content = pickle.load(file)
+            if isinstance(content, dict) and content.get(_FORMAT_KEY) == _FORMAT_VERSION:
+                self.data, self._expires = content['data'], content['expires']
+            else:
+                self.data, self._expires = content, {}
+            self._expiry_heap = [(expires, next(self._sequence), key) for key, expires in self._expires.items()]
+            heapq.heapify(self._expiry_heap)
+            self._dirty = False
+            if self._expires:
+                expirer.watch(self)
+
+    def _save_data(self, source='write'):
         """
         将数据保存到文件中。
 
-        使用pickle模块将self.data字典对象序列化为二进制数据，并写入到指定的文件中。
+        使用pickle模块将self.data字典对象序列化为二进制数据，先写入临时文件再替换原文件，
+        写入过程中进程退出或其他进程读取时都不会看到写了一半的文件。
+
+        :param source: 写入的原因，persist_seconds 的标签：write 或 expire
+        """
+        start = time.perf_counter()
+        temp = f"{self.filename}.{os.getpid()}.tmp"
+        content = self.data if not self._expires else \
+            {_FORMAT_KEY: _FORMAT_VERSION, 'data': self.data, 'expires': self._expires}
+        with open(temp, 'wb') as file:
+            pickle.dump(content, file)
+        os.replace(temp, self.filename)
+        self._file_stamp = _stamp(os.stat(self.filename))
+        self._dirty = False
+        self._persisted_seq = self._change_seq
+        persist_seconds.observe(time.perf_counter() - start, source)
+
+    def _refresh(self):
+        """process_shared 时，其他进程写入了文件则重新加载，调用方需要持有 self.lock"""
+        if not process_shared:
+            return
+        try:
+            stamp = _stamp(os.stat(self.filename))
+        except FileNotFoundError:
+            return
+        if stamp != self._file_stamp:
+            self._load_data()
+
+    @contextmanager
+    def _writing(self):
+        """
+        写操作的锁：线程锁，process_shared 时还有文件锁，并在修改之前加载其他进程的写入，
+        多个进程的写入不会互相覆盖。
+        """
+        try:
+            with self.lock:
+                if not process_shared:
+                    yield
+                    return
+                with FileLock(f"{self.filename}.lock"):
+                    self._refresh()
+                    yield
+        finally:
+            # 释放锁之后发布，事件处理器中可以读写这个表
+            if self._published_seq != self._persisted_seq:
+                self._publish()
+
+    # 修改记录，_record 的调用方需要持有 self.lock
+    def _record(self, op, key, old=None, new=None):
+        self._change_seq += 1
+        self._changes.append(Change(self._change_seq, op, key, old, new))
+
+    def _changes_between(self, start, stop) -> list:
+        """序号在 (start, stop] 中的修改。记录中的序号连续，从最新的一端取，耗时只与取出的数量有关"""
+        newest = self._change_seq
+        skip = newest - stop
+        count = min(stop - start, len(self._changes) - skip)
+        if count <= 0:
+            return []
+        batch = list(itertools.islice(reversed(self._changes), skip, skip + count))
+        batch.reverse()
+        return batch
+
+    def _publish(self):
+        """
+        把已经写入文件、尚未发布的修改发布到 EventManager：
+        每种操作的修改触发一次 table/<表名>/<op> 事件，全部修改按顺序触发一次 table/<表名> 事件，参数为 Change 的列表。
+        """
+        if self._publisher == threading.get_ident():
+            # 事件处理器中对这个表的写入，由外层在当前这批之后发布
+            return
+        with self._publish_lock:
+            self._publisher = threading.get_ident()
+            try:
+                while True:
+                    with self.lock:
+                        start, stop = self._published_seq, self._persisted_seq
+                        self._published_seq = stop
+                        batch = self._changes_between(start, stop)
+                    if not batch:
+                        return
+                    ev = _event_manager()
+                    if ev is None:
+                        continue
+                    by_op = {}
+                    for change in batch:
+                        by_op.setdefault(change.op, []).append(change)
+                    for op, changes in by_op.items():
+                        ev.emit(f"table/{self.name}/{op}", changes)
+                    ev.emit(f"table/{self.name}", batch)
+            finally:
+                self._publisher = None
+
+    @property
+    def sequence(self) -> int:
+        """已经写入文件的最后一次修改的序号，作为 changes_since 的起点"""
+        return self._persisted_seq
+
+    def changes_since(self, seq) -> list:
         """
-        with open(self.filename, 'wb') as file:
-            pickle.dump(self.data, file)
+        序号大于 seq 的、已经写入文件的修改，用于事件处理器错过事件后补齐，而不需要读取整张表。
 
-    def insert(self, key, value):
+            seq = db.sequence
+            ...
+            for change in db.changes_since(seq):
+                seq = change.seq
+
+        只记录当前进程的修改；process_shared 时其他进程的写入不在其中。
+
+        :param seq: 已经处理的最后一次修改的序号
+        :return: Change 的列表，按序号排列
+        :raises ValueError: 序号 seq 之后的修改已经有一部分不在内存中（超过 change_log_size），需要重新读取整张表
+        """
+        with self.lock:
+            stop = self._persisted_seq
+            oldest = self._changes[0].seq if self._changes else stop + 1
+            if seq + 1 < oldest and seq < stop:
+                raise ValueError(f"表 {self.name} 序号 {seq} 之后的修改已经不在内存中，最早的序号为 {oldest}")
+            return self._changes_between(seq, stop)
+
+    # 有效期，以下方法的调用方需要持有 self.lock
+    def _set_expiry(self, key, ttl):
+        """设置键的有效期（秒），ttl 为 None 时清除有效期"""
+        if ttl is None:
+            self._expires.pop(key, None)
+            return
+        expires = time.time() + ttl
+        self._expires[key] = expires
+        heapq.heappush(self._expiry_heap, (expires, next(self._sequence), key))
+        # 跳过的旧项过多时重建堆
+        if len(self._expiry_heap) > 2 * len(self._expires) + 1024:
+            self._expiry_heap = [(e, next(self._sequence), k) for k, e in self._expires.items()]
+            heapq.heapify(self._expiry_heap)
+        expirer.watch(self)
+
+    def _expired(self, key) -> bool:
+        """键已经过期时从内存中删除并返回 True，删除在下一次写入文件时保存"""
+        expires = self._expires.get(key)
+        if expires is None or expires > time.time():
+            return False
+        del self._expires[key]
+        self._record('delete', key, self.data.pop(key, None))
+        self._dirty = True
+        return True
+
+    def _expire_due(self, limit=None) -> int:
+        """
+        按过期时间顺序删除已经过期的键。
+
+        :param limit: 最多删除的键数，None 表示全部
+        :return: 删除的键数
+        """
+        now = time.time()
+        heap = self._expiry_heap
+        count = 0
+        while heap and heap[0][0] <= now and (limit is None or count < limit):
+            expires, _, key = heapq.heappop(heap)
+            if self._expires.get(key) == expires:
+                del self._expires[key]
+                self._record('delete', key, self.data.pop(key, None))
+                count += 1
+        if count:
+            self._dirty = True
+        return count
+
+    def _live(self) -> dict:
+        """
+        未过期的键值对。与后台的 expirer 一样每次最多删除 expirer.batch 个过期键，限制持有锁的时间，
+        其余过期的键只是跳过，由 expirer 删除。
+        """
+        if not self._expires:
+            return self.data
+        self._expire_due(expirer.batch)
+        heap = self._expiry_heap
+        now = time.time()
+        if not heap or heap[0][0] > now:
+            return self.data
+        expires = self._expires
+        return {key: value for key, value in self.data.items() if key not in expires or expires[key] > now}
+
+    def insert(self, key, value, ttl=None):
         """
         插入新的键值对到数据库中。
             db.insert('name', 'Alice')
             db.insert('age', 30)
+            db.insert('session:1', {'user': 'Alice'}, ttl=3600)  # 一小时后过期
         :param key: 要插入的键。
         :param value: 与键关联的值。
+        :param ttl: 有效期（秒），默认不过期；键原来的有效期被清除。
         """
-        with self.lock:  # 确保线程安全
+        with self._writing():  # 确保线程和进程安全
+            old = self.data.get(key, _MISSING)
             self.data[key] = value  # 将键值对添加到字典中
+            if old is _MISSING:
+                self._record('insert', key, None, value)
+            else:
+                self._record('update', key, old, value)
+            self._set_expiry(key, ttl)
             self._save_data()  # 将数据保存到文件
 
     def get(self, key):
@@ -52,12 +351,15 @@ class TableDB:
             print(db.get('age'))   # Output: 30
 
         :param key: 要获取值的键。
-        :return: 与键关联的值，如果键不存在则返回None。
+        :return: 与键关联的值，如果键不存在或已经过期则返回None。
         """
         with self.lock:  # 确保线程安全
+            self._refresh()
+            if key in self._expires and self._expired(key):
+                return None
             return self.data.get(key)  # 从字典中获取值
 
-    def update(self, key, value):
+    def update(self, key, value, ttl=None):
         """
         更新数据库中指定键的值。
             db.update('age', 31)
@@ -65,14 +367,67 @@ class TableDB:
 
         :param key: 要更新的键。
         :param value: 新的值。
+        :param ttl: 新的有效期（秒），默认保留原来的有效期。
 
-        注意：如果键不存在，则不会进行任何操作。
+        注意：如果键不存在（或已经过期），则不会进行任何操作。
         """
-        with self.lock:  # 确保线程安全
-            if key in self.data:  # 检查键是否存在
+        with self._writing():  # 确保线程和进程安全
+            if key in self.data and not self._expired(key):  # 检查键是否存在
+                self._record('update', key, self.data[key], value)
                 self.data[key] = value  # 更新值
+                if ttl is not None:
+                    self._set_expiry(key, ttl)
                 self._save_data()  # 将数据保存到文件
 
+    def expire(self, key, ttl) -> bool:
+        """
+        设置键的有效期。
+            db.expire('session:1', 60)
+
+        :param key: 键。
+        :param ttl: 有效期（秒），None 表示不再过期。
+        :return: 键存在时返回 True。
+        """
+        with self._writing():
+            if key not in self.data or self._expired(key):
+                return False
+            self._set_expiry(key, ttl)
+            self._save_data()
+            return True
+
+    def ttl(self, key):
+        """
+        获取键剩余的有效期。
+
+        :param key: 键。
+        :return: 剩余的秒数；键不存在或没有设置有效期时返回 None。
+        """
+        with self.lock:
+            self._refresh()
+            if key in self._expires and self._expired(key):
+                return None
+            expires = self._expires.get(key)
+            return None if expires is None else expires - time.time()
+
+    def expire_due(self, limit=None) -> int:
+        """
+        删除已经过期的键，并把删除（包括 get 中发现的过期键）一次写入文件。由后台的 expirer 定期调用。
+
+        :param limit: 最多删除的键数，None 表示全部。
+        :return: 删除的键数。
+        """
+        with self._writing():
+            count = self._expire_due(limit)
+            if self._dirty:
+                self._save_data('expire')
+            return count
+
+    def flush(self):
+        """把尚未保存的过期删除写入文件"""
+        with self._writing():
+            if self._dirty:
+                self._save_data('expire')
+
     def delete(self, key):
         """
         从数据库中删除指定的键值对。
@@ -80,9 +435,10 @@ class TableDB:
             print(db.get('name'))  # Output: None
         :param key: 要删除的键。
         """
-        with self.lock:  # 确保线程安全
+        with self._writing():  # 确保线程和进程安全
             if key in self.data:  # 检查键是否存在
-                del self.data[key]  # 删除键值对
+                self._record('delete', key, self.data.pop(key))  # 删除键值对
+                self._expires.pop(key, None)
                 self._save_data()  # 将数据保存到文件
 
     def keys(self):
@@ -92,7 +448,8 @@ class TableDB:
         :return: 包含所有键的列表。
         """
         with self.lock:  # 确保线程安全
-            return list(self.data.keys())  # 从字典中获取所有键
+            self._refresh()
+            return list(self._live().keys())  # 从字典中获取所有键
 
     def values(self):
         """
@@ -101,7 +458,8 @@ class TableDB:
         :return: 包含所有值的列表。
         """
         with self.lock:  # 确保线程安全
-            return list(self.data.values())  # 从字典中获取所有值
+            self._refresh()
+            return list(self._live().values())  # 从字典中获取所有值
 
     def items(self):
         """
@@ -110,13 +468,95 @@ class TableDB:
         :return: 包含所有键值对的列表（每个键值对都是一个元组）。
         """
         with self.lock:  # 确保线程安全
-            return list(self.data.items())  # 从字典中获取所有键值对
+            self._refresh()
+            return list(self._live().items())  # 从字典中获取所有键值对
+
+
+def _event_manager():
+    """project 中的 EventManager，project 没有加载（单独使用 TableDB）或 ev 尚未创建时为 None"""
+    project = sys.modules.get('project')
+    return getattr(project, 'ev', None)
+
+
+class TableExpirer:
+    """
+    后台线程，每 interval 秒为每个有过期键的表删除最多 batch 个已经过期的键，
+    每个表每一轮最多写入一次文件。第一次设置有效期时启动。
+    """
+
+    def __init__(self, interval=1.0, batch=1000):
+        """
+        :param interval: 两轮之间的间隔（秒）
+        :param batch: 每个表每一轮最多删除的键数，限制持有表的锁的时间
+        """
+        self.interval = interval
+        self.batch = batch
+        self._tables = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, table: 'TableDB'):
+        with self._lock:
+            self._tables.add(table)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='TableExpirer', daemon=True)
+                self._thread.start()
+
+    def run_once(self) -> int:
+        """
+        执行一轮。
+
+        :return: 删除的键数
+        """
+        total = 0
+        with self._lock:
+            tables = list(self._tables)
+        for table in tables:
+            if not table._expires and not table._dirty:
+                with self._lock:
+                    self._tables.discard(table)
+                continue
+            try:
+                total += table.expire_due(self.batch)
+            except Exception as e:
+                sys.stderr.write(f"TableDB 过期清理失败 {table.filename}: {e}\n")
+        return total
+
+    def flush(self):
+        """把所有表尚未保存的过期删除写入文件，程序退出时调用"""
+        with self._lock:
+            tables = list(self._tables)
+        for table in tables:
+            try:
+                table.flush()
+            except Exception as e:
+                sys.stderr.write(f"TableDB 写入失败 {table.filename}: {e}\n")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def _after_fork_in_child(self):
+        """子进程中后台线程不存在了，有需要清理的表时重新启动"""
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        if len(self._tables):
+            self.watch(next(iter(self._tables)))
+
+
+expirer = TableExpirer()
+atexit.register(expirer.flush)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=expirer._after_fork_in_child)
 
 
 class MultiTableDB:
     def __init__(self, folder_path):
         self.folder_path = folder_path
         self.tables = {}
+        self.column_tables = {}  # 按列存储的数值表，见 ColumnTable
         # 确保文件夹存在
         os.makedirs(self.folder_path, exist_ok=True)
         # 从文件夹中的PKL文件恢复表
@@ -129,6 +569,9 @@ class MultiTableDB:
                 file_path = os.path.join(self.folder_path, filename)
                 if table_name not in self.tables:
                     self.tables[table_name] = TableDB(file_path)
+            elif filename.endswith('.columns'):
+                # 列表在第一次使用时才打开
+                self.column_tables.setdefault(filename[:-len('.columns')], None)
 
     def create_table(self, table_name):
         """
@@ -160,6 +603,7 @@ class MultiTableDB:
         :param table_name: 表名。
         :return: 对应的TableDB对象或None。
         """
+        self._discover(table_name)
         return self.tables.get(table_name)
 
     def __getitem__(self, table_name) -> TableDB:
@@ -170,8 +614,45 @@ class MultiTableDB:
         :return: 对应的TableDB对象。
         :raises KeyError: 如果表不存在。
         """
+        self._discover(table_name)
         return self.tables[table_name]
 
+    def create_column_table(self, table_name, columns, key=None) -> ColumnTable:
+        """
+        创建按列存储的数值表，如果表已存在则抛出异常。
+
+            cpu = mt_db.create_column_table('cpu', {'ts': 'float64', 'value': 'float32'}, key='ts')
+
+        :param table_name: 表名。
+        :param columns: 列名 -> 类型，类型见 column_table.COLUMN_TYPES。
+        :param key: 键列的列名（例如时间戳），值必须不减，用于按范围查找。
+        """
+        if table_name in self.column_tables:
+            raise ValueError(f"Column table '{table_name}' already exists.")
+        table = ColumnTable(os.path.join(self.folder_path, f"{table_name}.columns"), columns, key)
+        self.column_tables[table_name] = table
+        return table
+
+    def get_column_table(self, table_name) -> ColumnTable:
+        """
+        通过表名获取按列存储的数值表，如果表不存在则返回None。
+
+        :param table_name: 表名。
+        """
+        if table_name not in self.column_tables:
+            return None
+        if self.column_tables[table_name] is None:
+            path = os.path.join(self.folder_path, f"{table_name}.columns")
+            self.column_tables[table_name] = ColumnTable(path)
+        return self.column_tables[table_name]
+
+    def _discover(self, table_name):
+        """process_shared 时，加载其他进程创建的表"""
+        if process_shared and table_name not in self.tables:
+            filename = os.path.join(self.folder_path, f"{table_name}.pkl")
+            if os.path.exists(filename):
+                self.tables[table_name] = TableDB(filename)
+
 # Example usage:
 if __name__ == "__main__":
     db = TableDB('database.pkl')
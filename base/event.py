@@ -1,7 +1,18 @@
 import functools
+import time
 import weakref
 from typing import List, Callable, Dict, Any
 
+from base.metrics import registry
+
+# 触发事件的耗时（包括所有处理器的执行时间），按事件名的第一段统计（table/<表名>/<操作> 记为 table），
+# 事件名中的表名、插件名等不会成为标签的取值，标签的取值数量有限
+emit_seconds = registry.histogram("ev_emit_seconds", "EventManager 触发事件的耗时（秒）", ("event",))
+
+
+def _event_label(event_name: str) -> str:
+    return event_name.split('/', 1)[0]
+
 
 class TrieNode:
     """表示前缀树中的节点"""
@@ -58,6 +69,38 @@ class Trie:
             node = node.children[char]
         return node
 
+    def remove(self, key: str, handler: Callable) -> bool:
+        """
+        从指定键中移除一个处理器。
+
+        :param key: 字符串，表示事件名称或标签
+        :param handler: 处理器函数
+        :return: 是否移除了处理器
+        """
+        node = self._traverse_to_node(key)
+        if node is None or handler not in node.handlers:
+            return False
+        node.handlers.discard(handler)
+        return True
+
+    def remove_if(self, predicate: Callable[[Callable], bool]) -> int:
+        """
+        移除前缀树中所有满足条件的处理器。
+
+        :param predicate: 接收处理器，返回 True 表示移除
+        :return: 移除的处理器数量
+        """
+        count = 0
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            for handler in list(node.handlers):
+                if predicate(handler):
+                    node.handlers.discard(handler)
+                    count += 1
+            stack.extend(node.children.values())
+        return count
+
     def clean_up(self):
         """清理前缀树中所有无效的弱引用"""
         self._clean_node(self.root)
@@ -122,9 +165,7 @@ class EventManager:
         :param event_name: 字符串，表示事件名称
         :param handler: 处理器函数
         """
-        handlers = self.event_trie.search(event_name)
-        if handler in handlers:
-            handlers.remove(handler)
+        self.event_trie.remove(event_name, handler)
 
     def register_tagged(self, tag: str, handler: Callable):
         """
@@ -142,9 +183,24 @@ class EventManager:
         :param tag: 字符串，表示标签
         :param handler: 处理器函数
         """
-        handlers = self.tag_trie.search(tag)
-        if handler in handlers:
-            handlers.remove(handler)
+        self.tag_trie.remove(tag, handler)
+
+    def unregister_module(self, module_names) -> int:
+        """
+        注销由指定模块定义的全部普通事件和标签事件处理器，用于插件重载。
+        通过装饰器注册的处理器保留了原函数的 __module__，同样会被注销。
+
+        :param module_names: 模块名或模块名集合
+        :return: 注销的处理器数量
+        """
+        names = {module_names} if isinstance(module_names, str) else set(module_names)
+
+        def defined_in(handler):
+            return getattr(handler, '__module__', None) in names
+
+        count = self.event_trie.remove_if(defined_in) + self.tag_trie.remove_if(defined_in)
+        self.clean_up()
+        return count
 
     def emit(self, event_name: str, *args, **kwargs):
         """
@@ -154,8 +210,10 @@ class EventManager:
         :param args: 可变位置参数
         :param kwargs: 可变关键字参数
         """
+        start = time.perf_counter()
         for handler in self.event_trie.search(event_name):
             handler(*args, **kwargs)
+        emit_seconds.observe(time.perf_counter() - start, _event_label(event_name))
 
     def emit_tagged(self, tag: str, *args, **kwargs):
         """
@@ -177,10 +235,12 @@ class EventManager:
         :param kwargs: 可变关键字参数
         :return: 所有处理器的返回结果列表
         """
+        start = time.perf_counter()
         results = []
         for handler in self.event_trie.search(event_name):
             result = handler(*args, **kwargs)
             results.append(result)
+        emit_seconds.observe(time.perf_counter() - start, _event_label(event_name))
         return results
 
     def emit_tagged_and_collect_results(self, tag: str, *args, **kwargs) -> List[Any]:
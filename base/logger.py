@@ -1,7 +1,13 @@
 # logger.py
 
 from loguru import logger as loguru_logger
+import atexit
+import queue
 import sys
+import threading
+import time
+import zipfile
+from datetime import datetime
 from pathlib import Path
 #from configparser import ConfigParser
 import os
@@ -17,6 +23,12 @@ from project import config
 logger_dir_path = config['logger']['logger_dir_path']
 log_to_console = config['logger']['log_to_console'].strip().lower() == 'true'
 log_level = config['logger']['log_level'].upper()
+# 异步日志配置
+async_logging = config['logger'].getboolean('async_logging', fallback=False)
+async_queue_size = int(config['logger'].get('async_queue_size', fallback=10000))
+async_batch_size = int(config['logger'].get('async_batch_size', fallback=256))
+async_flush_interval = float(config['logger'].get('async_flush_interval', fallback=0.5))
+async_overflow_policy = config['logger'].get('async_overflow_policy', fallback='block').strip().lower()
 
 # 确保日志目录存在
 if not os.path.exists(logger_dir_path):
@@ -25,6 +37,224 @@ if not os.path.exists(logger_dir_path):
 # 配置 loguru
 log_file_path = Path(logger_dir_path) / 'app.log'
 
+# 异步模式下日志文件轮转大小和保留天数，与同步模式的 "500 MB"、"10 days" 一致
+rotation_size = 500 * 1024 * 1024
+retention_days = 10
+# 是否按大小轮转日志文件。多个工作进程追加同一个日志文件时由 serve.prefork 调用 disable_rotation() 关闭，
+# 否则一个进程重命名、压缩并删除文件后，其他进程仍在向已经被删除的文件写入
+rotate = True
+
+_STOP = object()  # 通知写入线程退出的哨兵
+
+
+class AsyncFileSink:
+    """
+    异步文件日志处理器。
+
+    loguru 调用本对象时只把格式化好的消息放入有界队列，由后台写入线程批量写入文件，
+    因此记录日志的线程不会执行文件 I/O。文件超过 rotation_size 时轮转，
+    压缩和清理过期日志在单独的线程中完成，不会阻塞写入线程。
+
+    队列满时的处理方式由 overflow_policy 决定：
+        block        等待队列有空位（不丢日志）
+        drop_new     丢弃新的日志
+        drop_oldest  丢弃队列中最旧的日志
+    丢弃的条数会作为一条警告写入日志文件。
+    """
+
+    overflow_policies = ('block', 'drop_new', 'drop_oldest')
+
+    def __init__(self, path, rotation=rotation_size, retention=retention_days, queue_size=10000,
+                 batch_size=256, flush_interval=0.5, overflow_policy='block'):
+        """
+        :param path: 日志文件路径
+        :param rotation: 单个日志文件的最大字节数，为 None 时不轮转
+        :param retention: 压缩后的日志保留天数
+        :param queue_size: 队列容量
+        :param batch_size: 每次最多批量写入的日志条数
+        :param flush_interval: 队列持续有日志时，最长多少秒刷新一次文件缓冲
+        :param overflow_policy: 队列满时的处理方式
+        """
+        if overflow_policy not in self.overflow_policies:
+            raise ValueError(f"Invalid overflow policy '{overflow_policy}', expected one of {self.overflow_policies}")
+        self.path = Path(path)
+        self.rotation = rotation
+        self.retention = retention
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._last_flush = time.monotonic()
+        self._compressors = []
+        # stop() 开始后为 True，之后的日志不再进入队列
+        self._stopping = False
+        self._writer = threading.Thread(target=self._run, name='AsyncFileSink', daemon=True)
+        self._writer.start()
+
+    def __call__(self, message):
+        # 只保留字符串，避免队列持有日志记录中的异常、帧等对象
+        text = str(message)
+        if self._stopping:
+            # 退出流程中写入线程即将或已经结束，直接同步写入
+            self._write_batch([text])
+            return
+        if self.overflow_policy == 'block':
+            self._queue.put(text)
+            return
+        while True:
+            try:
+                self._queue.put_nowait(text)
+                return
+            except queue.Full:
+                if self.overflow_policy == 'drop_new':
+                    self._count_dropped()
+                    return
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                continue
+            if item is _STOP:
+                # 检查 _stopping 之后 stop() 放入了哨兵，不能丢弃它，放回后这条日志同步写入
+                self._queue.put(_STOP)
+                self._write_batch([text])
+                return
+            self._count_dropped()
+
+    def _count_dropped(self):
+        with self._dropped_lock:
+            self._dropped += 1
+
+    def _run(self):
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            with self._dropped_lock:
+                dropped, self._dropped = self._dropped, 0
+            if dropped:
+                batch.append(f"{datetime.now():%Y-%m-%d %H:%M:%S} - WARNING - 日志队列已满，丢弃了{dropped}条日志\n")
+            try:
+                self._write_batch(batch, flush=stop or self._queue.empty())
+            except Exception as e:
+                # 写入失败（磁盘已满、没有权限、轮转失败等）只丢弃这一批，写入线程继续取走队列中的日志，
+                # 否则队列满后所有记录日志的线程都会阻塞
+                sys.stderr.write(f"日志写入失败 {self.path}，丢弃了{len(batch)}条日志: {e}\n")
+
+    def _write_batch(self, batch, flush=True):
+        data = ''.join(batch).encode('utf-8')
+        with self._write_lock:
+            if self._file is None:
+                self._open()
+            if self.rotation and self._size and self._size + len(data) > self.rotation:
+                self._rotate()
+            self._file.write(data)
+            self._size += len(data)
+            now = time.monotonic()
+            if flush or now - self._last_flush >= self.flush_interval:
+                self._file.flush()
+                self._last_flush = now
+
+    def _open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'ab')
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        """关闭当前文件并重命名，交给压缩线程处理"""
+        self._file.close()
+        # 重命名失败时下一次写入重新打开原来的文件
+        self._file = None
+        rotated = self.path.with_name(f"{self.path.stem}.{datetime.now():%Y-%m-%d_%H-%M-%S_%f}{self.path.suffix}")
+        os.replace(self.path, rotated)
+        self._compressors = [t for t in self._compressors if t.is_alive()]
+        compressor = threading.Thread(target=self._compress, args=(rotated,), name='AsyncFileSink-compress')
+        compressor.start()
+        self._compressors.append(compressor)
+        self._open()
+
+    def _compress(self, rotated: Path):
+        try:
+            with zipfile.ZipFile(f"{rotated}.zip", 'w', zipfile.ZIP_DEFLATED) as zf:
+                zf.write(rotated, arcname=rotated.name)
+            rotated.unlink()
+            # 清理超过保留天数的压缩日志
+            deadline = time.time() - self.retention * 86400
+            for old in self.path.parent.glob(f"{self.path.stem}.*{self.path.suffix}.zip"):
+                if old.stat().st_mtime < deadline:
+                    old.unlink()
+        except OSError as e:
+            sys.stderr.write(f"日志压缩失败 {rotated}: {e}\n")
+
+    def _before_fork(self):
+        """
+        fork 之前把文件缓冲写入文件，否则子进程关闭继承的文件对象时会重复写入这部分日志。
+        写入锁一直持有到 fork 完成，父进程中由 _after_fork_in_parent 释放。
+        """
+        self._write_lock.acquire()
+        if self._file is not None:
+            self._file.flush()
+
+    def _after_fork_in_parent(self):
+        self._write_lock.release()
+
+    def _after_fork_in_child(self):
+        """
+        子进程中写入线程不存在了，父进程队列中的日志由父进程写入。
+        子进程使用新的队列、锁和写入线程，并重新打开日志文件（追加模式，多个进程写同一个文件）。
+        """
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._compressors = []
+        if not self._stopping:
+            self._writer = threading.Thread(target=self._run, name='AsyncFileSink', daemon=True)
+            self._writer.start()
+
+    def stop(self):
+        """写入队列中剩余的日志并等待压缩完成，程序退出时自动调用"""
+        if self._stopping:
+            return
+        # 先设置标志再放入哨兵，之后的日志直接同步写入，不会留在写入线程退出后的队列中
+        self._stopping = True
+        self._queue.put(_STOP)
+        self._writer.join()
+        # 设置标志之前已经通过检查的日志可能排在哨兵之后
+        batch = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                batch.append(item)
+        if batch:
+            self._write_batch(batch)
+        for compressor in list(self._compressors):
+            compressor.join()
+        with self._write_lock:
+            if self._file is not None:
+                self._file.flush()
+
+
 # 自定义一个函数来模拟 logging.getLogger 的行为
 def get_logger(name=None):
     # 对于 loguru，我们不需要传递 name 参数，因为它使用全局的单例 logger。
@@ -32,10 +262,13 @@ def get_logger(name=None):
     class ProxyLogger:
         def __getattr__(self, item):
             # 当尝试访问 ProxyLogger 的属性（如 info, error 等）时，
-            # 将其重定向到 loguru_logger 的相应方法，并绑定一个额外的 context（如果需要）。
-            # 这里我们简单地返回 loguru_logger 的方法，不传递 name，因为 loguru 不需要它。
+            # 将其重定向到 loguru_logger 的相应方法。
+            # 第一次访问时把绑定方法缓存到实例上，之后的访问直接命中实例属性，不再进入 __getattr__，
+            # 也不会每次都创建新的函数对象。
             # 如果您想在日志中包含模块名或其他上下文，您可能需要修改这里的实现。
-            return lambda *args, **kwargs: getattr(loguru_logger, item)(*args, **kwargs)
+            attr = getattr(loguru_logger, item)
+            setattr(self, item, attr)
+            return attr
 
     # 创建一个 ProxyLogger 实例，并返回它。
     # 注意：这个实例实际上并不持有任何状态，它只是一个到 loguru_logger 的代理。
@@ -46,24 +279,142 @@ def get_logger(name=None):
 # 如果您的项目中有多个地方尝试配置 logger，则可能需要确保这些配置是幂等的或只执行一次。
 
 # 添加文件处理器
-loguru_logger.add(log_file_path,
-                  format="{time:YYYY-MM-DD HH:mm:ss} - {level} - {message}",
-                  rotation="500 MB",
-                  retention="10 days",
-                  compression="zip",
-                  level=log_level)
+async_file_sink = None
+if async_logging:
+    # 异步模式：写文件、轮转和压缩都在后台线程中完成
+    async_file_sink = AsyncFileSink(log_file_path,
+                                    queue_size=async_queue_size,
+                                    batch_size=async_batch_size,
+                                    flush_interval=async_flush_interval,
+                                    overflow_policy=async_overflow_policy)
+    # atexit 按注册的相反顺序执行，线程池在本模块之后创建，
+    # 因此会先关闭线程池，任务中产生的日志随后在这里写完
+    atexit.register(async_file_sink.stop)
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(before=async_file_sink._before_fork,
+                            after_in_parent=async_file_sink._after_fork_in_parent,
+                            after_in_child=async_file_sink._after_fork_in_child)
+
+
+# 当前使用的一组处理器的编号，切换日志等级时加一
+_handler_generation = 0
+
+
+def _generation_filter(generation):
+    """
+    只有当前使用的一组处理器输出日志。切换日志等级时新旧两组处理器短暂共存，
+    一条日志第一次经过过滤器时记下当时的编号，之后的处理器都按这个编号判断，因此只由其中一组输出。
+    """
+    def accept(record):
+        return record['extra'].setdefault('_handler_generation', _handler_generation) == generation
+    return accept
 
-# 如果需要将日志输出到控制台，则添加控制台处理器
-if log_to_console:
-    loguru_logger.add(sys.stdout,
-                      format="{time:YYYY-MM-DD HH:mm:ss} - {level} - {message}",
-                      level=log_level)
+
+def _add_handlers(level, generation=0) -> list:
+    """按日志等级添加属于第 generation 组的文件处理器（和控制台处理器），返回处理器的 id"""
+    accept = _generation_filter(generation)
+    if async_file_sink is not None:
+        # AsyncFileSink 只有 __call__，loguru 移除处理器时不会停止它
+        ids = [loguru_logger.add(async_file_sink,
+                                 format="{time:YYYY-MM-DD HH:mm:ss} - {level} - {message}",
+                                 level=level,
+                                 filter=accept)]
+    elif rotate:
+        ids = [loguru_logger.add(log_file_path,
+                                 format="{time:YYYY-MM-DD HH:mm:ss} - {level} - {message}",
+                                 rotation="500 MB",
+                                 retention="10 days",
+                                 compression="zip",
+                                 level=level,
+                                 filter=accept)]
+    else:
+        # loguru 在处理器关闭时也会压缩文件，不轮转时同样不压缩
+        ids = [loguru_logger.add(log_file_path,
+                                 format="{time:YYYY-MM-DD HH:mm:ss} - {level} - {message}",
+                                 level=level,
+                                 filter=accept)]
+    # 如果需要将日志输出到控制台，则添加控制台处理器
+    if log_to_console:
+        ids.append(loguru_logger.add(sys.stdout,
+                                     format="{time:YYYY-MM-DD HH:mm:ss} - {level} - {message}",
+                                     level=level,
+                                     filter=accept))
+    return ids
+
+
+_handler_ids = _add_handlers(log_level)
+_handlers_lock = threading.Lock()
+
+
+# 配置的日志等级对应的数值，低于该等级的日志不会被任何处理器输出
+log_level_no = loguru_logger.level(log_level).no
+# 延迟格式化的 logger，参数是可调用对象，只有日志真正输出时才会被调用
+_lazy_logger = loguru_logger.opt(lazy=True)
+
+
+def set_log_level(level):
+    """
+    运行中修改日志等级：先按新的等级添加下一组处理器，切换当前组的编号后再移除旧的处理器，
+    切换过程中的日志只由其中一组输出，不会丢失也不会重复。
+    log_decorator 装饰的函数在调用时比较 log_level_no，修改后已经装饰的函数也立即按新的等级记录。
+
+    :param level: 日志等级，例如 'DEBUG'
+    """
+    global log_level, log_level_no, _handler_ids, _handler_generation
+    level = level.upper()
+    level_no = loguru_logger.level(level).no  # 等级不存在时抛出 ValueError
+    with _handlers_lock:
+        generation = _handler_generation + 1
+        old_ids, _handler_ids = _handler_ids, _add_handlers(level, generation)
+        _handler_generation = generation
+        for handler_id in old_ids:
+            loguru_logger.remove(handler_id)
+        log_level, log_level_no = level, level_no
+
+
+def disable_rotation():
+    """
+    关闭日志文件的大小轮转和压缩，在 fork 出多个共同写日志文件的工作进程之前调用。
+    之后日志文件不会自动轮转，需要由外部工具（例如 logrotate 的 copytruncate）处理。
+    """
+    global rotate
+    if not rotate:
+        return
+    rotate = False
+    if async_file_sink is not None:
+        async_file_sink.rotation = None
+    else:
+        set_log_level(log_level)
+
+
+def on_config_changed(changes):
+    """
+    config/changed 事件的处理器：[logger] log_level 修改后立即生效。
+    切换失败时记录错误日志，不抛出异常，同一事件的其他处理器仍然执行。
+
+    :param changes: {(节, 配置项): (旧值, 新值)}
+    """
+    _, level = changes.get(('logger', 'log_level'), (None, None))
+    if level is not None and level != log_level:
+        try:
+            set_log_level(level)
+        except Exception as e:
+            logger.error(f"日志等级调整为{level}失败：{e}")
+            return
+        logger.warning(f"日志等级调整为{level}")
+
+
+def _format_args(args, kwargs):
+    return ', '.join([f"{k}={v}" for k, v in kwargs.items()]) if kwargs else ', '.join(map(str, args))
 
 
 def log_decorator(_log_level):
     """
     创建一个装饰器，用于在被装饰的函数调用时记录日志。
 
+    调用时先比较日志等级的数值：低于当前的 log_level 时直接调用原函数，只有一次整数比较的开销，
+    运行中修改 log_level（set_log_level）后立即生效；否则参数字符串只在日志真正输出时才会生成。
+
     参数:
     log_level (str): 要记录的日志等级（'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'）。
 
@@ -71,38 +422,31 @@ def log_decorator(_log_level):
     function: 一个装饰了日志记录功能的函数。
     """
     def decorator(func):
+        func_name = func.__name__
+        level = _log_level.upper() if isinstance(_log_level, str) else _log_level
+        try:
+            level_no = loguru_logger.level(level).no
+        except (ValueError, TypeError):
+            # 如果提供了无效的日志等级，记录一个错误日志，函数不做装饰
+            logger.error(f"Invalid log level '{_log_level}' for function {func_name}")
+            return func
+
+        message = f"Calling {func_name} with args: {{}}"
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # 获取函数名和参数，用于日志记录
-            func_name = func.__name__
-            args_str = ', '.join([f"{k}={v}" for k, v in kwargs.items()]) if kwargs else ', '.join(map(str, args))
-
+            if level_no < log_level_no:
+                return func(*args, **kwargs)
             # 记录日志
-            if _log_level == "DEBUG":
-                logger.debug(f"Calling {func_name} with args: {args_str}")
-            elif _log_level == "INFO":
-                logger.info(f"Calling {func_name} with args: {args_str}")
-            elif _log_level == "WARNING":
-                logger.warning(f"Calling {func_name} with args: {args_str}")
-            elif _log_level == "ERROR":
-                logger.error(f"Calling {func_name} with args: {args_str}")
-            elif _log_level == "CRITICAL":
-                logger.critical(f"Calling {func_name} with args: {args_str}")
-            else:
-                # 如果提供了无效的日志等级，记录一个错误日志
-                logger.error(f"Invalid log level '{_log_level}' for function {func_name}")
-
+            _lazy_logger.log(level, message, lambda: _format_args(args, kwargs))
             # 调用原始函数并返回结果
-            result = func(*args, **kwargs)
-            return result
+            return func(*args, **kwargs)
 
         return wrapper
 
     return decorator
 
 
-
-
 # 提供一个全局的 logger 实例，供项目中的其他模块使用。
 # 由于 loguru 是单例的，理论上我们不需要这样做，但为了兼容和减少改动，我们还是提供一个。
 logger = get_logger()
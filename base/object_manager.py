@@ -1,7 +1,65 @@
+import bisect
+import contextvars
+import itertools
+import threading
+from contextlib import contextmanager
+
+# 当前线程（上下文）中存储的对象归属于谁，见 ObjectManager.owned_by
+_owner = contextvars.ContextVar('object_manager_owner', default=None)
+
+
 class ObjectManager:
+    # 查询缓存的最大条目数，超过后清空，防止大量不同的查询参数占用内存
+    max_cached_queries = 1024
+
     def __init__(self):
         self._objects = {}  # 使用字典来存储对象
+        self._sorted_keys = []  # 按字典序排列的键，用于前缀搜索
+        self._positions = {}  # 键 -> 存储的顺序，查询结果按存储的顺序排列
+        self._next_position = itertools.count()
+        self._type_index = {}  # 对象的具体类型 -> 该类型对象的键（用 dict 作为有序集合）
+        self._search_cache = {}  # 前缀 -> search 的结果
+        self._type_cache = {}  # 类型 -> get_by_type 的结果
+        self._lock = threading.RLock()
+        self._factories = {}  # 键 -> (factory, singleton, deps)，延迟构造的对象
+        self._factory_locks = {}  # 键 -> 构造该对象时使用的锁
+        self._resolving = threading.local()  # 当前线程正在构造的键，用于检测 factory 中未声明的循环依赖
+        self._owned = {}  # 归属 -> 在 owned_by 中存储或注册的键
+
+    def _record_owner(self, key: str):
+        owner = _owner.get()
+        if owner is not None:
+            self._owned.setdefault(owner, {})[key] = None
+
+    def _set(self, key: str, value):
+        """写入对象并维护索引，调用方需持有 self._lock"""
+        self._record_owner(key)
+        if key in self._objects:
+            self._unindex_type(key, self._objects[key])
+        else:
+            bisect.insort(self._sorted_keys, key)
+            self._positions[key] = next(self._next_position)
+        self._objects[key] = value
+        self._type_index.setdefault(type(value), {})[key] = None
+        self._invalidate()
+
+    def _unindex_type(self, key: str, value):
+        keys = self._type_index.get(type(value))
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del self._type_index[type(value)]
+
+    def _invalidate(self):
+        """任何修改都会使查询缓存失效"""
+        self._search_cache.clear()
+        self._type_cache.clear()
 
+    def _remember(self, cache: dict, query, result: tuple) -> tuple:
+        if len(cache) >= self.max_cached_queries:
+            cache.clear()
+        cache[query] = result
+        return result
 
     def store(self, key: str, value):
         """
@@ -13,7 +71,9 @@ class ObjectManager:
         """
         if value is None:
             raise ValueError("Cannot store a None value.")
-        self._objects[key] = value
+        with self._lock:
+            self._set(key, value)
+
     def get(self, key: str):
         """
         使用字符串精确获取变量。如果失败则返回 KeyError。
@@ -21,26 +81,212 @@ class ObjectManager:
         :param key: 字符串索引
         :return: 存储的对象，如果失败则引发 KeyError
         """
-        return self._objects[key]
+        try:
+            return self._objects[key]
+        except KeyError:
+            provider = self._factories.get(key)
+            if provider is None:
+                raise
+        return self._resolve(key, provider)
+
+    def register_factory(self, key: str, factory, singleton: bool = True, deps=()):
+        """
+        注册延迟构造的对象，第一次 get(key) 时才调用 factory 构造。
+            om.register_factory("sql_engine", create_engine_from_config)
+            om.register_factory("sql_db", sessionmaker_for, deps=("sql_engine",))
+
+        单例对象构造后会像 store 一样存入管理器，多个线程同时 get 时只会构造一次。
+        尚未构造的对象不会出现在 search、get_by_type 和 get_list 的结果中。
+        如果该键已经存储了对象，旧对象会被移除。
+
+        :param key: 字符串索引
+        :param factory: 构造对象的可调用对象，依赖的对象按 deps 的顺序作为参数传入，不能返回 None
+        :param singleton: True 只构造一次；False 每次 get 都重新构造且不存储
+        :param deps: 依赖的其它键，构造前会先通过 get 获取（依赖也可以是延迟对象）。
+                     factory 中需要的其它延迟对象都应在 deps 中声明，循环依赖在注册时检查
+        :raises TypeError: 如果 factory 不可调用
+        :raises RuntimeError: 如果 deps 与已注册的工厂构成循环依赖
+        """
+        if not callable(factory):
+            raise TypeError(f"Factory for '{key}' is not callable.")
+        deps = tuple(deps)
+        with self._lock:
+            self._check_cycle(key, deps)
+            self._record_owner(key)
+            self._factories[key] = (factory, singleton, deps)
+            self._factory_locks.setdefault(key, threading.Lock())
+            if key in self._objects:
+                self._remove(key)
+
+    def _check_cycle(self, key: str, deps):
+        """
+        沿已注册工厂的依赖图检查 key 的依赖是否又依赖 key，调用方需持有 self._lock。
+        循环依赖在注册时就能发现，而不是在多个线程同时构造（例如并行预热）时互相等待对方的锁。
+        """
+        stack = [(dep, (key, dep)) for dep in deps]
+        seen = set()
+        while stack:
+            current, path = stack.pop()
+            if current == key:
+                raise RuntimeError(f"Circular dependency: {' -> '.join(path)}")
+            if current in seen:
+                continue
+            seen.add(current)
+            provider = self._factories.get(current)
+            if provider is not None:
+                stack.extend((dep, path + (dep,)) for dep in provider[2])
+
+    def unregister_factory(self, key: str):
+        """
+        注销延迟构造的对象。已经构造好的单例对象仍然保留。
+
+        :param key: 字符串索引
+        :return: 布尔值，表示是否注销了工厂
+        """
+        with self._lock:
+            self._factory_locks.pop(key, None)
+            return self._factories.pop(key, None) is not None
+
+    def prewarm(self, keys, pool=None):
+        """
+        预先构造指定的延迟对象，避免第一次使用时才付出构造的开销。
+        传入线程池时并行构造，否则在当前线程依次构造。
+
+        :param keys: 要预热的键
+        :param pool: 线程池，如 tp（使用 submit_task）或 concurrent.futures.Executor（使用 submit）
+        :return: 构造失败的键到异常的字典，全部成功时为空字典
+        """
+        errors = {}
+        if pool is None:
+            for key in keys:
+                try:
+                    self.get(key)
+                except Exception as e:
+                    errors[key] = e
+            return errors
+        submit = getattr(pool, 'submit_task', None) or pool.submit
+        futures = {key: submit(self.get, key) for key in keys}
+        for key, future in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                errors[key] = e
+        return errors
+
+    @contextmanager
+    def owned_by(self, owner):
+        """
+        在上下文中存储或注册的键都记录为归属于 owner，之后可以通过 delete_owned 一次性删除。
+        归属只在当前线程（上下文）中生效，例如插件导入时使用插件名，重载插件时删除它注册的全部对象。
+            with om.owned_by("plugins/sample"):
+                om.store("sample/conn", conn)
+
+        :param owner: 归属，任意可哈希对象
+        """
+        token = _owner.set(owner)
+        try:
+            yield
+        finally:
+            _owner.reset(token)
+
+    def keys_owned_by(self, owner):
+        """
+        获取归属于 owner 的键。
+
+        :param owner: 归属
+        :return: 键的列表
+        """
+        with self._lock:
+            return list(self._owned.get(owner, ()))
+
+    def delete_owned(self, owner):
+        """
+        删除归属于 owner 的全部对象和工厂。
+
+        :param owner: 归属
+        :return: 被删除的键的列表
+        """
+        with self._lock:
+            keys = list(self._owned.pop(owner, ()))
+            return [key for key in keys if self.delete(key)]
+
+    def _resolve(self, key: str, provider):
+        """构造延迟对象，单例使用双重检查锁"""
+        factory, singleton, deps = provider
+        stack = self._resolving.__dict__.setdefault('stack', [])
+        if key in stack:
+            raise RuntimeError(f"Circular dependency: {' -> '.join(stack + [key])}")
+        stack.append(key)
+        try:
+            if not singleton:
+                return self._build(key, factory, deps)
+            with self._lock:
+                lock = self._factory_locks.setdefault(key, threading.Lock())
+            with lock:
+                try:
+                    return self._objects[key]
+                except KeyError:
+                    pass
+                value = self._build(key, factory, deps)
+                with self._lock:
+                    # 构造期间工厂被注销或替换时，不存储旧工厂构造的对象
+                    if self._factories.get(key) is provider:
+                        self._set(key, value)
+                return value
+        finally:
+            stack.pop()
+
+    def _build(self, key: str, factory, deps):
+        value = factory(*[self.get(dep) for dep in deps])
+        if value is None:
+            raise ValueError(f"Factory for '{key}' returned None.")
+        return value
 
     def search(self, prefix: str):
         """
         使用字符串前缀搜索变量，并返回匹配的对象引用元组。
+        通过有序键列表二分查找，耗时与匹配数量相关而与对象总数无关；结果按存储的顺序排列，
+        并缓存到下一次修改为止。
 
         :param prefix: 字符串前缀，如 "int/"
         :return: 匹配的对象引用元组，如果没有匹配则返回空元组
         """
-        matches = [value for key, value in self._objects.items() if key.startswith(prefix)]
-        return tuple(matches)
+        cached = self._search_cache.get(prefix)
+        if cached is not None:
+            return cached
+        with self._lock:
+            keys = self._sorted_keys
+            matches = []
+            i = bisect.bisect_left(keys, prefix)
+            while i < len(keys) and keys[i].startswith(prefix):
+                matches.append(keys[i])
+                i += 1
+            matches.sort(key=self._positions.__getitem__)
+            return self._remember(self._search_cache, prefix, tuple(self._objects[key] for key in matches))
 
     def delete(self, key: str):
         """
         使用字符串精确删除某变量。如果成功返回 True，否则返回 False。
 
+        已注册的工厂也会一并注销。
+
         :param key: 字符串索引
         :return: 布尔值，表示删除操作是否成功
         """
-        return key in self._objects and (self._objects.pop(key, None) is not None)
+        with self._lock:
+            unregistered = self.unregister_factory(key)
+            if key not in self._objects:
+                return unregistered
+            return self._remove(key) is not None or unregistered
+
+    def _remove(self, key: str):
+        """移除对象并维护索引，返回被移除的对象，调用方需持有 self._lock"""
+        value = self._objects.pop(key)
+        del self._sorted_keys[bisect.bisect_left(self._sorted_keys, key)]
+        del self._positions[key]
+        self._unindex_type(key, value)
+        self._invalidate()
+        return value
 
     def update(self, key: str, value):
         """
@@ -49,17 +295,28 @@ class ObjectManager:
         :param key: 字符串索引
         :param value: 要存储的新对象
         """
-        self._objects[key] = value  # 这里不再检查 value 是否为空，因为存储空值是合法的
+        with self._lock:
+            self._set(key, value)  # 这里不再检查 value 是否为空，因为存储空值是合法的
 
     def get_by_type(self, obj_type):
         """
         使用类型来搜索全部变量，并返回匹配的对象引用元组。
+        只需要检查已存储对象的具体类型（通常远少于对象数量）是否为 obj_type 的子类，
+        子类、抽象基类和类型元组都按 isinstance 的规则匹配，结果按存储的顺序排列，并缓存到下一次修改为止。
 
         :param obj_type: 要搜索的类型
         :return: 匹配的对象引用元组，如果没有匹配则返回空元组
         """
-        matches = [value for value in self._objects.values() if isinstance(value, obj_type)]
-        return tuple(matches)
+        cached = self._type_cache.get(obj_type)
+        if cached is not None:
+            return cached
+        with self._lock:
+            matches = []
+            for value_type, keys in self._type_index.items():
+                if issubclass(value_type, obj_type):
+                    matches.extend(keys)
+            matches.sort(key=self._positions.__getitem__)
+            return self._remember(self._type_cache, obj_type, tuple(self._objects[key] for key in matches))
 
     def get_list(self):
         """
@@ -1,8 +1,30 @@
+import asyncio
+import configparser
+import functools
 import os
+import importlib
 import importlib.util
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
-from project import logger
+from project import logger, config
+
+# 并行导入插件的线程数
+import_workers = int(config['plugins'].get('import_workers', fallback=4))
+# 插件导入耗时预算（毫秒），超出时输出警告，插件清单中可以单独设置
+default_import_budget_ms = float(config['plugins'].get('import_budget_ms', fallback=200))
+# 热重载配置
+hot_reload = config['plugins'].getboolean('hot_reload', fallback=False)
+hot_reload_interval = float(config['plugins'].get('hot_reload_interval', fallback=1.0))
+drain_timeout = float(config['plugins'].get('drain_timeout', fallback=10))
+# 生命周期配置
+startup_timeout = float(config['plugins'].get('startup_timeout', fallback=30))
+shutdown_timeout = float(config['plugins'].get('shutdown_timeout', fallback=10))
+startup_fail_fast = config['plugins'].getboolean('startup_fail_fast', fallback=False)
+
+
 class PluginInfo:
     def __init__(self, name: str, version: str, info: dict = None):
         """
@@ -28,48 +50,751 @@ class PluginInfo:
             'info': self.info
         }
 
+class PluginGate:
+    """
+    插件调用闸门。热重载时关闭闸门，等待正在进行的调用结束，重载期间的新调用会等待重载完成。
+    同一线程中的嵌套调用不会被阻塞。
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._active = 0
+        self._closed = False
+        self._local = threading.local()
+
+    def enter(self, blocking: bool = True) -> bool:
+        """
+        进入闸门。
+
+        :param blocking: 闸门关闭时是否等待
+        :return: 是否成功进入
+        """
+        depth = getattr(self._local, 'depth', 0)
+        with self._cond:
+            if depth == 0:
+                while self._closed:
+                    if not blocking:
+                        return False
+                    self._cond.wait()
+            self._active += 1
+        self._local.depth = depth + 1
+        return True
+
+    def exit(self):
+        self._local.depth -= 1
+        with self._cond:
+            self._active -= 1
+            if self._active == 0:
+                self._cond.notify_all()
+
+    def close(self, timeout: float = None) -> bool:
+        """
+        关闭闸门并等待正在进行的调用结束。
+
+        :param timeout: 最长等待秒数
+        :return: 调用是否已经全部结束
+        """
+        with self._cond:
+            self._closed = True
+            return self._cond.wait_for(lambda: self._active == 0, timeout)
+
+    def open(self):
+        with self._cond:
+            self._closed = False
+            self._cond.notify_all()
+
+
+# 插件名 -> 调用闸门，闸门在插件重载前后保持不变
+_gates: Dict[str, PluginGate] = {}
+_gates_lock = threading.Lock()
+
+
+def get_gate(name: str) -> PluginGate:
+    with _gates_lock:
+        if name not in _gates:
+            _gates[name] = PluginGate()
+        return _gates[name]
+
+
+async def _call(fn, *args):
+    """调用 fn，async 函数直接等待，同步函数放到线程中执行，避免阻塞事件循环"""
+    if asyncio.iscoroutinefunction(fn):
+        return await fn(*args)
+    result = await asyncio.to_thread(fn, *args)
+    if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+        result = await result
+    return result
+
+
+class PluginPool:
+    """
+    插件声明的资源池（数据库连接、缓存等）。应用启动时创建并预热，应用关闭时关闭。
+    """
+
+    # 未指定 close 时依次尝试的关闭方法
+    close_methods = ('aclose', 'dispose', 'close')
+
+    def __init__(self, name: str, create, warm=None, close=None):
+        """
+        :param name: 资源池名称
+        :param create: 创建资源池的函数（可以是 async 函数），返回资源池对象
+        :param warm: 预热函数（可以是 async 函数），参数为资源池对象
+        :param close: 关闭函数（可以是 async 函数），参数为资源池对象，默认调用资源池的 aclose/dispose/close
+        """
+        self.name = name
+        self.create = create
+        self.warm = warm
+        self.close = close
+        self.resource = None
+
+    async def open(self):
+        self.resource = await _call(self.create)
+        if self.resource is None:
+            raise ValueError(f"资源池{self.name}的创建函数返回了空值")
+        if self.warm is not None:
+            await _call(self.warm, self.resource)
+
+    async def shutdown(self):
+        resource, self.resource = self.resource, None
+        if resource is None:
+            return
+        if self.close is not None:
+            await _call(self.close, resource)
+            return
+        for method in self.close_methods:
+            if hasattr(resource, method):
+                await _call(getattr(resource, method))
+                return
+
+
 class Plugin:
     def __init__(self, info: PluginInfo):
-        # self.fn = None
         self.info = info
+        self.startup_hooks = []
+        self.shutdown_hooks = []
+        self.pools: Dict[str, PluginPool] = {}
+        # 单个插件启动/关闭的超时秒数，为 None 时使用配置 [plugins] startup_timeout/shutdown_timeout
+        self.startup_timeout: float = None
+        self.shutdown_timeout: float = None
+        self.started = False
     def get_info(self) -> PluginInfo:
         return self.info
-    # def reg_init_plugin_func(self,fn):
-    #     self.fn = fn
-    # def run(self):
-    #
-    #     logger.info(f"初始化插件:{self.info.name}")
-    #     self.fn()
-    #     logger.info(f"初始化插件:{self.info.name}完成")
 
+    @property
+    def gate(self) -> PluginGate:
+        return get_gate(self.info.name)
 
-def load_plugins(plugin_dir: str = "plugins") -> List[Plugin]:
-    plugins = []
-    for plugin_name in os.listdir(plugin_dir):
-        plugin_path = os.path.join(plugin_dir, plugin_name)
-        if os.path.isdir(plugin_path) and os.path.exists(os.path.join(plugin_path, 'space.py')):
-            spec = importlib.util.spec_from_file_location(f"{plugin_name}.space", os.path.join(plugin_path, 'space.py'))
-            module = importlib.util.module_from_spec(spec)
-            sys.modules[f"{plugin_name}.space"] = module
-            spec.loader.exec_module(module)
+    def guarded(self, fn):
+        """
+        装饰器，被装饰的函数（可以是 async 函数）纳入插件的调用闸门：
+        热重载会等待这些函数正在进行的调用结束后才卸载插件。
+            @plugin.guarded
+            def handle(data):
+                ...
+        """
+        gate = self.gate
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                # 不阻塞事件循环，闸门关闭时让出控制权等待
+                while not gate.enter(blocking=False):
+                    await asyncio.sleep(0.01)
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    gate.exit()
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            gate.enter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                gate.exit()
+        return wrapper
+
+    def on_startup(self, fn):
+        """
+        装饰器，注册应用启动时执行的函数（可以是 async 函数），在插件的资源池预热完成后按注册顺序执行。
+            @plugin.on_startup
+            async def startup():
+                ...
+        """
+        self.startup_hooks.append(fn)
+        return fn
+
+    def on_shutdown(self, fn):
+        """
+        装饰器，注册应用关闭时执行的函数（可以是 async 函数），在关闭资源池之前按注册的相反顺序执行。
+        """
+        self.shutdown_hooks.append(fn)
+        return fn
+
+    def add_pool(self, name: str, create, warm=None, close=None) -> PluginPool:
+        """
+        声明资源池，应用启动时创建并预热，之后可以通过 plugin.pool(name) 或 om 的 plugins/<插件名>/pools/<name> 获取。
+
+        :param name: 资源池名称
+        :param create: 创建资源池的函数（可以是 async 函数）
+        :param warm: 预热函数（可以是 async 函数），参数为资源池对象
+        :param close: 关闭函数（可以是 async 函数），参数为资源池对象
+        :raises ValueError: 如果资源池名称重复
+        """
+        if name in self.pools:
+            raise ValueError(f"插件{self.info.name}的资源池{name}已存在")
+        pool = PluginPool(name, create, warm, close)
+        self.pools[name] = pool
+        return pool
+
+    def pool(self, name: str):
+        """
+        获取已创建的资源池对象。
+
+        :raises KeyError: 如果资源池不存在
+        :raises RuntimeError: 如果资源池还没有创建
+        """
+        resource = self.pools[name].resource
+        if resource is None:
+            raise RuntimeError(f"插件{self.info.name}的资源池{name}还没有创建")
+        return resource
+
+    async def startup(self):
+        """并发创建并预热所有资源池，然后依次执行启动函数"""
+        from project import om
+        await asyncio.gather(*(pool.open() for pool in self.pools.values()))
+        for name, pool in self.pools.items():
+            om.update(f"{_owner(self.info.name)}/pools/{name}", pool.resource)
+        for hook in self.startup_hooks:
+            await _call(hook)
+        self.started = True
+
+    async def shutdown(self):
+        """依次执行关闭函数，然后关闭所有资源池。单个函数失败不影响其余的清理"""
+        self.started = False
+        for hook in reversed(self.shutdown_hooks):
+            try:
+                await _call(hook)
+            except Exception as e:
+                logger.error(f"插件{self.info.name}的关闭函数{getattr(hook, '__name__', hook)}失败: {e}")
+        await self.close_pools()
+
+    async def close_pools(self):
+        """按声明的相反顺序关闭已创建的资源池"""
+        from project import om
+        for name, pool in reversed(list(self.pools.items())):
+            try:
+                await pool.shutdown()
+            except Exception as e:
+                logger.error(f"插件{self.info.name}的资源池{name}关闭失败: {e}")
+            om.delete(f"{_owner(self.info.name)}/pools/{name}")
+
+
+class PluginManifest:
+    def __init__(self, name: str, path: str, version: str = None, lazy: bool = False,
+                 import_budget_ms: float = None, info: dict = None):
+        """
+        插件清单，从插件目录下的 plugin.ini 读取，不需要执行插件代码。
+            [plugin]
+            version = 0.0.1
+            lazy = True
+            import_budget_ms = 500
+            ; 其余键作为插件信息
+
+        :param name: 插件目录名
+        :param path: 插件目录
+        :param version: 插件版本
+        :param lazy: 是否延迟到第一次使用时才导入
+        :param import_budget_ms: 导入耗时预算（毫秒），为 None 时使用配置 [plugins] import_budget_ms
+        :param info: 其余信息
+        """
+        self.name = name
+        self.path = path
+        self.version = version
+        self.lazy = lazy
+        self.import_budget_ms = default_import_budget_ms if import_budget_ms is None else import_budget_ms
+        self.info = info if info else {}
+
+
+def read_manifest(plugin_name: str, plugin_path: str) -> PluginManifest:
+    """
+    读取插件清单。没有 plugin.ini 时使用默认值：启动时导入，使用全局导入耗时预算。
+
+    :param plugin_name: 插件目录名
+    :param plugin_path: 插件目录
+    :return: 插件清单
+    """
+    parser = configparser.ConfigParser()
+    parser.read(os.path.join(plugin_path, 'plugin.ini'), encoding='utf-8')
+    if not parser.has_section('plugin'):
+        return PluginManifest(plugin_name, plugin_path)
+    section = parser['plugin']
+    budget = section.get('import_budget_ms', fallback=None)
+    info = {k: v for k, v in section.items() if k not in ('name', 'version', 'lazy', 'import_budget_ms')}
+    return PluginManifest(
+        name=plugin_name,
+        path=plugin_path,
+        version=section.get('version', fallback=None),
+        lazy=section.getboolean('lazy', fallback=False),
+        import_budget_ms=float(budget) if budget else None,
+        info=info,
+    )
+
+
+class LazyPlugin(Plugin):
+    """
+    延迟加载的插件。启动时只读取插件清单，第一次调用 load() 时才导入 space.py。
+    """
+
+    def __init__(self, manifest: PluginManifest):
+        super().__init__(PluginInfo(manifest.name, manifest.version, manifest.info))
+        self.manifest = manifest
+        self._plugin = None
+        self._lock = threading.Lock()
+        # 在事件循环线程中第一次导入时创建的启动任务
+        self._startup = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._plugin is not None
+
+    def load(self) -> Plugin:
+        """
+        导入插件（只会导入一次）并返回 space.py 中的插件对象。
+        应用已经启动时，第一次导入的插件随即启动：在其他线程中调用时等待启动完成；
+        在事件循环线程中调用时不能阻塞事件循环，只创建启动任务，返回时插件可能尚未启动完成，
+        需要等待启动完成时使用 await aload()。
+
+        :raises TypeError: 如果 space.py 中没有正确定义 plugin_info 和 plugin
+        """
+        if self._plugin is None:
+            with self._lock:
+                if self._plugin is None:
+                    self._plugin = _import_plugin(self.manifest)
+                    if _loop is not None:
+                        self._startup = _run_lifecycle(start_plugin(self._plugin))
+        return self._plugin
+
+    async def aload(self) -> Plugin:
+        """
+        在事件循环中使用：导入插件并等待它的启动完成。
 
-            # 尝试从模块中获取PluginInfo和Plugin对象以及init_plugin函数
+        :raises TypeError: 如果 space.py 中没有正确定义 plugin_info 和 plugin
+        """
+        plugin = self.load()
+        if self._startup is not None:
+            await self._startup
+        return plugin
+
+    def get_info(self) -> PluginInfo:
+        # 未导入时使用清单中的信息
+        return self._plugin.get_info() if self._plugin is not None else self.info
+
+
+# 已发现的插件，插件名 -> 插件对象（延迟插件为 LazyPlugin）
+plugins: Dict[str, Plugin] = {}
+# 插件导入耗时记录，插件名 -> {'name', 'seconds', 'budget_ms', 'over_budget'}
+_import_times: Dict[str, Dict[str, Any]] = {}
+_import_times_lock = threading.Lock()
+
+
+def _import_plugin(manifest: PluginManifest) -> Plugin:
+    """导入插件的 space.py，记录导入耗时并返回其中的插件对象"""
+    from project import om
+    plugin_name = manifest.name
+    spec = importlib.util.spec_from_file_location(f"{plugin_name}.space", os.path.join(manifest.path, 'space.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[f"{plugin_name}.space"] = module
+    start = time.perf_counter()
+    # 插件导入时存储到 om 的对象记录为归属于该插件，重载时一并删除
+    with om.owned_by(_owner(plugin_name)):
+        spec.loader.exec_module(module)
+    _record_import_time(manifest, time.perf_counter() - start)
+
+    # 尝试从模块中获取PluginInfo和Plugin对象
+    plugin_info = getattr(module, 'plugin_info', None)
+    plugin_class_instance = getattr(module, 'plugin', None)
+    # 检查是否正确获取了所需的对象
+    if not isinstance(plugin_info, PluginInfo):
+        raise TypeError(f"Expected PluginInfo instance in {plugin_name}/space.py, got {type(plugin_info)}")
+    if not isinstance(plugin_class_instance, Plugin):
+        raise TypeError(
+            f"Expected Plugin instance in {plugin_name}/space.py, got {type(plugin_class_instance)}")
+    return plugin_class_instance
+
+
+def _owner(plugin_name: str) -> str:
+    return f"plugins/{plugin_name}"
+
+
+def _publish(plugin: Plugin, name: str):
+    """把插件注册到 om 的 plugins/<插件名>，延迟插件在第一次 om.get 时才导入"""
+    from project import om
+    plugins[name] = plugin
+    if isinstance(plugin, LazyPlugin):
+        om.register_factory(_owner(name), plugin.load)
+    else:
+        om.store(_owner(name), plugin)
+
+
+def _record_import_time(manifest: PluginManifest, seconds: float):
+    over_budget = seconds * 1000 > manifest.import_budget_ms
+    with _import_times_lock:
+        _import_times[manifest.name] = {
+            'name': manifest.name,
+            'seconds': seconds,
+            'budget_ms': manifest.import_budget_ms,
+            'over_budget': over_budget,
+        }
+    if over_budget:
+        logger.warning(f"插件{manifest.name}导入耗时{seconds * 1000:.1f}ms，超出预算{manifest.import_budget_ms:g}ms")
+    else:
+        logger.info(f"插件{manifest.name}导入耗时{seconds * 1000:.1f}ms")
+
+
+def plugin_import_report() -> List[Dict[str, Any]]:
+    """
+    获取插件导入耗时报告。
+
+    :return: 每个已导入插件的名称、耗时（秒）、预算（毫秒）和是否超出预算，按耗时从高到低排序
+    """
+    with _import_times_lock:
+        return sorted(_import_times.values(), key=lambda row: row['seconds'], reverse=True)
+
+
+def get_plugin(name: str) -> Plugin:
+    """
+    获取插件对象，延迟插件会在这里被导入。
+
+    :param name: 插件名
+    :return: space.py 中的插件对象
+    :raises KeyError: 如果插件不存在
+    """
+    plugin = plugins[name]
+    return plugin.load() if isinstance(plugin, LazyPlugin) else plugin
+
+
+def _plugin_modules(plugin_path: str) -> List[str]:
+    """找出 sys.modules 中所有来自插件目录的模块"""
+    root = os.path.abspath(plugin_path) + os.sep
+    return [name for name, module in list(sys.modules.items())
+            if os.path.abspath(getattr(module, '__file__', None) or '').startswith(root)]
+
+
+def unload_plugin(name: str, plugin_dir: str = "plugins"):
+    """
+    卸载插件：删除插件导入时存储到 om 的对象、注销插件模块中定义的事件处理器，并从 sys.modules 中移除插件模块。
+    调用方应当先关闭插件的调用闸门。
+
+    :param name: 插件名
+    :param plugin_dir: 插件目录
+    """
+    from project import om, ev
+    keys = om.delete_owned(_owner(name))
+    modules = _plugin_modules(os.path.join(plugin_dir, name))
+    handlers = ev.unregister_module(modules) if ev is not None else 0
+    for module_name in modules:
+        sys.modules.pop(module_name, None)
+    om.delete(_owner(name))
+    plugins.pop(name, None)
+    importlib.invalidate_caches()
+    logger.info(f"插件{name}已卸载：删除{len(keys)}个对象，注销{handlers}个事件处理器，移除{len(modules)}个模块")
+
+
+_reload_lock = threading.Lock()
+
+
+def reload_plugin(name: str, plugin_dir: str = "plugins", timeout: float = None):
+    """
+    在不重启进程的情况下重载插件。
+    先关闭插件的调用闸门并等待正在进行的调用结束，再卸载插件，然后重新导入 space.py 及其子模块，
+    插件会在导入时重新注册它的事件处理器和对象。插件目录已被删除时只卸载。
+
+    :param name: 插件名
+    :param plugin_dir: 插件目录
+    :param timeout: 等待调用结束的最长秒数，默认使用配置 [plugins] drain_timeout
+    :return: 新的插件对象，插件已被删除或加载失败时返回 None
+    """
+    gate = get_gate(name)
+    with _reload_lock:
+        if not gate.close(drain_timeout if timeout is None else timeout):
+            logger.warning(f"插件{name}仍有调用未结束，等待超时，继续重载")
+        try:
+            old_plugin = _loaded(plugins.get(name))
+            if old_plugin is not None and old_plugin.started and _loop is not None:
+                _run_lifecycle(stop_plugin(old_plugin))
+            if name in plugins or _plugin_modules(os.path.join(plugin_dir, name)):
+                unload_plugin(name, plugin_dir)
+            plugin_path = os.path.join(plugin_dir, name)
+            if not os.path.exists(os.path.join(plugin_path, 'space.py')):
+                return None
+            manifest = read_manifest(name, plugin_path)
+            plugin = LazyPlugin(manifest) if manifest.lazy else _import_plugin(manifest)
+            _publish(plugin, name)
+            if not manifest.lazy and _loop is not None:
+                _run_lifecycle(start_plugin(plugin))
+            logger.info(f"插件{name}重载完成")
+            return plugin
+        except Exception as e:
+            logger.error(f"插件{name}重载失败: {e}")
+            return None
+        finally:
+            gate.open()
+
+
+# 应用运行时的事件循环，startup_plugins 时记录，shutdown_plugins 后清空
+_loop: asyncio.AbstractEventLoop = None
+
+
+def _loaded(plugin: Plugin):
+    """返回已导入的插件对象，未导入的延迟插件返回 None"""
+    if isinstance(plugin, LazyPlugin):
+        return plugin._plugin
+    return plugin
+
+
+# 事件循环线程中创建的启动/关闭任务。事件循环只保存任务的弱引用，这里保持强引用直到任务完成
+_lifecycle_tasks = set()
+
+
+def _lifecycle_done(task: asyncio.Task):
+    _lifecycle_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"插件启动/关闭任务失败: {task.exception()}")
+
+
+def _run_lifecycle(coro):
+    """
+    在应用的事件循环中执行插件的启动/关闭。资源池可能绑定到事件循环，所以不能在其他事件循环中执行。
+    在事件循环线程中调用时（例如异步接口中第一次使用延迟插件）只能创建任务，不等待完成。
+
+    :return: 在事件循环线程中调用时返回创建的任务，否则等待完成后返回 None
+    """
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is _loop:
+        task = _loop.create_task(coro)
+        _lifecycle_tasks.add(task)
+        task.add_done_callback(_lifecycle_done)
+        return task
+    asyncio.run_coroutine_threadsafe(coro, _loop).result()
+    return None
+
+
+async def start_plugin(plugin: Plugin, timeout: float = None) -> bool:
+    """
+    启动单个插件，超时或失败时关闭已经创建的资源池，不执行关闭函数。
+
+    :param plugin: 插件对象
+    :param timeout: 超时秒数，默认使用插件的 startup_timeout 或配置 [plugins] startup_timeout
+    :return: 是否启动成功
+    """
+    from project import om
+    name = plugin.info.name
+    timeout = timeout or plugin.startup_timeout or startup_timeout
+    start = time.perf_counter()
+    try:
+        # 启动时存储到 om 的对象也归属于插件，重载时一并删除
+        with om.owned_by(_owner(name)):
+            await asyncio.wait_for(plugin.startup(), timeout)
+    except asyncio.TimeoutError:
+        logger.error(f"插件{name}启动超时（{timeout}秒）")
+    except Exception as e:
+        logger.error(f"插件{name}启动失败: {e}")
+    else:
+        logger.info(f"插件{name}启动完成，耗时{(time.perf_counter() - start) * 1000:.1f}ms")
+        return True
+    await plugin.close_pools()
+    return False
+
+
+async def stop_plugin(plugin: Plugin, timeout: float = None) -> bool:
+    """
+    关闭单个插件。
+
+    :param plugin: 插件对象
+    :param timeout: 超时秒数，默认使用插件的 shutdown_timeout 或配置 [plugins] shutdown_timeout
+    :return: 是否在超时前关闭完成
+    """
+    name = plugin.info.name
+    timeout = timeout or plugin.shutdown_timeout or shutdown_timeout
+    try:
+        await asyncio.wait_for(plugin.shutdown(), timeout)
+    except asyncio.TimeoutError:
+        logger.error(f"插件{name}关闭超时（{timeout}秒）")
+        return False
+    return True
+
+
+async def startup_plugins(timeout: float = None) -> Dict[str, bool]:
+    """
+    并发启动所有已导入的插件：预热资源池并执行启动函数。在 FastAPI 的 lifespan 中调用，
+    完成后应用才开始接收请求。未使用过的延迟插件在第一次导入时启动。
+
+    :param timeout: 单个插件的超时秒数
+    :return: 插件名 -> 是否启动成功
+    :raises RuntimeError: 如果配置了 [plugins] startup_fail_fast 且有插件启动失败
+    """
+    global _loop
+    _loop = asyncio.get_running_loop()
+    targets = [plugin for plugin in map(_loaded, list(plugins.values()))
+               if plugin is not None and not plugin.started]
+    results = await asyncio.gather(*(start_plugin(plugin, timeout) for plugin in targets))
+    status = {plugin.info.name: ok for plugin, ok in zip(targets, results)}
+    failed = [name for name, ok in status.items() if not ok]
+    if failed and startup_fail_fast:
+        raise RuntimeError(f"插件启动失败: {', '.join(failed)}")
+    return status
+
+
+async def shutdown_plugins(timeout: float = None):
+    """
+    并发关闭所有已启动的插件。在 FastAPI 的 lifespan 中调用。
+
+    :param timeout: 单个插件的超时秒数
+    """
+    global _loop
+    # 等待尚未完成的启动任务（例如刚刚第一次使用的延迟插件），再关闭插件
+    if _lifecycle_tasks:
+        await asyncio.gather(*list(_lifecycle_tasks), return_exceptions=True)
+    targets = [plugin for plugin in map(_loaded, list(plugins.values()))
+               if plugin is not None and (plugin.started or any(p.resource is not None for p in plugin.pools.values()))]
+    await asyncio.gather(*(stop_plugin(plugin, timeout) for plugin in targets))
+    _loop = None
+
+
+class PluginWatcher:
+    """
+    轮询插件目录中文件（.py 和 .ini）的修改时间，发现新增、修改或删除时重载对应的插件。
+    只使用标准库，不依赖文件系统通知。
+    """
+
+    watched_suffixes = ('.py', '.ini')
+
+    def __init__(self, plugin_dir: str = "plugins", interval: float = 1.0):
+        """
+        :param plugin_dir: 插件目录
+        :param interval: 轮询间隔（秒）
+        """
+        self.plugin_dir = plugin_dir
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._snapshot = {}
+
+    def _scan(self) -> Dict[str, Dict[str, int]]:
+        """插件名 -> {文件路径: 修改时间}"""
+        snapshot = {}
+        for plugin_name in os.listdir(self.plugin_dir):
+            plugin_path = os.path.join(self.plugin_dir, plugin_name)
+            if not os.path.isdir(plugin_path):
+                continue
+            files = {}
+            for root, dirs, filenames in os.walk(plugin_path):
+                dirs[:] = [d for d in dirs if d != '__pycache__']
+                for filename in filenames:
+                    if filename.endswith(self.watched_suffixes):
+                        path = os.path.join(root, filename)
+                        try:
+                            files[path] = os.stat(path).st_mtime_ns
+                        except OSError:
+                            pass
+            snapshot[plugin_name] = files
+        return snapshot
+
+    def start(self):
+        self._snapshot = self._scan()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='PluginWatcher', daemon=True)
+        self._thread.start()
+        logger.info(f"插件热重载:开始监视{self.plugin_dir}，间隔{self.interval}秒")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def check(self) -> List[str]:
+        """
+        检查一次文件变化并重载发生变化的插件。
+
+        :return: 重载的插件名列表
+        """
+        current = self._scan()
+        changed = [name for name in set(current) | set(self._snapshot)
+                   if current.get(name) != self._snapshot.get(name)]
+        self._snapshot = current
+        for name in sorted(changed):
+            logger.info(f"插件热重载:检测到{name}发生变化")
+            reload_plugin(name, self.plugin_dir)
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
             try:
-                plugin_info = module.plugin_info
-                plugin_class_instance = module.plugin
+                self.check()
+            except Exception as e:
+                logger.error(f"插件热重载:检查失败: {e}")
+
+
+watcher: PluginWatcher = None
 
-                # 检查是否正确获取了所需的对象
-                if not isinstance(plugin_info, PluginInfo):
-                    raise TypeError(f"Expected PluginInfo instance in {plugin_name}/space.py, got {type(plugin_info)}")
-                if not isinstance(plugin_class_instance, Plugin):
-                    raise TypeError(
-                        f"Expected Plugin instance in {plugin_name}/space.py, got {type(plugin_class_instance)}")
 
-                # 将插件实例添加到列表中
-                plugins.append(plugin_class_instance)
+def _after_fork_in_child():
+    """多进程服务的每个工作进程各自监视插件目录并重载插件，监视线程在子进程中重新启动"""
+    global _reload_lock
+    _reload_lock = threading.Lock()
+    if watcher is not None and watcher._thread is not None and not watcher._stop.is_set():
+        watcher._stop = threading.Event()
+        watcher.start()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def load_plugins(plugin_dir: str = "plugins", watch: bool = None) -> List[Plugin]:
+    """
+    发现并加载 plugin_dir 下的所有插件，并注册到 om 的 plugins/<插件名>。
+    插件清单标记为 lazy 的插件只创建 LazyPlugin，不会导入；其余插件在线程池中并行导入。
+
+    :param plugin_dir: 插件目录
+    :param watch: 是否监视插件目录并热重载，默认使用配置 [plugins] hot_reload
+    :return: 插件对象列表，顺序与目录中的顺序一致
+    """
+    manifests = []
+    for plugin_name in os.listdir(plugin_dir):
+        plugin_path = os.path.join(plugin_dir, plugin_name)
+        if os.path.isdir(plugin_path) and os.path.exists(os.path.join(plugin_path, 'space.py')):
+            manifests.append(read_manifest(plugin_name, plugin_path))
+
+    def load(manifest: PluginManifest):
+        try:
+            return _import_plugin(manifest)
+        except TypeError as e:
+            logger.error(f"Failed to load plugin from {manifest.name}/space.py: {e}")
+            return None
 
-            except (AttributeError, TypeError) as e:
-                logger.error(f"Failed to load plugin from {plugin_name}/space.py: {e}")
-    return plugins
+    eager = [m for m in manifests if not m.lazy]
+    # 插件中通常会 from project import logger，因此只能在 project 导入完成后调用（project.init() 中）
+    with ThreadPoolExecutor(max_workers=max(import_workers, 1)) as executor:
+        loaded = dict(zip((m.name for m in eager), executor.map(load, eager)))
 
+    result = []
+    for manifest in manifests:
+        if manifest.lazy:
+            plugin = LazyPlugin(manifest)
+        else:
+            plugin = loaded[manifest.name]
+            if plugin is None:
+                continue
+        _publish(plugin, manifest.name)
+        result.append(plugin)
 
+    global watcher
+    if (hot_reload if watch is None else watch) and watcher is None:
+        watcher = PluginWatcher(plugin_dir, hot_reload_interval)
+        watcher.start()
+    return result
@@ -1,9 +1,14 @@
+import asyncio
 import atexit
+import collections
 import configparser
 import functools
+import itertools
 import os
+import queue
 import threading
-from concurrent.futures import ThreadPoolExecutor, CancelledError, TimeoutError
+import time
+from concurrent.futures import Executor, Future, CancelledError, TimeoutError, wait, FIRST_COMPLETED
 from functools import wraps
 from threading import Lock
 
@@ -26,16 +31,317 @@ timeout = int(config['thread']['timeout'])
 # 获取CPU数量
 cpu_count = os.cpu_count()
 
-# 计算两种方式的线程池大小
-pool_size_1 = cpu_count - not_used_cpu_num
-pool_size_2 = int(used_cpu_percentage / 100 * cpu_count)
-
 max_multiplier = 100  # 最大倍数，可以根据实际情况调整
-pool_size = max(pool_size_1, pool_size_2)
-if used_cpu_percentage > 100:
-    pool_size = min(pool_size, int(max_multiplier * cpu_count))
-else:
-    pool_size = min(pool_size, cpu_count)
+
+
+def compute_pool_size(not_used_cpu_num, used_cpu_percentage) -> int:
+    """按两种方式计算线程池大小，取较大的一个"""
+    pool_size_1 = cpu_count - not_used_cpu_num
+    pool_size_2 = int(used_cpu_percentage / 100 * cpu_count)
+    size = max(pool_size_1, pool_size_2)
+    if used_cpu_percentage > 100:
+        size = min(size, int(max_multiplier * cpu_count))
+    else:
+        size = min(size, cpu_count)
+    # CPU 数量较少时上面的计算结果可能为 0，线程池至少保留一个线程
+    return max(size, 1)
+
+
+pool_size = compute_pool_size(not_used_cpu_num, used_cpu_percentage)
+
+# 自适应线程池配置，auto_tune 为 False 时使用固定大小的 pool_size
+auto_tune = config['thread'].getboolean('auto_tune', fallback=False)
+auto_tune_min_workers = int(config['thread'].get('auto_tune_min_workers', fallback=pool_size))
+auto_tune_max_workers = int(config['thread'].get('auto_tune_max_workers', fallback=pool_size * 4))
+auto_tune_interval = float(config['thread'].get('auto_tune_interval', fallback=1.0))
+auto_tune_target_wait_ms = float(config['thread'].get('auto_tune_target_wait_ms', fallback=50))
+auto_tune_idle_timeout = float(config['thread'].get('auto_tune_idle_timeout', fallback=60))
+auto_tune_increase_step = int(config['thread'].get('auto_tune_increase_step', fallback=1))
+auto_tune_decrease_factor = float(config['thread'].get('auto_tune_decrease_factor', fallback=0.75))
+
+
+class _WorkItem:
+    __slots__ = ('future', 'fn', 'args', 'kwargs', 'enqueued')
+
+    def __init__(self, future, fn, args, kwargs):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.enqueued = time.perf_counter()  # 入队时间，用于统计排队等待时长
+
+    def run(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except BaseException as exc:
+            self.future.set_exception(exc)
+        else:
+            self.future.set_result(result)
+
+
+class AdaptiveThreadPoolExecutor(Executor):
+    """
+    自适应线程池执行器。
+
+    工作线程数量在 [min_workers, max_workers] 之间浮动。调节线程每隔 interval 秒统计一次
+    排队等待时间、吞吐量和线程利用率，使用 AIMD（加性增、乘性减）调整目标线程数：
+    出现排队积压时加性增加；若上一次增加后吞吐量反而下降（爬山法判断已越过最优点），则回退；
+    利用率偏低时乘性减少。多余的线程在完成当前任务后退出，空闲超过 idle_timeout 的线程也会退出。
+    """
+
+    # 利用率低于该值时认为线程过多
+    low_utilization = 0.5
+    # 吞吐量下降超过该比例时认为上一次扩容无效
+    throughput_tolerance = 0.05
+
+    def __init__(self, min_workers, max_workers, interval=1.0, target_wait=0.05, idle_timeout=60.0,
+                 increase_step=1, decrease_factor=0.75, thread_name_prefix='AdaptiveThreadPool'):
+        """
+        :param min_workers: 最少线程数
+        :param max_workers: 最多线程数
+        :param interval: 调节周期（秒）
+        :param target_wait: 可接受的平均排队等待时间（秒），超过则扩容
+        :param idle_timeout: 线程空闲多久后退出（秒），线程数不会低于 min_workers
+        :param increase_step: 每次扩容增加的线程数
+        :param decrease_factor: 每次缩容时目标线程数乘以的系数
+        :param thread_name_prefix: 线程名前缀
+        """
+        if min_workers < 1:
+            raise ValueError("min_workers must be greater than 0")
+        if max_workers < min_workers:
+            raise ValueError("max_workers must be greater than or equal to min_workers")
+        self._min_workers = min_workers
+        self._max_workers = max_workers
+        self._interval = interval
+        self._target_wait = target_wait
+        self._idle_timeout = idle_timeout
+        self._increase_step = max(increase_step, 1)
+        self._decrease_factor = decrease_factor
+        self._thread_name_prefix = thread_name_prefix
+
+        self._target = min_workers  # 当前目标线程数
+        self._work_queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._threads = set()
+        self._idle = 0  # 空闲（正在等待任务）的线程数
+        self._queued = 0  # 已提交但尚未被取走的任务数
+        self._shutdown = False
+        self._counter = 0  # 线程编号
+
+        # 当前调节周期内的统计数据
+        self._completed = 0
+        self._waited = 0
+        self._wait_total = 0.0
+        self._busy_total = 0.0  # 本周期内已完成任务的执行时间
+        self._period_start = time.perf_counter()
+        # 工作线程 -> 正在执行的任务的开始时间，运行时间超过一个周期的任务也计入利用率
+        self._running = {}
+        self._last_throughput = None
+        self._last_action = None
+
+        self._tuner_stop = threading.Event()
+        self._tuner = None
+        # 上下限相同时线程数固定，不需要调节线程
+        if min_workers < max_workers:
+            self._start_tuner()
+
+    def _start_tuner(self):
+        """启动调节线程，调用方需保证尚未启动"""
+        self._tuner = threading.Thread(target=self._tune_loop, name=f"{self._thread_name_prefix}-tuner", daemon=True)
+        self._tuner.start()
+
+    def submit(self, fn, /, *args, **kwargs):
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('cannot schedule new futures after shutdown')
+            future = Future()
+            self._work_queue.put(_WorkItem(future, fn, args, kwargs))
+            self._queued += 1
+            # 没有足够的空闲线程时，在目标线程数以内新建线程
+            if self._idle < self._queued and len(self._threads) < self._target:
+                self._spawn_worker()
+            return future
+
+    submit.__doc__ = Executor.submit.__doc__
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while True:
+                    try:
+                        item = self._work_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        self._queued -= 1
+                        item.future.cancel()
+            # 哨兵，工作线程取到后放回队列并退出
+            self._work_queue.put(None)
+            threads = list(self._threads)
+        self._tuner_stop.set()
+        if wait:
+            for t in threads:
+                t.join()
+
+    shutdown.__doc__ = Executor.shutdown.__doc__
+
+    def stats(self) -> dict:
+        """
+        获取线程池的运行状态。
+
+        :return: 包含当前线程数、空闲线程数、目标线程数、排队任务数及上下限的字典
+        """
+        with self._lock:
+            return {
+                'workers': len(self._threads),
+                'idle': self._idle,
+                'target': self._target,
+                'queued': self._queued,
+                'min_workers': self._min_workers,
+                'max_workers': self._max_workers,
+            }
+
+    def set_bounds(self, min_workers, max_workers):
+        """
+        运行中修改线程数的上下限。目标线程数超出新的范围时立即调整，
+        多余的线程在完成当前任务后退出。
+
+        :param min_workers: 最少线程数
+        :param max_workers: 最多线程数
+        """
+        if min_workers < 1:
+            raise ValueError("min_workers must be greater than 0")
+        if max_workers < min_workers:
+            raise ValueError("max_workers must be greater than or equal to min_workers")
+        with self._lock:
+            self._min_workers = min_workers
+            self._max_workers = max_workers
+            self._target = min(max(self._target, min_workers), max_workers)
+            while len(self._threads) < self._target and self._idle < self._queued and not self._shutdown:
+                self._spawn_worker()
+            if self._tuner is None and min_workers < max_workers and not self._shutdown:
+                self._start_tuner()
+
+    def _spawn_worker(self):
+        """新建一个工作线程，调用方需持有 self._lock"""
+        self._counter += 1
+        t = threading.Thread(target=self._worker, name=f"{self._thread_name_prefix}_{self._counter}", daemon=True)
+        self._threads.add(t)
+        self._idle += 1
+        t.start()
+
+    def _retire(self):
+        """当前线程退出，调用方需持有 self._lock"""
+        self._threads.discard(threading.current_thread())
+
+    def _worker(self):
+        while True:
+            try:
+                item = self._work_queue.get(timeout=self._idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    if len(self._threads) > self._min_workers:
+                        self._idle -= 1
+                        self._retire()
+                        return
+                continue
+            if item is None:
+                self._work_queue.put(None)
+                with self._lock:
+                    self._idle -= 1
+                    self._retire()
+                return
+
+            start = time.perf_counter()
+            me = threading.current_thread()
+            with self._lock:
+                self._idle -= 1
+                self._queued -= 1
+                self._waited += 1
+                self._wait_total += start - item.enqueued
+                self._running[me] = start
+            item.run()
+            del item
+            with self._lock:
+                del self._running[me]
+                self._completed += 1
+                # 开始于上一个周期的任务只计入本周期内的部分，之前的部分已经在上一个周期中计入
+                self._busy_total += time.perf_counter() - max(start, self._period_start)
+                if len(self._threads) > self._target:
+                    self._retire()
+                    return
+                self._idle += 1
+
+    def _tune_loop(self):
+        while not self._tuner_stop.wait(self._interval):
+            self._tune()
+
+    def _tune(self):
+        """根据上一个周期的统计数据调整目标线程数"""
+        with self._lock:
+            now = time.perf_counter()
+            period_start, self._period_start = self._period_start, now
+            completed, self._completed = self._completed, 0
+            waited, self._waited = self._waited, 0
+            wait_total, self._wait_total = self._wait_total, 0.0
+            busy_total, self._busy_total = self._busy_total, 0.0
+            # 正在执行的任务到现在为止的执行时间
+            busy_total += sum(now - max(start, period_start) for start in self._running.values())
+            workers = len(self._threads)
+            queued = self._queued
+            old_target = self._target
+
+        elapsed = max(now - period_start, 1e-9)
+        throughput = completed / elapsed
+        avg_wait = wait_total / waited if waited else 0.0
+        utilization = busy_total / (elapsed * max(workers, 1))
+
+        new_target = old_target
+        action = None
+        if queued > 0 or avg_wait > self._target_wait:
+            if (self._last_action == 'increase' and self._last_throughput
+                    and throughput < self._last_throughput * (1 - self.throughput_tolerance)):
+                # 上一次扩容后吞吐量下降，说明瓶颈不在线程数，回退
+                new_target = max(self._min_workers, old_target - self._increase_step)
+                action = 'decrease'
+            else:
+                new_target = min(self._max_workers, old_target + self._increase_step)
+                action = 'increase'
+        elif utilization < self.low_utilization:
+            new_target = max(self._min_workers, int(old_target * self._decrease_factor))
+            action = 'decrease'
+
+        self._last_throughput = throughput
+        self._last_action = action if new_target != old_target else None
+        if new_target == old_target:
+            return
+
+        with self._lock:
+            self._target = new_target
+            # 扩容时为积压的任务补充线程
+            while len(self._threads) < self._target and self._idle < self._queued and not self._shutdown:
+                self._spawn_worker()
+
+        logger.info(f"线程池自适应:目标线程数 {old_target} -> {new_target}，"
+                    f"吞吐量 {throughput:.1f}/s，平均排队 {avg_wait * 1000:.1f}ms，"
+                    f"利用率 {utilization:.0%}，排队任务 {queued}")
+
+
+def _iter_chunks(iterable, chunksize):
+    """按需从迭代器中切出长度为 chunksize 的块，不会一次性读取全部输入"""
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _run_chunk(fn, chunk):
+    return [fn(item) for item in chunk]
 
 
 class ThreadPoolManager:
@@ -51,7 +357,44 @@ class ThreadPoolManager:
 
     def __init__(self):
         if self._executor is None:
-            self._executor = ThreadPoolExecutor(max_workers=pool_size)
+            self._executor = self._create_executor()
+
+    @staticmethod
+    def _bounds():
+        """当前配置的线程数上下限，不自适应时上下限都是 pool_size"""
+        if auto_tune:
+            return auto_tune_min_workers, auto_tune_max_workers
+        return pool_size, pool_size
+
+    @classmethod
+    def _create_executor(cls):
+        # 固定大小的线程池同样使用 AdaptiveThreadPoolExecutor，运行中可以通过 set_bounds 调整，状态也可以通过 stats 获取
+        min_workers, max_workers = cls._bounds()
+        return AdaptiveThreadPoolExecutor(
+            min_workers=min_workers,
+            max_workers=max_workers,
+            interval=auto_tune_interval,
+            target_wait=auto_tune_target_wait_ms / 1000,
+            idle_timeout=auto_tune_idle_timeout,
+            increase_step=auto_tune_increase_step,
+            decrease_factor=auto_tune_decrease_factor,
+        )
+
+    def reconfigure(self):
+        """
+        按模块中当前的配置（pool_size、auto_tune 及其上下限）调整线程池的上下限，由配置文件的修改触发。
+        线程池缩小时，多余的线程在完成当前任务后退出。
+        """
+        with ThreadPoolManager._lock:
+            self._executor.set_bounds(*self._bounds())
+
+    def _after_fork_in_child(self):
+        """
+        fork 出的子进程中只有调用 fork 的线程，线程池的工作线程不存在了，旧的执行器会认为还有空闲线程而不再创建。
+        子进程换用新的执行器，旧执行器中尚未执行的任务属于父进程，不在子进程中执行。
+        """
+        ThreadPoolManager._lock = Lock()
+        self._executor = self._create_executor()
 
     def submit_task(self, fn, *args, _timeout=None, **kwargs):
         """
@@ -76,6 +419,127 @@ class ThreadPoolManager:
         else:
             return future
 
+    def stats(self) -> dict:
+        """
+        获取线程池的运行状态。
+
+        :return: 包含线程数、执行中的线程数、空闲线程数、排队任务数和最大线程数的字典
+        """
+        stats = self._executor.stats()
+        return {
+            'workers': stats['workers'],
+            'active': stats['workers'] - stats['idle'],
+            'idle': stats['idle'],
+            'queued': stats['queued'],
+            'max_workers': stats['max_workers'],
+        }
+
+    def _worker_limit(self):
+        """线程池当前允许的最大线程数"""
+        return self._executor.stats()['max_workers']
+
+    def map(self, fn, iterable, chunksize=1, max_in_flight=None, ordered=True, cancel_on_error=True):
+        """
+        将 fn 应用到 iterable 的每个元素上，以生成器的形式逐个返回结果。
+        输入按需读取，同时在线程池中的任务块不超过 max_in_flight 个，取走一个结果才会提交下一个任务块，
+        因此即使处理十万级别的输入，内存占用也是有界的。
+            for result in tp.map(fetch, urls, chunksize=10):
+                ...
+
+        注意：不要在线程池的任务中调用 map，线程池占满时会相互等待。
+
+        :param fn: 单参数函数
+        :param iterable: 输入数据，可以是任意迭代器
+        :param chunksize: 每个任务处理的元素个数，fn 很快而元素很多时调大可减少调度开销
+        :param max_in_flight: 同时提交的任务块上限，默认为线程池最大线程数的两倍
+        :param ordered: True 按输入顺序返回结果，False 按完成顺序返回结果
+        :param cancel_on_error: 任务出错时是否取消其余尚未开始的任务，错误总会从生成器中抛出
+        :return: 结果生成器
+        """
+        if chunksize < 1:
+            raise ValueError("chunksize must be greater than 0")
+        if max_in_flight is None:
+            max_in_flight = self._worker_limit() * 2
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be greater than 0")
+
+        chunks = _iter_chunks(iterable, chunksize)
+        pending = collections.deque() if ordered else set()
+        add = pending.append if ordered else pending.add
+
+        def refill(n):
+            for chunk in itertools.islice(chunks, n):
+                add(self._executor.submit(_run_chunk, fn, chunk))
+
+        cancel_pending = True
+        try:
+            refill(max_in_flight)
+            while pending:
+                if ordered:
+                    done = (pending.popleft(),)
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    pending.difference_update(done)
+                for future in done:
+                    try:
+                        results = future.result()
+                    except BaseException:
+                        cancel_pending = cancel_on_error
+                        raise
+                    refill(1)
+                    yield from results
+        finally:
+            # 出错或调用方提前停止迭代时，取消尚未开始的任务
+            if cancel_pending:
+                for future in pending:
+                    future.cancel()
+
+    async def amap(self, fn, iterable, chunksize=1, max_in_flight=None, ordered=True, cancel_on_error=True):
+        """
+        map 的异步迭代器版本，在事件循环中等待线程池的结果而不阻塞循环。
+            async for result in tp.amap(fetch, urls):
+                ...
+
+        参数含义与 map 相同。输入迭代器在事件循环线程中读取，因此应当是廉价的。
+        """
+        if chunksize < 1:
+            raise ValueError("chunksize must be greater than 0")
+        if max_in_flight is None:
+            max_in_flight = self._worker_limit() * 2
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be greater than 0")
+
+        chunks = _iter_chunks(iterable, chunksize)
+        pending = collections.deque() if ordered else set()
+        add = pending.append if ordered else pending.add
+
+        def refill(n):
+            for chunk in itertools.islice(chunks, n):
+                add(asyncio.wrap_future(self._executor.submit(_run_chunk, fn, chunk)))
+
+        cancel_pending = True
+        try:
+            refill(max_in_flight)
+            while pending:
+                if ordered:
+                    done = (pending.popleft(),)
+                else:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    pending.difference_update(done)
+                for future in done:
+                    try:
+                        results = await future
+                    except BaseException:
+                        cancel_pending = cancel_on_error
+                        raise
+                    refill(1)
+                    for result in results:
+                        yield result
+        finally:
+            if cancel_pending:
+                for future in pending:
+                    future.cancel()
+
     def shutdown_thread_pool(self, wait=True):
         from project import logger
         logger.info('关闭线程池：等待线程结束')
@@ -110,10 +574,49 @@ class ThreadPoolManager:
         return wrapper
 
 
+def on_config_changed(changes):
+    """
+    config/changed 事件的处理器：[thread] 中的线程数配置修改后调整线程池。
+    修改后的上下限不正确（例如只修改了一项，最少线程数大于最多线程数）或调整失败时记录错误日志，
+    不抛出异常，同一事件的其他处理器仍然执行。
+
+    :param changes: {(节, 配置项): (旧值, 新值)}
+    """
+    global not_used_cpu_num, used_cpu_percentage, pool_size
+    global auto_tune, auto_tune_min_workers, auto_tune_max_workers
+    thread_changes = {option: new for (section, option), (_, new) in changes.items()
+                      if section == 'thread' and new is not None}
+    if not thread_changes:
+        return
+    low = thread_changes.get('auto_tune_min_workers', auto_tune_min_workers)
+    high = thread_changes.get('auto_tune_max_workers', auto_tune_max_workers)
+    if thread_changes.get('auto_tune', auto_tune) and low > high:
+        logger.error(f"线程池:auto_tune_min_workers = {low} 大于 auto_tune_max_workers = {high}，修改没有生效")
+        return
+    not_used_cpu_num = thread_changes.get('thread_pool_not_used_cpu_num', not_used_cpu_num)
+    used_cpu_percentage = thread_changes.get('thread_pool_used_cpu_percentage', used_cpu_percentage)
+    pool_size = compute_pool_size(not_used_cpu_num, used_cpu_percentage)
+    auto_tune = thread_changes.get('auto_tune', auto_tune)
+    auto_tune_min_workers = thread_changes.get('auto_tune_min_workers', auto_tune_min_workers)
+    auto_tune_max_workers = thread_changes.get('auto_tune_max_workers', auto_tune_max_workers)
+    try:
+        tp.reconfigure()
+    except Exception as e:
+        logger.error(f"线程池:调整线程数量失败：{e}")
+        return
+    if auto_tune:
+        logger.info(f"线程池:线程数量调整为{auto_tune_min_workers}~{auto_tune_max_workers}")
+    else:
+        logger.info(f"线程池:最大线程数量调整为{pool_size}")
+
+
 # 线程池
 tp = ThreadPoolManager()
 # 退出程序时自动运行
 atexit.register(tp.shutdown_thread_pool)
+# 多进程服务（python -m serve）fork 出工作进程后，工作进程使用自己的线程池
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=tp._after_fork_in_child)
 
 if __name__ == "__main__":
     @tp.submit_to_thread_pool
@@ -143,6 +646,10 @@ if __name__ == "__main__":
     # 主线程继续执行，不会等待 some_function 完成
     print("Main thread continues...")
 
+    # 批量执行，结果按输入顺序逐个返回，输入按需读取
+    for value in tp.map(lambda x: x * x, range(10), chunksize=2, max_in_flight=2):
+        print(value)
+
     # 注意：在实际应用中，你需要在程序结束时关闭线程池。
     # 这可以通过在程序的主要退出点（如主函数的末尾）调用ThreadPoolManager的shutdown_thread_pool方法来实现。
     # 在这个示例中，为了演示功能，我们手动在程序末尾调用它。
@@ -0,0 +1,141 @@
+"""
+运行基准测试并保存结果，比较两次运行的结果。
+
+    python -m benchmarks list                                  # 列出所有基准测试
+    python -m benchmarks run                                   # 运行默认的一组（base 中的子系统，不需要外部服务）
+    python -m benchmarks run cache event -o before.json        # 运行指定的基准测试并保存为 JSON
+    python -m benchmarks run --all -o after.json               # 运行全部（Redis 不可用时自动跳过）
+    python -m benchmarks compare before.json after.json        # 单次耗时变慢超过 10% 的项标记为 REGRESSION
+    python -m benchmarks compare before.json after.json --threshold 20
+
+名称为模块名去掉 bench_ 前缀，每个模块提供 run()，返回 common.bench 格式的结果列表。
+compare 发现变慢的项时退出码为 1，可以在 CI 中使用。微基准测试的结果受机器负载影响，建议在同一台机器上比较。
+"""
+import argparse
+import datetime
+import importlib
+import json
+import os
+import pkgutil
+import platform
+import subprocess
+import sys
+
+import benchmarks
+from benchmarks.common import print_results
+
+# 默认运行的基准测试：base 中各子系统的开销，不需要外部服务，几十秒内完成
+DEFAULT_SUITE = ('table_db', 'cache', 'event', 'thread', 'object_manager')
+
+
+def available() -> list:
+    """所有基准测试的名称"""
+    return sorted(module.name[len('bench_'):] for module in pkgutil.iter_modules(benchmarks.__path__)
+                  if module.name.startswith('bench_'))
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                              ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(names) -> dict:
+    """
+    运行基准测试。
+
+    :param names: 基准测试名称
+    :return: 包含运行环境和 {名称: 结果列表} 的字典
+    """
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': {},
+    }
+    for name in names:
+        print(f"== {name}")
+        module = importlib.import_module(f'benchmarks.bench_{name}')
+        results = module.run()
+        print_results(results)
+        report['results'][name] = results
+    return report
+
+
+def compare(base: dict, new: dict, threshold: float) -> list:
+    """
+    比较两次运行的单次耗时。
+
+    :param base: 作为基准的结果
+    :param new: 新的结果
+    :param threshold: 变化超过这个百分比时标记
+    :return: [(名称, 测试项, 基准耗时, 新耗时, 变化百分比, 标记), ...]，标记为 REGRESSION、faster 或 ''
+    """
+    rows = []
+    for name, results in new['results'].items():
+        base_results = {result['name']: result for result in base['results'].get(name, [])}
+        for result in results:
+            before = base_results.get(result['name'])
+            if before is None or not before['ns_per_op']:
+                continue
+            change = (result['ns_per_op'] / before['ns_per_op'] - 1) * 100
+            flag = 'REGRESSION' if change > threshold else ('faster' if change < -threshold else '')
+            rows.append((name, result['name'], before['ns_per_op'], result['ns_per_op'], change, flag))
+    return rows
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='运行和比较基准测试')
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('list', help='列出所有基准测试')
+    run_parser = commands.add_parser('run', help='运行基准测试')
+    run_parser.add_argument('names', nargs='*', help=f"基准测试名称，默认 {' '.join(DEFAULT_SUITE)}")
+    run_parser.add_argument('--all', action='store_true', help='运行全部基准测试')
+    run_parser.add_argument('-o', '--output', help='把结果保存为 JSON 文件')
+    compare_parser = commands.add_parser('compare', help='比较两次运行的结果')
+    compare_parser.add_argument('base', help='作为基准的结果文件')
+    compare_parser.add_argument('new', help='新的结果文件')
+    compare_parser.add_argument('--threshold', type=float, default=10.0, help='标记的变化百分比，默认 10')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        for name in available():
+            print(f"{name}{'  (default)' if name in DEFAULT_SUITE else ''}")
+        return 0
+
+    if args.command == 'compare':
+        base, new = _load(args.base), _load(args.new)
+        rows = compare(base, new, args.threshold)
+        print(f"base: {base.get('commit')} {base.get('created')}    new: {new.get('commit')} {new.get('created')}")
+        width = max((len(f"{name}: {item}") for name, item, *_ in rows), default=4)
+        print(f"{'name':<{width}}  {'base ns/op':>12}  {'new ns/op':>12}  {'change':>8}")
+        for name, item, before, after, change, flag in rows:
+            print(f"{f'{name}: {item}':<{width}}  {before:>12.1f}  {after:>12.1f}  {change:>+7.1f}%  {flag}")
+        regressions = sum(1 for row in rows if row[5] == 'REGRESSION')
+        print(f"{len(rows)} compared, {regressions} regressions (threshold {args.threshold:g}%)")
+        return 1 if regressions else 0
+
+    names = available() if getattr(args, 'all', False) else (getattr(args, 'names', None) or list(DEFAULT_SUITE))
+    unknown = [name for name in names if name not in available()]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}; available: {', '.join(available())}")
+    report = run(names)
+    if getattr(args, 'output', None):
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        print(f"saved to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+缓存的开销：SingletonLRUCache 的命中、未命中、写入和淘汰，以及 lru_cache_decorator 相对于直接调用的额外开销。
+
+    python -m benchmarks.bench_cache
+"""
+import functools
+
+import project  # noqa: F401  初始化配置
+from base.cache import SingletonLRUCache, cache
+from benchmarks.common import bench, print_results
+
+MAXSIZE = 1024
+
+
+def add(x, y):
+    return x + y
+
+
+def run(number: int = 200000):
+    lru = SingletonLRUCache(maxsize=MAXSIZE)
+    for i in range(MAXSIZE):
+        lru.set(('key', i), i)
+    ttl = SingletonLRUCache(maxsize=MAXSIZE)
+    ttl.set('key', 1, ttl=3600)
+    counter = iter(range(10 ** 9))
+
+    decorated = cache.lru_cache_decorator()(add)
+    decorated(1, 2)
+    stdlib = functools.lru_cache(maxsize=MAXSIZE)(add)
+    stdlib(1, 2)
+
+    return [
+        bench("get hit", lambda: lru.get(('key', 7)), number),
+        bench("get miss", lambda: lru.get(('missing', 0)), number),
+        bench("get hit with ttl", lambda: ttl.get('key'), number),
+        bench("set existing key", lambda: lru.set(('key', 7), 7), number),
+        bench("set new key (evicts oldest)", lambda: lru.set(('new', next(counter)), 0), number),
+        bench("call without cache", lambda: add(1, 2), number),
+        bench("lru_cache_decorator hit", lambda: decorated(1, 2), number),
+        bench("functools.lru_cache hit", lambda: stdlib(1, 2), number),
+    ]
+
+
+if __name__ == '__main__':
+    print_results(run())
@@ -0,0 +1,87 @@
+"""
+时间序列数据保存在 ColumnTable 和 TableDB（时间戳 -> 值）中的比较：内存占用、区间求和、过滤和按时间范围查找。
+
+没有安装 NumPy 时 ColumnTable 使用 memoryview 和内置函数，安装后使用向量化运算。
+
+    python -m benchmarks.bench_column_table
+"""
+import os
+import tempfile
+import tracemalloc
+
+from base.database.column_table import ColumnTable, np
+from base.database.table_db import TableDB
+from benchmarks.common import bench, print_results
+
+ROWS = 100000
+
+
+def _samples(rows):
+    return [(1700000000.0 + i, (i % 1000) / 10.0) for i in range(rows)]
+
+
+def build(tmp, rows=ROWS):
+    """构造保存相同数据的 TableDB 和 ColumnTable，各只写入一次文件"""
+    samples = _samples(rows)
+    db = TableDB(os.path.join(tmp, 'series.pkl'))
+    db.data = dict(samples)
+    db._save_data()
+    table = ColumnTable(os.path.join(tmp, 'series.columns'), {'ts': 'float64', 'value': 'float64'}, key='ts')
+    table.extend(samples)
+    return db, table
+
+
+def memory(rows=ROWS) -> dict:
+    """从文件加载后两种表占用的内存（字节）"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db, table = build(tmp, rows)
+        path = db.filename
+        del db
+        tracemalloc.start()
+        db = TableDB(path)
+        table_db_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        # 列的数据在 mmap 中，不经过 Python 的内存分配器，这里按文件中有效数据的大小计算
+        column_bytes = sum(table.column(name).nbytes for name in table.columns)
+        table.close()
+        return {'TableDB': table_db_bytes, 'ColumnTable': column_bytes}
+
+
+def run(rows: int = ROWS):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        db, table = build(tmp, rows)
+        t0, t1 = 1700000000.0 + rows // 4, 1700000000.0 + rows * 3 // 4
+        counter = iter(range(10 ** 9))
+
+        def column_table_extend():
+            start = t1 * 2 + next(counter) * 1000
+            table.extend((start + i, 0.0) for i in range(1000))
+
+        def table_db_sum():
+            return sum(v for k, v in db.items() if t0 <= k < t1)
+
+        def table_db_filter():
+            return [k for k, v in db.items() if v > 99.0]
+
+        def table_db_range():
+            return [k for k in db.keys() if t0 <= k < t1]
+
+        results += [
+            bench(f"TableDB sum over range n={rows}", table_db_sum, 5, 3),
+            bench(f"ColumnTable sum over range n={rows}", lambda: table.aggregate('value', 'sum', low=t0, high=t1), 20, 3),
+            bench(f"TableDB filter value>99 n={rows}", table_db_filter, 5, 3),
+            bench(f"ColumnTable filter value>99 n={rows}", lambda: table.filter('value', '>', 99.0), 20, 3),
+            bench(f"TableDB time range lookup n={rows}", table_db_range, 5, 3),
+            bench(f"ColumnTable time range lookup n={rows}", lambda: table.key_range(t0, t1), 10000, 3),
+            bench("ColumnTable extend 1000 rows", column_table_extend, 20, 3),
+        ]
+        table.close()
+    return results
+
+
+if __name__ == '__main__':
+    print(f"NumPy: {'yes' if np is not None else 'no'}")
+    for name, size in memory().items():
+        print(f"{name} memory for {ROWS} rows: {size / 1024 / 1024:.1f} MiB")
+    print_results(run())
@@ -0,0 +1,36 @@
+"""
+EventManager 触发事件的耗时随处理器数量的变化，以及没有处理器的事件和收集返回值的开销。
+
+    python -m benchmarks.bench_event
+"""
+from base.event import EventManager
+from benchmarks.common import bench, print_results
+
+HANDLER_COUNTS = (0, 1, 10, 100)
+
+
+def _make_handler():
+    def handler(*args, **kwargs):
+        return None
+    return handler
+
+
+def run(handler_counts=HANDLER_COUNTS, number: int = 20000):
+    results = []
+    for count in handler_counts:
+        ev = EventManager()
+        # EventManager 只保存处理器的弱引用，这里保持强引用
+        handlers = [_make_handler() for _ in range(count)]
+        for handler in handlers:
+            ev.register("bench/event", handler)
+        results.append(bench(f"emit handlers={count}", lambda: ev.emit("bench/event", 1, key='v'),
+                             max(1000, number // max(count, 1))))
+        if count == 10:
+            results.append(bench(f"emit_and_collect_results handlers={count}",
+                                 lambda: ev.emit_and_collect_results("bench/event", 1), number // 10))
+            results.append(bench("emit unregistered event", lambda: ev.emit("bench/other"), number))
+    return results
+
+
+if __name__ == '__main__':
+    print_results(run())
@@ -0,0 +1,117 @@
+"""
+JSON 响应路径：FastAPI 默认（jsonable_encoder + json）与 FastJSONResponse / FastJSONRoute 的对比。
+
+典型负载：小字典、100 条记录、5000 条记录（包含日期和嵌套字段），以及 pydantic 模型（有响应模型和直接返回两种方式）。
+分别测量只序列化的耗时和进程内请求的每秒请求数（httpx ASGITransport，不经过网络）。
+
+    python -m benchmarks.bench_json
+"""
+import asyncio
+import datetime
+import json
+import time
+from typing import List
+
+import httpx
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from benchmarks.common import bench
+from serve.responses import FastJSONRoute, dumps
+
+
+class Item(BaseModel):
+    id: int
+    name: str
+    price: float
+    tags: List[str]
+    created: datetime.datetime
+
+
+def _record(i: int) -> dict:
+    return {
+        'id': i,
+        'name': f'item-{i}',
+        'price': i * 1.25,
+        'tags': ['a', 'b', 'c'],
+        'created': datetime.datetime(2024, 1, 1) + datetime.timedelta(seconds=i),
+    }
+
+
+PAYLOADS = {
+    'small': {'message': 'Hello World'},
+    'records_100': [_record(i) for i in range(100)],
+    'records_5000': {'total': 5000, 'items': [_record(i) for i in range(5000)]},
+}
+MODELS = [Item(**_record(i)) for i in range(1000)]
+
+
+def build_app(fast: bool) -> FastAPI:
+    app = FastAPI()
+    if fast:
+        app.router.route_class = FastJSONRoute
+
+    def endpoint(payload):
+        async def read():
+            return payload
+        return read
+
+    for name, payload in PAYLOADS.items():
+        app.add_api_route(f'/{name}', endpoint(payload), methods=['GET'])
+
+    @app.get('/models_response_model', response_model=List[Item])
+    async def models_response_model():
+        return MODELS
+
+    @app.get('/models_returned')
+    async def models_returned():
+        return {'items': MODELS}
+
+    return app
+
+
+PATHS = [f'/{name}' for name in PAYLOADS] + ['/models_response_model', '/models_returned']
+
+
+async def load(app, path: str, requests: int, concurrency: int = 10, headers: dict = None) -> float:
+    counter = iter(range(requests))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        async def worker():
+            for _ in counter:
+                response = await client.get(path, headers=headers)
+                if response.is_error:
+                    response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def run(requests: int = 200):
+    results = []
+    for name, payload in PAYLOADS.items():
+        number = max(10, 20000 // len(json.dumps(jsonable_encoder(payload))))
+        results.append(bench(f'encode {name}: jsonable_encoder + json',
+                             lambda: json.dumps(jsonable_encoder(payload)).encode(), number=number, repeat=3))
+        results.append(bench(f'encode {name}: dumps', lambda: dumps(payload), number=number, repeat=3))
+
+    async def main():
+        for fast in (False, True):
+            app = build_app(fast)
+            for path in PATHS:
+                await load(app, path, 20)
+                seconds = await load(app, path, requests)
+                results.append({
+                    'name': f"GET {path}: {'fast' if fast else 'default'}",
+                    'ns_per_op': seconds / requests * 1e9,
+                    'ops_per_sec': requests / seconds,
+                })
+
+    asyncio.run(main())
+    return results
+
+
+if __name__ == '__main__':
+    from benchmarks.common import print_results
+    print_results(run())
@@ -0,0 +1,53 @@
+"""
+log_decorator 每次调用的额外开销。
+
+对比未装饰的函数、旧版实现（每次调用都拼接参数字符串）和当前实现。
+配置文件默认 log_level = WARNING，DEBUG 等级的装饰器应当与未装饰的函数开销相同。
+
+    python -m benchmarks.bench_logger
+"""
+from functools import wraps
+
+import project  # noqa: F401  初始化配置和日志
+from base.logger import log_decorator, log_level_no, loguru_logger, logger
+from benchmarks.common import bench, print_results
+
+
+def _legacy_log_decorator(_log_level):
+    """改造前的实现，仅用于对比"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            func_name = func.__name__
+            args_str = ', '.join([f"{k}={v}" for k, v in kwargs.items()]) if kwargs else ', '.join(map(str, args))
+            if _log_level == "DEBUG":
+                logger.debug(f"Calling {func_name} with args: {args_str}")
+            elif _log_level == "INFO":
+                logger.info(f"Calling {func_name} with args: {args_str}")
+            return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def add(a, b):
+    return a + b
+
+
+def run(number=100000):
+    if loguru_logger.level("DEBUG").no >= log_level_no:
+        print("注意：log_level 不高于 DEBUG，DEBUG 日志会被真实写入，结果包含文件 I/O")
+    legacy = _legacy_log_decorator("DEBUG")(add)
+    current = log_decorator("DEBUG")(add)
+    payload = list(range(100))
+    return [
+        bench("undecorated", lambda: add(1, 2), number),
+        bench("legacy DEBUG (disabled)", lambda: legacy(1, 2), number),
+        bench("current DEBUG (disabled)", lambda: current(1, 2), number),
+        bench("legacy DEBUG large args", lambda: legacy(payload, payload), number // 10),
+        bench("current DEBUG large args", lambda: current(payload, payload), number // 10),
+        bench("proxy attribute access", lambda: logger.debug, number),
+    ]
+
+
+if __name__ == '__main__':
+    print_results(run())
@@ -0,0 +1,60 @@
+"""
+指标记录的开销：直方图和计数器的单次记录、/metrics 的输出，以及 MetricsMiddleware 对每秒请求数的影响
+（进程内请求，httpx ASGITransport，不经过网络）。
+
+    python -m benchmarks.bench_metrics
+"""
+import asyncio
+
+from fastapi import FastAPI
+
+from benchmarks.bench_json import load
+from benchmarks.common import bench
+from base.metrics import MetricsRegistry
+from serve.metrics import MetricsMiddleware
+from serve.responses import FastJSONRoute
+
+
+def build_app(with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+    app.router.route_class = FastJSONRoute
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+
+    @app.get("/hello/{name}")
+    async def say_hello(name: str):
+        return {"message": f"Hello {name}"}
+
+    return app
+
+
+def run(requests: int = 2000):
+    registry = MetricsRegistry()
+    histogram = registry.histogram("bench_seconds", "bench", ("method", "route"))
+    counter = registry.counter("bench_total", "bench", ("method", "route", "status"))
+    for i in range(20):
+        histogram.observe(0.001 * i, "GET", f"/route/{i}")
+    results = [
+        bench('histogram.observe', lambda: histogram.observe(0.0042, "GET", "/hello/{name}")),
+        bench('counter.inc', lambda: counter.inc("GET", "/hello/{name}", "200")),
+        bench('registry.render (20 routes)', registry.render, number=1000),
+    ]
+
+    async def main():
+        for with_metrics in (False, True):
+            app = build_app(with_metrics)
+            await load(app, '/hello/a', 100)
+            seconds = await load(app, '/hello/a', requests)
+            results.append({
+                'name': f"GET /hello/a: {'MetricsMiddleware' if with_metrics else 'no middleware'}",
+                'ns_per_op': seconds / requests * 1e9,
+                'ops_per_sec': requests / seconds,
+            })
+
+    asyncio.run(main())
+    return results
+
+
+if __name__ == '__main__':
+    from benchmarks.common import print_results
+    print_results(run())
@@ -0,0 +1,60 @@
+"""
+ObjectManager 前缀搜索和类型搜索的耗时随对象数量的变化。
+
+对比旧版的全量扫描和当前的索引实现（分别测量缓存未命中和命中）。
+
+    python -m benchmarks.bench_object_manager
+"""
+from base.object_manager import ObjectManager
+from benchmarks.common import bench, print_results
+
+SIZES = (100, 1000, 10000, 100000)
+
+
+class _Plugin:
+    pass
+
+
+def build(size: int) -> ObjectManager:
+    """构造 size 个对象，分布在 100 个层级前缀下，值的类型混合"""
+    om = ObjectManager()
+    for i in range(size):
+        value = i if i % 3 == 0 else (str(i) if i % 3 == 1 else _Plugin())
+        om.store(f"group{i % 100}/item{i}", value)
+    return om
+
+
+def run(sizes=SIZES):
+    results = []
+    for size in sizes:
+        om = build(size)
+        objects = om._objects
+        number = max(10, 100000 // size)
+
+        def legacy_search():
+            return tuple(value for key, value in objects.items() if key.startswith("group7/"))
+
+        def legacy_get_by_type():
+            return tuple(value for value in objects.values() if isinstance(value, _Plugin))
+
+        def search_uncached():
+            om._search_cache.clear()
+            return om.search("group7/")
+
+        def get_by_type_uncached():
+            om._type_cache.clear()
+            return om.get_by_type(_Plugin)
+
+        results += [
+            bench(f"search n={size} legacy scan", legacy_search, number),
+            bench(f"search n={size} index", search_uncached, number),
+            bench(f"search n={size} cached", lambda: om.search("group7/"), number),
+            bench(f"get_by_type n={size} legacy scan", legacy_get_by_type, number),
+            bench(f"get_by_type n={size} index", get_by_type_uncached, number),
+            bench(f"get_by_type n={size} cached", lambda: om.get_by_type(_Plugin), number),
+        ]
+    return results
+
+
+if __name__ == '__main__':
+    print_results(run())
@@ -0,0 +1,89 @@
+"""
+并发请求下同步 Redis 客户端（def 接口，在线程池中执行）与异步客户端（async def 接口）的每秒请求数对比。
+
+需要 [redis_db] 配置的 Redis 服务（不要求 use_redis = True），无法连接时跳过。
+请求通过 httpx 的 ASGITransport 在进程内发送，只有 Redis 访问经过网络。
+
+    python -m benchmarks.bench_redis
+"""
+import asyncio
+import configparser
+import time
+
+import httpx
+import redis
+from fastapi import FastAPI
+
+from project import config
+from base.database.redis_db.redis_db import create_async_redis_client, create_redis_client, warm_async_redis
+
+KEY = 'bench:redis:value'
+
+
+def _config() -> configparser.ConfigParser:
+    # 复制项目配置并启用 Redis，不修改项目配置
+    bench_config = configparser.ConfigParser()
+    bench_config.read_dict(config)
+    bench_config['redis_db']['use_redis'] = 'True'
+    return bench_config
+
+
+def build_app(sync_client, async_client) -> FastAPI:
+    app = FastAPI()
+
+    @app.get('/sync')
+    def read_sync():
+        return {'value': sync_client.get(KEY)}
+
+    @app.get('/async')
+    async def read_async():
+        return {'value': await async_client.get(KEY)}
+
+    return app
+
+
+async def load(app, path: str, requests: int, concurrency: int) -> float:
+    counter = iter(range(requests))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        async def worker():
+            for _ in counter:
+                (await client.get(path)).raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def run(requests: int = 5000, concurrency: int = 50):
+    sync_client = create_redis_client(_config())
+    try:
+        sync_client.set(KEY, 'x' * 100)
+    except redis.ConnectionError as e:
+        print(f"Redis 不可用，跳过: {e}")
+        return []
+
+    results = []
+
+    async def main():
+        async_client = create_async_redis_client(_config())
+        await warm_async_redis(async_client, concurrency)
+        app = build_app(sync_client, async_client)
+        for name, path in (('sync redis.Redis', '/sync'), ('async redis.asyncio', '/async')):
+            await load(app, path, 200, concurrency)
+            seconds = await load(app, path, requests, concurrency)
+            results.append({
+                'name': f'{name}: GET, concurrency {concurrency}',
+                'ns_per_op': seconds / requests * 1e9,
+                'ops_per_sec': requests / seconds,
+            })
+        await async_client.aclose()
+
+    asyncio.run(main())
+    sync_client.delete(KEY)
+    sync_client.close()
+    return results
+
+
+if __name__ == '__main__':
+    from benchmarks.common import print_results
+    print_results(run())
@@ -0,0 +1,58 @@
+"""
+HTTP 响应缓存：同一个 GET 接口在没有缓存、缓存命中、If-None-Match 返回 304 三种情况下的每秒请求数。
+接口模拟一次 5ms 的查询并返回 1000 条记录，进程内请求（httpx ASGITransport，不经过网络）。
+
+    python -m benchmarks.bench_response_cache
+"""
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.bench_json import load
+from serve.response_cache import ResponseCache, ResponseCacheMiddleware, cache_response
+from serve.responses import FastJSONRoute
+
+RECORDS = [{'id': i, 'name': f'user{i}', 'score': i * 0.5} for i in range(1000)]
+
+
+def build_app(cached: bool) -> FastAPI:
+    app = FastAPI()
+    app.router.route_class = FastJSONRoute
+    if cached:
+        app.add_middleware(ResponseCacheMiddleware, cache=ResponseCache(), enabled=True)
+
+    @app.get("/records")
+    @cache_response(ttl=60)
+    async def records(page: int = 1):
+        await asyncio.sleep(0.005)
+        return RECORDS
+
+    return app
+
+
+def run(requests: int = 500):
+    results = []
+
+    async def main():
+        for name, cached, headers in (('no cache', False, None), ('cache hit', True, None),
+                                      ('If-None-Match 304', True, 'etag')):
+            app = build_app(cached)
+            if headers == 'etag':
+                async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as c:
+                    headers = {'if-none-match': (await c.get('/records?page=1')).headers['etag']}
+            await load(app, '/records?page=1', 20, headers=headers)
+            seconds = await load(app, '/records?page=1', requests, headers=headers)
+            results.append({
+                'name': f'GET /records: {name}',
+                'ns_per_op': seconds / requests * 1e9,
+                'ops_per_sec': requests / seconds,
+            })
+
+    asyncio.run(main())
+    return results
+
+
+if __name__ == '__main__':
+    from benchmarks.common import print_results
+    print_results(run())
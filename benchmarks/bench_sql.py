@@ -0,0 +1,63 @@
+"""
+SQLite 写入吞吐量：默认配置与性能配置（SQLITE_PERFORMANCE_PRAGMAS）对比。
+
+分别测量每行一个事务（受 synchronous 和日志模式影响最大）和批量写入一个事务。
+数据库文件放在临时目录中，不会影响项目数据库。
+
+    python -m benchmarks.bench_sql
+"""
+import os
+import tempfile
+import time
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, insert
+
+from base.database.sql.sql_db_engine import SQLITE_PERFORMANCE_PRAGMAS, apply_sqlite_pragmas
+
+metadata = MetaData()
+rows_table = Table(
+    'bench_rows', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('name', String),
+)
+
+
+def _engine(path: str, pragmas: dict):
+    engine = create_engine(f'sqlite:///{path}')
+    apply_sqlite_pragmas(engine, pragmas)
+    metadata.create_all(engine)
+    return engine
+
+
+def _result(name: str, count: int, seconds: float) -> dict:
+    return {
+        'name': name,
+        'ns_per_op': seconds / count * 1e9,
+        'ops_per_sec': count / seconds if seconds else float('inf'),
+    }
+
+
+def run(commits: int = 500, batch: int = 50000):
+    results = []
+    for profile, pragmas in (('default', {}), ('performance', SQLITE_PERFORMANCE_PRAGMAS)):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = _engine(os.path.join(tmp, 'bench.db'), pragmas)
+
+            start = time.perf_counter()
+            for i in range(commits):
+                with engine.begin() as conn:
+                    conn.execute(insert(rows_table), {'name': f'row{i}'})
+            results.append(_result(f'sqlite {profile}: commit per row', commits, time.perf_counter() - start))
+
+            params = [{'name': f'row{i}'} for i in range(batch)]
+            start = time.perf_counter()
+            with engine.begin() as conn:
+                conn.execute(insert(rows_table), params)
+            results.append(_result(f'sqlite {profile}: batch insert', batch, time.perf_counter() - start))
+            engine.dispose()
+    return results
+
+
+if __name__ == '__main__':
+    from benchmarks.common import print_results
+    print_results(run())
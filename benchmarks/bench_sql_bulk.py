@@ -0,0 +1,79 @@
+"""
+批量写入和流式读取：逐行 ORM 写入与 bulk_insert / upsert 的吞吐量对比，以及 stream 的峰值内存。
+
+数据库文件放在临时目录中，使用 SQLite 性能配置。
+
+    python -m benchmarks.bench_sql_bulk
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import Integer, String, create_engine, select
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
+
+from base.database.sql.bulk import bulk_insert, stream, upsert
+from base.database.sql.sql_db_engine import SQLITE_PERFORMANCE_PRAGMAS, apply_sqlite_pragmas
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Row(Base):
+    __tablename__ = 'bench_rows'
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String)
+
+
+def _result(name: str, count: int, seconds: float) -> dict:
+    return {
+        'name': name,
+        'ns_per_op': seconds / count * 1e9,
+        'ops_per_sec': count / seconds if seconds else float('inf'),
+    }
+
+
+def run(rows: int = 100000):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        apply_sqlite_pragmas(engine, SQLITE_PERFORMANCE_PRAGMAS)
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine)
+
+        start = time.perf_counter()
+        with session_factory() as session:
+            for i in range(rows):
+                session.add(Row(id=i, name=f'row{i}'))
+            session.commit()
+        results.append(_result('ORM add per row', rows, time.perf_counter() - start))
+
+        with engine.begin() as conn:
+            conn.execute(Row.__table__.delete())
+        start = time.perf_counter()
+        bulk_insert(Row, ({'id': i, 'name': f'row{i}'} for i in range(rows)), batch_size=5000, bind=engine)
+        results.append(_result('bulk_insert', rows, time.perf_counter() - start))
+
+        start = time.perf_counter()
+        upsert(Row, ({'id': i, 'name': f'new{i}'} for i in range(rows)), batch_size=5000, bind=engine)
+        results.append(_result('upsert (all conflicts)', rows, time.perf_counter() - start))
+
+        for name, read in (('session.scalars().all()', lambda s: len(s.scalars(select(Row)).all())),
+                           ('stream(chunk=1000)', lambda s: sum(1 for _ in stream(Row, chunk=1000, session=s)))):
+            with session_factory() as session:
+                tracemalloc.start()
+                start = time.perf_counter()
+                read(session)
+                seconds = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            results.append(_result(f'{name}, peak {peak / 1024 / 1024:.1f} MiB', rows, seconds))
+        engine.dispose()
+    return results
+
+
+if __name__ == '__main__':
+    from benchmarks.common import print_results
+    print_results(run())
@@ -0,0 +1,107 @@
+"""
+请求级负载测试：同步接口 + Session（线程池中执行）与异步接口 + AsyncSession 的每秒请求数对比。
+
+两个接口都按主键读取一行，并发请求通过 httpx 的 ASGITransport 在进程内发送，不经过网络。
+数据库文件放在临时目录中，两个引擎使用相同的连接池和 SQLite 性能配置。
+
+    python -m benchmarks.bench_sql_requests
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import Integer, String, create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column, sessionmaker
+
+from base.database.sql.session import async_session_scope, session_scope
+from base.database.sql.sql_db_engine import SQLITE_PERFORMANCE_PRAGMAS, apply_sqlite_pragmas
+
+ROWS = 1000
+POOL = {'pool_size': 5, 'max_overflow': 10}
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Row(Base):
+    __tablename__ = 'bench_rows'
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    name: Mapped[str] = mapped_column(String)
+
+
+def build_app(path: str):
+    engine = create_engine(f'sqlite:///{path}', **POOL)
+    apply_sqlite_pragmas(engine, SQLITE_PERFORMANCE_PRAGMAS)
+    Base.metadata.create_all(engine)
+    with session_scope(sessionmaker(bind=engine)) as session:
+        session.add_all(Row(id=i, name=f'row{i}') for i in range(ROWS))
+
+    async_engine = create_async_engine(f'sqlite+aiosqlite:///{path}', **POOL)
+    apply_sqlite_pragmas(async_engine.sync_engine, SQLITE_PERFORMANCE_PRAGMAS)
+    sync_factory = sessionmaker(bind=engine)
+    async_factory = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    def sync_session():
+        with session_scope(sync_factory) as session:
+            yield session
+
+    async def async_session():
+        async with async_session_scope(async_factory) as session:
+            yield session
+
+    app = FastAPI()
+
+    @app.get('/sync/{row_id}')
+    def read_sync(row_id: int, session: Session = Depends(sync_session)):
+        return {'name': session.get(Row, row_id).name}
+
+    @app.get('/async/{row_id}')
+    async def read_async(row_id: int, session: AsyncSession = Depends(async_session)):
+        return {'name': (await session.get(Row, row_id)).name}
+
+    return app, engine, async_engine
+
+
+async def load(app, prefix: str, requests: int, concurrency: int) -> float:
+    """以 concurrency 个并发客户端发送 requests 个请求，返回耗时（秒）"""
+    counter = iter(range(requests))
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench') as client:
+        async def worker():
+            for i in counter:
+                response = await client.get(f'{prefix}/{i % ROWS}')
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+
+def run(requests: int = 2000, concurrency: int = 50):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        app, engine, async_engine = build_app(os.path.join(tmp, 'bench.db'))
+
+        async def main():
+            for name, prefix in (('sync Session', '/sync'), ('async AsyncSession', '/async')):
+                await load(app, prefix, 100, concurrency)  # 预热连接池
+                seconds = await load(app, prefix, requests, concurrency)
+                results.append({
+                    'name': f'{name}: GET, concurrency {concurrency}',
+                    'ns_per_op': seconds / requests * 1e9,
+                    'ops_per_sec': requests / seconds,
+                })
+            await async_engine.dispose()
+
+        asyncio.run(main())
+        engine.dispose()
+    return results
+
+
+if __name__ == '__main__':
+    from benchmarks.common import print_results
+    print_results(run())
@@ -0,0 +1,98 @@
+"""
+TableDB 的读写吞吐量随表大小的变化。
+
+每次 insert / update / delete 都会把整张表写入文件，写入的耗时与表的大小成正比；get 只读内存中的字典。
+发现修改：轮询 items() 与 changes_since 的比较。
+设置了有效期的键：get 的额外开销，以及清理一批过期键时按过期时间的堆和逐个检查全部键的比较。
+
+    python -m benchmarks.bench_table_db
+"""
+import heapq
+import itertools
+import os
+import tempfile
+import time
+
+from base.database.table_db import TableDB
+from benchmarks.common import bench, print_results
+
+SIZES = (100, 1000, 10000)
+
+
+def _record(i: int) -> dict:
+    return {'id': i, 'name': f'user{i}', 'email': f'user{i}@example.com', 'tags': ['a', 'b']}
+
+
+def build(path: str, size: int) -> TableDB:
+    """构造 size 行的表，只写入一次文件"""
+    db = TableDB(path)
+    db.data = {f'key{i}': _record(i) for i in range(size)}
+    db._save_data()
+    return db
+
+
+def run(sizes=SIZES):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            db = build(os.path.join(tmp, f'table{size}.pkl'), size)
+            # 写入的次数随表的大小减少，每项测试的总耗时相近
+            writes = max(5, 20000 // size)
+            counter = iter(range(10 ** 9))
+
+            results += [
+                bench(f"get n={size} hit", lambda: db.get('key7')),
+                bench(f"get n={size} miss", lambda: db.get('missing')),
+                bench(f"insert n={size}", lambda: db.insert(f'new{next(counter)}', _record(0)), writes, 3),
+                bench(f"update n={size}", lambda: db.update('key7', _record(7)), writes, 3),
+                bench(f"keys n={size}", db.keys, max(10, 100000 // size)),
+                # 发现最近一次写入：轮询整张表与按序号读取修改记录的比较
+                bench(f"poll items() n={size}", db.items, max(10, 100000 // size)),
+                bench(f"changes_since last write n={size}", lambda: db.changes_since(db.sequence - 1)),
+            ]
+    results += run_expiry(sizes)
+    return results
+
+
+def run_expiry(sizes=SIZES, due: int = 100):
+    """有效期：get 的开销，以及表中有 size 个设置了有效期的键、其中 due 个已经过期时清理一次的耗时"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            db = build(os.path.join(tmp, f'ttl{size}.pkl'), 0)
+            # 直接构造有效期和堆，不注册到后台的 expirer，避免测试期间被后台线程清理和写入
+            now = time.time()
+            sequence = itertools.count()
+            db.data = {f'key{i}': _record(i) for i in range(size)}
+            db._expires = {f'key{i}': now + 3600 for i in range(size)}
+            db._expiry_heap = [(expires, next(sequence), key) for key, expires in db._expires.items()]
+            heapq.heapify(db._expiry_heap)
+            results.append(bench(f"get n={size} with ttl", lambda: db.get('key7')))
+
+            def expire_due():
+                # 每次让 due 个键过期再清理，只计算内存中的删除
+                for i in range(due):
+                    db.data[f'due{i}'] = 0
+                    db._expires[f'due{i}'] = 0
+                    heapq.heappush(db._expiry_heap, (0, next(sequence), f'due{i}'))
+                with db.lock:
+                    db._expire_due()
+
+            def scan():
+                for i in range(due):
+                    db.data[f'due{i}'] = 0
+                    db._expires[f'due{i}'] = 0
+                with db.lock:
+                    current = time.time()
+                    for key, expires in list(db._expires.items()):
+                        if expires <= current:
+                            del db._expires[key]
+                            db.data.pop(key, None)
+
+            results.append(bench(f"expire {due} due of n={size} (heap)", expire_due, 200, 3))
+            results.append(bench(f"expire {due} due of n={size} (scan all keys)", scan, 200, 3))
+    return results
+
+
+if __name__ == '__main__':
+    print_results(run())
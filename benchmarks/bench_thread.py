@@ -0,0 +1,37 @@
+"""
+ThreadPoolManager 提交任务的开销：单个任务提交并等待结果的往返耗时、批量提交的每个任务耗时，
+以及 map 在不同 chunksize 下的每个元素耗时。被测任务几乎不做事，结果即为线程池本身的开销。
+
+    python -m benchmarks.bench_thread
+"""
+from concurrent.futures import wait
+
+from project import tp
+from benchmarks.common import bench, print_results
+
+
+def task(x=0):
+    return x
+
+
+def run(tasks: int = 1000):
+    def submit_many():
+        wait([tp.submit_task(task, i) for i in range(tasks)])
+
+    results = [
+        bench("direct call", task, 100000),
+        bench("submit_task + result", lambda: tp.submit_task(task).result(), 5000),
+    ]
+    for name, fn in (("submit_task batch", submit_many),
+                     ("map chunksize=1", lambda: list(tp.map(task, range(tasks)))),
+                     ("map chunksize=100", lambda: list(tp.map(task, range(tasks), chunksize=100)))):
+        result = bench(f"{name} ({tasks} tasks)", fn, 5, 3)
+        # 换算为每个任务的耗时
+        result['ns_per_op'] /= tasks
+        result['ops_per_sec'] *= tasks
+        results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    print_results(run())
@@ -0,0 +1,37 @@
+"""
+基准测试的公共工具。
+
+基准测试需要在项目根目录下以模块方式运行，例如：
+    python -m benchmarks.bench_logger
+"""
+import timeit
+
+
+def bench(name: str, fn, number: int = 100000, repeat: int = 5) -> dict:
+    """
+    连续调用 fn number 次并计时，重复 repeat 轮，取最快的一轮作为结果。
+
+    :param name: 测试项名称
+    :param fn: 无参数的被测函数
+    :param number: 每轮调用次数
+    :param repeat: 重复轮数
+    :return: 包含名称、单次耗时（纳秒）和每秒调用次数的字典
+    """
+    best = min(timeit.Timer(fn).repeat(repeat=repeat, number=number))
+    return {
+        'name': name,
+        'ns_per_op': best / number * 1e9,
+        'ops_per_sec': number / best if best else float('inf'),
+    }
+
+
+def print_results(results):
+    """
+    以表格形式打印基准测试结果。
+
+    :param results: bench 返回的字典组成的列表
+    """
+    width = max((len(r['name']) for r in results), default=4)
+    print(f"{'name':<{width}}  {'ns/op':>12}  {'ops/s':>14}")
+    for r in results:
+        print(f"{r['name']:<{width}}  {r['ns_per_op']:>12.1f}  {r['ops_per_sec']:>14.0f}")
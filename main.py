@@ -1,18 +1,65 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from project import logger
 from project import om
+from project import config
+import project
+from base.plugins import startup_plugins, shutdown_plugins
+from base.database.sql.sql_db_engine import dispose_async_sql_engine
+from base.database.redis_db.redis_db import warm_async_redis, close_async_redis
+from serve.responses import FastJSONRoute
+from serve.response_cache import ResponseCacheMiddleware, cache_response
+from serve.metrics import MetricsMiddleware, metrics, metrics_enabled, metrics_path
+
+use_redis = config['redis_db'].getboolean('use_redis', fallback=False)
+redis_warm_connections = int(config['redis_db'].get('redis_min_idle_connections', fallback=10))
+
+# 预热、插件、工具和服务的启动阶段在 project 导入完成后并行执行
+project.init()
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if use_redis:
+        try:
+            warmed = await warm_async_redis(om.get("async_redis_db"), redis_warm_connections)
+            logger.info(f"启动:异步Redis连接池预热完成，{warmed}个连接")
+        except Exception as e:
+            logger.error(f"启动:异步Redis连接池预热失败: {e}")
+    # 插件的资源池预热完成、启动函数执行完成后才开始接收请求
+    logger.info("启动:插件启动中")
+    await startup_plugins()
+    logger.info("启动:插件启动完成")
+    yield
+    logger.info("关闭:插件关闭中")
+    await shutdown_plugins()
+    logger.info("关闭:插件关闭完成")
+    await dispose_async_sql_engine()
+    await close_async_redis()
+    if "redis_batcher" in om.get_list():
+        om.get("redis_batcher").close()
 
 
 logger.info("初始化:实例化FastApi中")
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+# 没有响应模型的路由跳过 jsonable_encoder，返回值使用 orjson 序列化
+app.router.route_class = FastJSONRoute
+# 用 cache_response 标记的 GET 接口的响应缓存在项目缓存中，再次请求时不执行接口函数
+app.add_middleware(ResponseCacheMiddleware)
+if metrics_enabled:
+    # 最后添加的中间件在最外层，缓存命中的请求也被记录
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route(metrics_path, metrics, include_in_schema=False)
 logger.info("初始化:实例化FastApi完成")
 
 @app.get("/")
+@cache_response(ttl=60)
 async def root():
     return {"message": "Hello World"}
 
 
 @app.get("/hello/{name}")
+@cache_response(ttl=60)
 async def say_hello(name: str):
     return {"message": f"Hello {name}"}
@@ -12,4 +12,12 @@ logger.info(f"开始初始化插件{plugin_info.name},{plugin_info.version} ")
 logger.info(f"初始化插件完成{plugin_info.name}")
 
 
-# plugin.reg_init_plugin_func(init_plugin)
\ No newline at end of file
+@plugin.on_startup
+async def startup():
+    # 应用启动时执行，可以使用 plugin.add_pool 声明的资源池
+    logger.info(f"插件{plugin_info.name}启动")
+
+
+@plugin.on_shutdown
+async def shutdown():
+    logger.info(f"插件{plugin_info.name}关闭")
\ No newline at end of file
@@ -1,14 +1,19 @@
 import atexit
+import threading
 
 from base.confi import config
 
-from base.database.space import get_main_sql_session, create_redis_client
+from base.database.space import get_main_sql_session, create_redis_client, create_async_redis_client
 from base.object_manager import ObjectManager
 from base.logger import logger
+from base.bootstrap import Bootstrap
 
-from base.plugins import load_plugins
+from base.plugins import load_plugins, LazyPlugin
 
 #初始化过程
+#日志、配置和对象管理器在最前面依次初始化，其余部分划分为启动阶段，
+#导入 project 时执行事件管理器、线程池、缓存等核心阶段；预热、自检、插件、工具和服务在 init() 中执行，
+#没有依赖关系的阶段并行执行，启动完成后在日志中输出每个阶段的耗时
 
 ################## 对象管理器 om ##################
 logger.info("初始化:实例化全局对象管理器om")
@@ -24,109 +29,254 @@ logger.info("初始化:注册日志器到om完成")
 # logger.info("初始化:实例化配置文件读取器 config 成功")
 om.store("config",config)
 logger.info("初始化:注册配置文件读取器 config 到 om 成功")
+
+################## 启动阶段 bootstrap ##################
+bootstrap = Bootstrap("project", max_workers=int(config['bootstrap'].get('max_workers', fallback=4)))
+om.store("bootstrap", bootstrap)
+# 启动自检会向 simple_table_01、simple_table_02 写入并删除数据
+self_test = config['bootstrap'].getboolean('self_test', fallback=False)
+# 配置 [object_manager] prewarm_keys 中的延迟对象在启动阶段并行构造
+prewarm_keys = [key.strip() for key in config['object_manager'].get('prewarm_keys', fallback='').split(',') if key.strip()]
+
+# 以下变量由启动阶段赋值，plugins_list 在 init() 中赋值
+ev = None
+tp = None
+pool_size = None
+cache = None
+sql_base_class = None
+plugins_list = []
+
 ##################事件管理器 ev ====================
-logger.info("初始化:创建事件管理器ev" )
-from base.event import EventManager
-logger.info(f"初始化:创建事件管理器ev完成")
-ev = EventManager()
-om.store("ev",ev)
-logger.info(f"初始化:注册事件管理器ev到对象管理器om完成")
+@bootstrap.phase("ev")
+def _init_ev():
+    global ev
+    logger.info("初始化:创建事件管理器ev" )
+    from base.event import EventManager
+    logger.info(f"初始化:创建事件管理器ev完成")
+    ev = EventManager()
+    om.store("ev",ev)
+    logger.info(f"初始化:注册事件管理器ev到对象管理器om完成")
 
 ################# 线程池 tp ###################
-logger.info("初始化:创建线程池" )
-from base.thread import tp,pool_size
-logger.info(f"初始化:创建线程池,最大线程数量{pool_size}")
-om.store("tp",tp)
-logger.info(f"初始化:创建线程池完成")
+@bootstrap.phase("tp")
+def _init_tp():
+    global tp, pool_size
+    logger.info("初始化:创建线程池" )
+    from base.thread import tp, pool_size, auto_tune, auto_tune_min_workers, auto_tune_max_workers
+    if auto_tune:
+        logger.info(f"初始化:创建自适应线程池,线程数量{auto_tune_min_workers}~{auto_tune_max_workers}")
+    else:
+        logger.info(f"初始化:创建线程池,最大线程数量{pool_size}")
+    om.store("tp",tp)
+    logger.info(f"初始化:创建线程池完成")
 
 ################## 缓存 cache ###################
-logger.info(f"初始化:创建昂贵计算缓存池")
-from base.cache import cache, maximum_of_results_cached
-logger.info(f"初始化:创建昂贵计算缓存池,最大缓存数量{maximum_of_results_cached}")
+@bootstrap.phase("cache")
+def _init_cache():
+    global cache
+    logger.info(f"初始化:创建昂贵计算缓存池")
+    from base.cache import cache, maximum_of_results_cached
+    logger.info(f"初始化:创建昂贵计算缓存池,最大缓存数量{maximum_of_results_cached}")
 
-om.store("cache",cache)
-logger.info("初始化:注册昂贵计算缓存池到om完成")
+    om.store("cache",cache)
+    logger.info("初始化:注册昂贵计算缓存池到om完成")
 
-################### 初始化表单数据库 ###################
-logger.info("初始化:多表单数据库")
-from base.database.space import mt_db, get_sql_base_class, create_all_tables
+################### 数据库 ###################
+# 数据库和 Redis 都注册为延迟对象，第一次 om.get 时才会构造，没有用到的资源不产生开销
+from base.database.space import get_mt_db, get_sql_base_class, create_all_tables, init_sql_engine, init_async_sql_engine
+from base.database.sql.sql_db_engine import get_async_main_sql_session
+from base.database.sql.query_cache import query_cache
 
-logger.info("初始化:连接simple_table_01表单数据库")
-mt_db.ensure_table_exists("simple_table_01")
 
-mt_db["simple_table_01"].insert("say","nihao")
-mt_db["simple_table_01"].get("say")
-mt_db["simple_table_01"].delete("say")
-logger.info("初始化:连接simple_table_01表单数据库成功")
+def _create_mt_db():
+    logger.info("初始化:多表单数据库")
+    return get_mt_db()
 
-logger.info("初始化:连接simple_table_02表单数据库")
-mt_db.ensure_table_exists("simple_table_02")
-mt_db["simple_table_02"].insert("say","nihao")
-mt_db["simple_table_02"].get("say")
-mt_db["simple_table_02"].delete("say")
-logger.info("初始化:连接simple_table_02表单数据库成功")
 
-om.store("mt_db",mt_db)
-logger.info("初始化:注册多表单数据库到对象管理器完成")
+def _create_sql_engine():
+    logger.info("初始化:主sql数据库引擎初始化")
+    engine = init_sql_engine()
+    logger.info("初始化:主sql数据库引擎创建成功")
+    # 写入提交后自动失效查询缓存
+    query_cache.attach(engine)
+    create_all_tables(engine)
+    logger.info("创建所有表成功")
+    return engine
 
-################### 初始化Sql 数据库 ###################
 
-from base.database.space import init_sql_engine
-logger.info("初始化:主sql数据库引擎初始化")
-sql_db = None
-sql_base_class = None
-main_sql_session = None
-redis_db = None
-try:
-    sql_db = init_sql_engine()
-    logger.info("初始化:主sql数据库引擎创建成功")
-    om.store("sql_db",sql_db)
-    logger.info("初始化:注册主sql数据库引擎到对象管理器完成")
+def _create_main_sql_session(engine):
+    logger.info("初始化:获取数据库主对话")
+    return get_main_sql_session()
+
+
+def _create_async_sql_engine(engine):
+    # 依赖同步引擎，保证表已经创建
+    logger.info("初始化:主sql数据库异步引擎初始化")
+    async_engine = init_async_sql_engine()
+    query_cache.attach(async_engine.sync_engine)
+    return async_engine
+
+
+def _create_async_sql_session(async_engine):
+    return get_async_main_sql_session()
+
+
+def _create_redis_batcher(client):
+    from base.database.redis_db.batch import RedisBatcher
+    return RedisBatcher(client)
+
+
+@bootstrap.phase("providers")
+def _register_providers():
+    global sql_base_class
+    om.register_factory("mt_db", _create_mt_db)
+    logger.info("初始化:注册多表单数据库到对象管理器完成")
+
     sql_base_class = get_sql_base_class()
     om.store("sql_base_class",sql_base_class)
+    om.store("query_cache", query_cache)
     logger.info("初始化:表基类注册到对象管理器完成")
-    create_all_tables(sql_db)
-    logger.info("创建所有表成功")
-    logger.info("初始化:获取数据库主对话")
-    main_sql_session = get_main_sql_session()
-    om.store("sql_db",main_sql_session)
-    logger.info("初始化:获取数据库主对话对象到对象管理器完成")
+    # sql_engine 为数据库引擎，sql_db 为数据库主对话
+    om.register_factory("sql_engine", _create_sql_engine)
+    om.register_factory("sql_db", _create_main_sql_session, deps=("sql_engine",))
+    logger.info("初始化:注册主sql数据库引擎到对象管理器完成")
+    if config['sql_db'].getboolean('async_engine', fallback=True):
+        # async_sql_engine 为异步引擎，async_sql_db 为异步会话工厂，请求中通过 get_async_session 依赖使用
+        om.register_factory("async_sql_engine", _create_async_sql_engine, deps=("sql_engine",))
+        om.register_factory("async_sql_db", _create_async_sql_session, deps=("async_sql_engine",))
+        logger.info("初始化:注册主sql数据库异步引擎到对象管理器完成")
+
+    if config['redis_db'].getboolean('use_redis', fallback=False):
+        om.register_factory("redis_db", create_redis_client)
+        # redis_batcher 把短时间内的命令合并为 pipeline 发送
+        om.register_factory("redis_batcher", _create_redis_batcher, deps=("redis_db",))
+        # async_redis_db 为异步客户端，只能在应用的事件循环中使用，应用启动时预热，关闭时关闭
+        om.register_factory("async_redis_db", create_async_redis_client)
+        logger.info("初始化:注册Redis到对象管理器完成")
+    else:
+        logger.info("初始化:未配置Redis")
+
+
+# 延迟对象仍然可以通过 from project import sql_db 等方式访问，访问时才会构造
+_lazy_globals = {
+    "mt_db": "mt_db",
+    "sql_db": "sql_engine",
+    "main_sql_session": "sql_db",
+    "redis_db": "redis_db",
+}
+
+
+def __getattr__(name):
+    if name in _lazy_globals:
+        try:
+            return om.get(_lazy_globals[name])
+        except KeyError:
+            return None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+################### 配置热更新 ###################
+# 配置文件修改后，线程池大小、缓存容量和日志等级不需要重启即可生效
+watch_config = config.getboolean('config', 'watch', fallback=True)
+watch_config_interval = config.getfloat('config', 'watch_interval', fallback=2.0)
+
 
-except:
-    logger.info("初始化:注册主sql数据库引擎到对象管理器失败")
+@bootstrap.phase("config_watch", depends=("ev", "tp", "cache"), required=False)
+def _init_config_watch():
+    if not watch_config:
+        return
+    from base import cache as cache_module, logger as logger_module, thread as thread_module
+    from base.confi import config_watcher
+    ev.register("config/changed", thread_module.on_config_changed)
+    ev.register("config/changed", cache_module.on_config_changed)
+    ev.register("config/changed", logger_module.on_config_changed)
+    config_watcher.interval = watch_config_interval
+    config_watcher.start(ev)
+    logger.info(f"初始化:监视配置文件修改，间隔{watch_config_interval}秒")
 
+# 导入 project 时在导入线程中依次执行以上阶段，之后 from project import ev, tp, cache 等即可使用。
+# 导入过程中不启动线程：线程中 from project import 会等待 project 的导入锁，而导入线程在等待阶段完成
+bootstrap.run(parallel=False)
 
-##################连接Redis========================
-logger.info("初始化:连接Redis")
-r = create_redis_client()
-if r is None:
-    redis_db = r
-    om.store("redis_db",redis_db )
-    logger.info("初始化:获取Redis对话对象到对象管理器完成")
-else:
-    logger.info("初始化:未配置Redis")
+################### 预热 ###################
+# 每个预热对象是一个独立的阶段，表单数据库加载、sql 连接和插件导入可以同时进行
+def _prewarm_phase(key):
+    def prewarm():
+        om.get(key)
+        logger.info(f"初始化:预热{key}完成")
+    return prewarm
+
+
+for _key in prewarm_keys:
+    bootstrap.add_phase(f"prewarm:{_key}", _prewarm_phase(_key), depends=("providers",), required=False)
+
+################### 启动自检 ###################
+@bootstrap.phase("self_test", depends=("providers",), required=False)
+def _self_test():
+    if not self_test:
+        return
+    mt_db = om.get("mt_db")
+    logger.info("初始化:连接simple_table_01表单数据库")
+    mt_db.ensure_table_exists("simple_table_01")
+    mt_db["simple_table_01"].insert("say","nihao")
+    mt_db["simple_table_01"].get("say")
+    mt_db["simple_table_01"].delete("say")
+    logger.info("初始化:连接simple_table_01表单数据库成功")
+
+    logger.info("初始化:连接simple_table_02表单数据库")
+    mt_db.ensure_table_exists("simple_table_02")
+    mt_db["simple_table_02"].insert("say","nihao")
+    mt_db["simple_table_02"].get("say")
+    mt_db["simple_table_02"].delete("say")
+    logger.info("初始化:连接simple_table_02表单数据库成功")
 
 ################### 插件 plugins ###################
-logger.info("初始化:插件加载")
-plugins_list = load_plugins()
-# 输出加载了几个插件的汇总消息
-logger.info(f"初始化:加载了{len(plugins_list)}个插件:")
-# 遍历插件列表，每行列出一个插件的名称和版本
-for plugin in plugins_list:
-    plugin_info = plugin.get_info()
-    logger.info(f"  - {plugin_info.name}，版本：{plugin_info.version}")
+@bootstrap.phase("plugins", depends=("ev", "tp", "cache", "providers"))
+def _init_plugins():
+    global plugins_list
+    logger.info("初始化:插件加载")
+    plugins_list = load_plugins()
+    # 输出加载了几个插件的汇总消息
+    logger.info(f"初始化:加载了{len(plugins_list)}个插件:")
+    # 遍历插件列表，每行列出一个插件的名称和版本
+    for plugin in plugins_list:
+        plugin_info = plugin.get_info()
+        if isinstance(plugin, LazyPlugin):
+            logger.info(f"  - {plugin_info.name}，版本：{plugin_info.version}（延迟加载）")
+        else:
+            logger.info(f"  - {plugin_info.name}，版本：{plugin_info.version}")
 
-logger.info("初始化:插件加载完成")
+    logger.info("初始化:插件加载完成")
 
-logger.info("初始化:工具")
-import tool
+################### 工具和服务 ###################
+@bootstrap.phase("tool", depends=("plugins",))
+def _init_tool():
+    logger.info("初始化:工具")
+    import tool
 
-logger.info("初始化:服务")
-import serve
 
+@bootstrap.phase("serve", depends=("tool",))
+def _init_serve():
+    logger.info("初始化:服务")
+    import serve
 
-# print(om.get_list())
 
+_init_lock = threading.Lock()
 
 
+def init():
+    """
+    执行其余的启动阶段：预热、自检、插件、工具和服务，没有依赖关系的阶段并行执行。
+    只在第一次调用时执行，之后的调用直接返回。
 
+    必须在 project 导入完成后调用（例如 main.py 中 import 之后），不能在 project 或阶段中导入的包的导入过程中调用，
+    否则阶段线程导入这些模块时会等待导入锁。
+
+    :raises Exception: 必需阶段失败时，抛出该阶段的异常
+    """
+    with _init_lock:
+        if any(phase.status == 'pending' for phase in bootstrap.phases.values()):
+            bootstrap.run()
+
+
+# print(om.get_list())
@@ -0,0 +1,29 @@
+"""
+多进程服务入口，参数的默认值来自配置 [serve]：
+
+    python -m serve
+    python -m serve --workers 4 --port 8080 --limit-max-requests 10000
+"""
+import argparse
+
+from serve.prefork import (PreforkServer, serve_host, serve_port, serve_workers, serve_limit_max_requests,
+                           serve_limit_max_requests_jitter, serve_graceful_timeout, serve_backlog)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m serve', description='以多个工作进程运行应用')
+    parser.add_argument('--app', default='main:app', help='"模块:属性" 形式的应用导入路径')
+    parser.add_argument('--host', default=serve_host)
+    parser.add_argument('--port', type=int, default=serve_port)
+    parser.add_argument('--workers', type=int, default=serve_workers, help='工作进程数，0 表示与 CPU 数量相同')
+    parser.add_argument('--limit-max-requests', type=int, default=serve_limit_max_requests,
+                        help='每个工作进程处理的最大请求数，达到后由新的工作进程替换，0 表示不限制')
+    parser.add_argument('--limit-max-requests-jitter', type=int, default=serve_limit_max_requests_jitter)
+    parser.add_argument('--graceful-timeout', type=int, default=serve_graceful_timeout)
+    parser.add_argument('--backlog', type=int, default=serve_backlog)
+    args = parser.parse_args(argv)
+    PreforkServer(**vars(args)).run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+请求指标和 /metrics 接口。
+
+MetricsMiddleware 按路由记录请求耗时直方图、按状态码计数，并记录正在处理的请求数。
+/metrics 以 Prometheus 文本格式输出这些指标，以及框架内部的状态：
+
+- 线程池 tp：线程数、执行中的线程数、排队任务数
+- 项目缓存：命中次数、未命中次数、命中率
+- TableDB：写入文件的耗时（base.database.table_db 中记录）
+- EventManager：触发事件的耗时（base.event 中记录）
+- SQL 连接池：已创建的引擎的签出连接数、连接池大小和溢出连接数
+
+    app.add_middleware(MetricsMiddleware)
+    app.add_api_route(metrics_path, metrics, include_in_schema=False)
+
+路由标签使用路由的路径模板（例如 /hello/{name}），没有匹配到路由的请求为 <unmatched>，标签的取值数量有限。
+"""
+import time
+
+from starlette.responses import Response
+
+from project import config
+from base.metrics import registry
+
+metrics_enabled = config['metrics'].getboolean('metrics', fallback=True)
+metrics_path = config['metrics'].get('metrics_path', fallback='/metrics')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+request_seconds = registry.histogram("http_request_duration_seconds", "请求处理耗时（秒）", ("method", "route"))
+responses_total = registry.counter("http_responses_total", "按状态码统计的响应数", ("method", "route", "status"))
+in_flight = registry.gauge("http_requests_in_flight", "正在处理的请求数")
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        # 应用抛出异常且没有发送响应时，服务器返回 500
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            # 路由匹配后 scope['route'] 为匹配的路由
+            route = getattr(scope.get('route'), 'path', None) or '<unmatched>'
+            method = scope['method']
+            request_seconds.observe(elapsed, method, route)
+            responses_total.inc(method, route, str(status))
+
+
+async def metrics():
+    """Prometheus 文本格式的指标"""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+# 以下采集函数在 /metrics 被请求时调用
+@registry.collector
+def _thread_pool_metrics():
+    from project import tp
+    if tp is None:
+        return []
+    stats = tp.stats()
+    return [
+        ("tp_workers", "gauge", "线程池的线程数", [({}, stats['workers'])]),
+        ("tp_active_workers", "gauge", "线程池中正在执行任务的线程数", [({}, stats['active'])]),
+        ("tp_queue_depth", "gauge", "线程池中排队等待的任务数", [({}, stats['queued'])]),
+        ("tp_max_workers", "gauge", "线程池允许的最大线程数", [({}, stats['max_workers'])]),
+    ]
+
+
+@registry.collector
+def _cache_metrics():
+    from base.cache import get_singleton_cache
+    stats = get_singleton_cache().stats()
+    return [
+        ("cache_hits_total", "counter", "项目缓存的命中次数", [({}, stats['hits'])]),
+        ("cache_misses_total", "counter", "项目缓存的未命中次数", [({}, stats['misses'])]),
+        ("cache_hit_ratio", "gauge", "项目缓存的命中率", [({}, stats['hit_ratio'])]),
+        ("cache_entries", "gauge", "项目缓存的缓存项数", [({}, stats['size'])]),
+    ]
+
+
+@registry.collector
+def _sql_pool_metrics():
+    from project import om
+    created = om.get_list()
+    checked_out, size, overflow = [], [], []
+    for key in ("sql_engine", "async_sql_engine"):
+        # 只采集已经创建的引擎，不因为采集指标而创建引擎
+        if key not in created:
+            continue
+        engine = om.get(key)
+        pool = getattr(engine, 'sync_engine', engine).pool
+        labels = {'engine': key}
+        if hasattr(pool, 'checkedout'):
+            checked_out.append((labels, pool.checkedout()))
+        if hasattr(pool, 'size'):
+            size.append((labels, pool.size()))
+        if hasattr(pool, 'overflow'):
+            overflow.append((labels, pool.overflow()))
+    return [
+        ("sql_pool_checked_out", "gauge", "SQL 连接池中被签出的连接数", checked_out),
+        ("sql_pool_size", "gauge", "SQL 连接池的大小", size),
+        ("sql_pool_overflow", "gauge", "SQL 连接池的溢出连接数", overflow),
+    ]
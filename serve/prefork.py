@@ -0,0 +1,190 @@
+"""
+多进程服务，入口为 python -m serve。
+
+主进程导入应用一次：执行项目的启动流程、预热 om 中的对象（[object_manager] prewarm_keys）、创建数据库表等
+只需要做一次的初始化，然后创建监听套接字，fork 出 workers 个工作进程共同接收连接。
+工作进程继承主进程初始化好的状态（写时复制），fork 后各自重建进程内的资源（线程池、日志写入线程、SQL 连接池、
+Redis 批处理线程、插件监视线程，见各模块的 os.register_at_fork），再执行应用的 lifespan（启动插件、预热异步 Redis 连接）。
+主进程不处理请求，也不执行 lifespan。
+
+- 工作进程处理 limit_max_requests 个请求后退出（再加上 0~limit_max_requests_jitter 的随机数，避免所有工作进程同时重启），
+  主进程启动新的工作进程，限制内存的增长。
+- 工作进程意外退出时主进程重新启动它；启动后很快就失败退出时，先等待一秒，避免不停地重启。
+- 多个工作进程时 TableDB 的写入使用文件锁协调（base.database.table_db.process_shared）。
+- 多个工作进程时所有进程追加同一个日志文件，日志文件的大小轮转和压缩被关闭（base.logger.disable_rotation），
+  需要轮转时使用外部工具（例如 logrotate 的 copytruncate）。
+- SIGINT / SIGTERM：通知所有工作进程优雅退出，超过 graceful_timeout 秒仍未退出的工作进程被强制结束。
+
+不支持 fork 的平台（Windows）上在当前进程中运行单个服务。
+"""
+import atexit
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+from uvicorn.importer import import_from_string
+
+from project import logger, config
+from base.logger import disable_rotation
+from base.database import table_db
+
+serve_host = config['serve'].get('host', fallback='127.0.0.1')
+serve_port = int(config['serve'].get('port', fallback=8000))
+serve_workers = int(config['serve'].get('workers', fallback=1))
+serve_limit_max_requests = int(config['serve'].get('limit_max_requests', fallback=0))
+serve_limit_max_requests_jitter = int(config['serve'].get('limit_max_requests_jitter', fallback=0))
+serve_graceful_timeout = int(config['serve'].get('graceful_timeout', fallback=30))
+serve_backlog = int(config['serve'].get('backlog', fallback=2048))
+
+# 工作进程启动后在这个时间（秒）内失败退出时，等待一秒再重启
+_QUICK_EXIT = 1.0
+
+
+class PreforkServer:
+    def __init__(self, app='main:app', host: str = serve_host, port: int = serve_port, workers: int = serve_workers,
+                 limit_max_requests: int = serve_limit_max_requests,
+                 limit_max_requests_jitter: int = serve_limit_max_requests_jitter,
+                 graceful_timeout: int = serve_graceful_timeout, backlog: int = serve_backlog, **uvicorn_options):
+        """
+        :param app: ASGI 应用或 "模块:属性" 形式的导入路径
+        :param host: 监听地址
+        :param port: 监听端口
+        :param workers: 工作进程数，0 表示与 CPU 数量相同
+        :param limit_max_requests: 每个工作进程处理的最大请求数，0 表示不限制
+        :param limit_max_requests_jitter: 最大请求数上增加的随机数的上限
+        :param graceful_timeout: 退出时等待工作进程处理完请求的秒数
+        :param backlog: 监听套接字的连接队列长度
+        :param uvicorn_options: 传给 uvicorn.Config 的其他参数
+        """
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.limit_max_requests = limit_max_requests
+        self.limit_max_requests_jitter = limit_max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.backlog = backlog
+        self.uvicorn_options = uvicorn_options
+        self.sock = None
+        # 工作进程 pid -> 启动时间
+        self.children = {}
+        self.stopping = False
+
+    def _bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ':' in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(self.backlog)
+        sock.set_inheritable(True)
+        return sock
+
+    def _serve(self):
+        """在当前进程中运行 uvicorn，使用主进程创建的监听套接字"""
+        server = uvicorn.Server(uvicorn.Config(
+            self.app,
+            host=self.host,
+            port=self.port,
+            limit_max_requests=self.limit_max_requests or None,
+            limit_max_requests_jitter=self.limit_max_requests_jitter,
+            timeout_graceful_shutdown=self.graceful_timeout,
+            backlog=self.backlog,
+            **self.uvicorn_options,
+        ))
+        server.run(sockets=[self.sock])
+
+    def run(self):
+        if isinstance(self.app, str):
+            logger.info(f"服务:导入应用{self.app}")
+            self.app = import_from_string(self.app)
+        self.sock = self._bind()
+        logger.info(f"服务:监听 http://{self.host}:{self.port}")
+        if not hasattr(os, 'fork'):
+            logger.warning("服务:当前平台不支持 fork，以单进程运行")
+            self._serve()
+            return
+        if self.workers > 1:
+            table_db.process_shared = True
+            disable_rotation()
+            logger.info("服务:多个工作进程共用日志文件，关闭日志文件轮转")
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGALRM, self._handle_graceful_timeout)
+        for _ in range(self.workers):
+            self._spawn()
+        try:
+            self._supervise()
+        finally:
+            self.sock.close()
+        logger.info("服务:已停止")
+
+    def _supervise(self):
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                logger.info(f"服务:工作进程{pid}已退出")
+                continue
+            if code == 0:
+                logger.info(f"服务:工作进程{pid}已退出（达到最大请求数），启动新的工作进程")
+            else:
+                logger.error(f"服务:工作进程{pid}异常退出，退出码{code}，启动新的工作进程")
+                if time.monotonic() - started < _QUICK_EXIT:
+                    time.sleep(1)
+            if not self.stopping:
+                self._spawn()
+
+    def _spawn(self):
+        # 标准输出的缓冲会被复制到子进程，fork 之前先写出
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            logger.info(f"服务:启动工作进程{pid}")
+            return
+        code = 0
+        try:
+            for signum in (signal.SIGINT, signal.SIGTERM, signal.SIGALRM):
+                signal.signal(signum, signal.SIG_DFL)
+            self.children = {}
+            self._serve()
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except BaseException as e:
+            logger.error(f"服务:工作进程{os.getpid()}出错: {e}")
+            code = 1
+        finally:
+            # 工作进程不回到主进程的代码，直接退出；退出前执行 atexit（关闭线程池、写完日志）
+            try:
+                atexit._run_exitfuncs()
+            finally:
+                os._exit(code)
+
+    def _handle_stop(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info(f"服务:收到信号{signal.Signals(signum).name}，等待工作进程退出")
+        self._kill_children(signal.SIGTERM)
+        signal.alarm(max(self.graceful_timeout, 1))
+
+    def _handle_graceful_timeout(self, signum, frame):
+        logger.warning("服务:工作进程没有在规定时间内退出，强制结束")
+        self._kill_children(signal.SIGKILL)
+
+    def _kill_children(self, signum):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                self.children.pop(pid, None)
@@ -0,0 +1,325 @@
+"""
+HTTP 响应缓存。
+
+幂等的 GET 接口每次都重新计算并序列化相同的响应。ResponseCacheMiddleware 把用 cache_response 标记的接口的完整响应
+（状态码、响应头、响应体）缓存在独立的 SingletonLRUCache 中（不与 lru_cache_decorator 的结果互相淘汰，
+也不计入 /metrics 中项目缓存的命中率），键为请求路径加查询字符串，再次请求时不经过路由，也不执行接口函数：
+
+    app.add_middleware(ResponseCacheMiddleware)
+
+    @app.get("/hello/{name}")
+    @cache_response(ttl=30)
+    async def say_hello(name: str):
+        ...
+
+    @app.get("/users")
+    @cache_response(ttl=60, tables=("users",), invalidate_on=("users/changed",))
+    async def list_users():
+        ...
+
+- 响应带有 ETag（响应体的哈希），请求头 If-None-Match 匹配时返回 304，不发送响应体。
+- 响应带有 Cache-Control: public, max-age=<ttl>（private=True 时为 private），也可以用 cache_control 指定。
+- 失效：tables 中的表有写入提交时（EventManager 上的 sql/invalidate 事件），或 invalidate_on 中的事件被触发时，
+  接口的缓存响应失效；也可以调用 response_cache.invalidate(tag) 使带有该标签的响应失效。
+- 响应随请求头变化时（例如按用户返回不同的数据）用 vary 指定这些请求头，请求头的值不同时不使用缓存的响应。
+- 只缓存状态码为 200、没有 Set-Cookie、没有 no-store/private 的响应，以及不超过 [cache] response_cache_max_body 字节的响应体。
+- 请求头 Cache-Control: no-cache 跳过缓存，重新执行接口并更新缓存。
+- 没有缓存项的路径（没有 cache_response 的接口、404、/metrics 等）不查找缓存，直接交给应用。
+"""
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Iterable, Tuple
+
+from project import config
+from base.cache import SingletonLRUCache, maximum_of_results_cached
+
+response_cache_enabled = config['cache'].getboolean('response_cache', fallback=True)
+response_cache_max_body = int(config['cache'].get('response_cache_max_body', fallback=1048576))
+response_cache_max_entries = int(config['cache'].get('response_cache_max_entries', fallback=maximum_of_results_cached))
+
+# 接口函数上存放缓存策略的属性名，FastJSONRoute 的 functools.wraps 会保留它
+_POLICY_ATTR = '__response_cache__'
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    ttl: float
+    tags: Tuple[str, ...]
+    vary: Tuple[bytes, ...]
+    cache_control: bytes
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    status: int
+    headers: list
+    body: bytes
+    etag: bytes
+    tags: Tuple[str, ...]
+    versions: tuple
+    vary: Tuple[bytes, ...]
+    vary_values: tuple
+    # 生成响应的路由，命中时放回 scope['route']，外层的中间件（例如 MetricsMiddleware）据此识别接口
+    route: object = None
+
+
+def _table_tag(table: str) -> str:
+    return f"table:{table}"
+
+
+def _event_tag(event_name: str) -> str:
+    return f"event:{event_name}"
+
+
+class ResponseCache:
+    def __init__(self, cache=None):
+        """
+        :param cache: 存放响应的缓存，默认创建最多 response_cache_max_entries 项的 SingletonLRUCache
+        """
+        self.cache = cache if cache is not None else SingletonLRUCache(response_cache_max_entries)
+        # 标签 -> 版本号，失效时版本号加一，旧的响应不再命中
+        self._versions = {}
+        self._lock = threading.Lock()
+        # 事件名 -> 处理器，EventManager 只保存处理器的弱引用，这里保持强引用
+        self._handlers = {}
+
+    def versions(self, tags: Iterable[str], snapshot: dict = None) -> tuple:
+        """
+        标签的版本号。
+
+        :param snapshot: snapshot() 返回的版本号，默认使用当前的版本号
+        """
+        versions = self._versions if snapshot is None else snapshot
+        return tuple(versions.get(tag, 0) for tag in tags)
+
+    def snapshot(self) -> dict:
+        """当前所有标签的版本号"""
+        return self._versions.copy()
+
+    def invalidate(self, *tags: str):
+        """
+        使带有这些标签的缓存响应失效。
+
+        :param tags: cache_response 的 tags，或 "table:<表名>"、"event:<事件名>"
+        """
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+    def clear(self):
+        """使所有缓存响应失效，所有响应都带有空标签 ''"""
+        self.invalidate('')
+
+    def watch(self, event_name: str):
+        """
+        在 EventManager 上注册处理器，事件被触发时使 "event:<事件名>" 标签的响应失效。
+        sql/invalidate 事件同时使涉及的表的 "table:<表名>" 标签失效。
+
+        :param event_name: 事件名
+        """
+        with self._lock:
+            if event_name in self._handlers:
+                return
+            if event_name == "sql/invalidate":
+                def handler(tables=(), *args, **kwargs):
+                    self.invalidate(_event_tag(event_name), *(_table_tag(table) for table in tables))
+            else:
+                def handler(*args, **kwargs):
+                    self.invalidate(_event_tag(event_name))
+            self._handlers[event_name] = handler
+        from project import ev
+        ev.register(event_name, handler)
+
+    def key(self, scope) -> tuple:
+        query = scope.get('query_string', b'')
+        if b'&' in query:
+            # 参数顺序不同的查询字符串使用同一个键
+            query = b'&'.join(sorted(query.split(b'&')))
+        return 'http_response', scope.get('root_path', '') + scope['path'], query
+
+    def get(self, key, headers: dict):
+        """返回仍然有效的缓存响应，没有时返回 None"""
+        if key not in self.cache:
+            # 大部分请求的路径从来没有缓存项，不计入未命中次数
+            return None
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+        if self.versions(entry.tags) != entry.versions:
+            return None
+        if entry.vary and tuple(headers.get(name) for name in entry.vary) != entry.vary_values:
+            return None
+        return entry
+
+    def set(self, key, policy: CachePolicy, snapshot: dict, headers: dict, status: int, response_headers: list,
+            body: bytes, route=None) -> CachedResponse:
+        """
+        缓存响应。
+
+        :param snapshot: 请求开始时 snapshot() 返回的版本号，处理请求期间发生的失效使这个响应不会命中
+        :param headers: 请求头，用于 vary
+        :param route: 生成响应的路由
+        :return: 缓存的响应
+        """
+        etag = b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode('ascii') + b'"'
+        response_headers = [(name, value) for name, value in response_headers
+                            if name.lower() not in (b'etag', b'cache-control', b'vary')]
+        response_headers.append((b'etag', etag))
+        response_headers.append((b'cache-control', policy.cache_control))
+        if policy.vary:
+            response_headers.append((b'vary', b', '.join(policy.vary)))
+        entry = CachedResponse(status, response_headers, body, etag, policy.tags,
+                               self.versions(policy.tags, snapshot), policy.vary,
+                               tuple(headers.get(name) for name in policy.vary), route)
+        self.cache.set(key, entry, policy.ttl)
+        return entry
+
+
+response_cache = ResponseCache()
+
+
+def cache_response(ttl: float = 60, tables: Iterable[str] = (), invalidate_on: Iterable[str] = (),
+                   tags: Iterable[str] = (), vary: Iterable[str] = (), private: bool = False,
+                   cache_control: str = None):
+    """
+    标记接口的 GET 响应可以缓存，需要应用安装 ResponseCacheMiddleware。
+    放在路由装饰器（@app.get）的下面。
+
+    :param ttl: 缓存的有效期（秒），同时作为 Cache-Control 的 max-age
+    :param tables: 这些表有写入提交时缓存失效
+    :param invalidate_on: EventManager 上的这些事件被触发时缓存失效
+    :param tags: 自定义标签，调用 response_cache.invalidate(tag) 时缓存失效
+    :param vary: 响应随这些请求头变化，例如 "authorization"、"accept-language"
+    :param private: 为 True 时 Cache-Control 为 private，浏览器可以缓存，共享的代理不缓存
+    :param cache_control: Cache-Control 响应头，默认根据 ttl 和 private 生成
+    """
+    tables, invalidate_on, vary = tuple(tables), tuple(invalidate_on), tuple(vary)
+    if tables and "sql/invalidate" not in invalidate_on:
+        response_cache.watch("sql/invalidate")
+    for event_name in invalidate_on:
+        response_cache.watch(event_name)
+    if cache_control is None:
+        cache_control = f"{'private' if private else 'public'}, max-age={int(ttl)}"
+    policy = CachePolicy(
+        ttl=ttl,
+        tags=('',) + tuple(tags) + tuple(map(_table_tag, tables)) + tuple(map(_event_tag, invalidate_on)),
+        vary=tuple(name.lower().encode('latin-1') for name in vary),
+        cache_control=cache_control.encode('latin-1'),
+    )
+
+    def decorator(endpoint):
+        setattr(endpoint, _POLICY_ATTR, policy)
+        return endpoint
+    return decorator
+
+
+def _etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    """If-None-Match 使用弱比较，W/ 前缀不影响匹配"""
+    if if_none_match.strip() == b'*':
+        return True
+    return any(tag.strip().removeprefix(b'W/') == etag for tag in if_none_match.split(b','))
+
+
+def _not_modified_headers(entry: CachedResponse) -> list:
+    return [(name, value) for name, value in entry.headers
+            if name in (b'etag', b'cache-control', b'vary', b'expires', b'content-location', b'date')]
+
+
+class ResponseCacheMiddleware:
+    def __init__(self, app, cache: ResponseCache = None, enabled: bool = response_cache_enabled,
+                 max_body: int = response_cache_max_body):
+        """
+        :param app: ASGI 应用
+        :param cache: ResponseCache，默认使用模块的 response_cache
+        :param enabled: 为 False 时所有请求直接交给应用
+        :param max_body: 缓存的响应体的最大字节数
+        """
+        self.app = app
+        self.cache = cache if cache is not None else response_cache
+        self.enabled = enabled
+        self.max_body = max_body
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope['type'] != 'http' or scope['method'] not in ('GET', 'HEAD'):
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope['headers'])
+        key = self.cache.key(scope)
+        no_cache = b'no-cache' in headers.get(b'cache-control', b'')
+        if not no_cache:
+            entry = self.cache.get(key, headers)
+            if entry is not None:
+                if entry.route is not None:
+                    scope['route'] = entry.route
+                await self._send(entry, headers, scope['method'], send, b'HIT')
+                return
+        if scope['method'] == 'HEAD':
+            await self.app(scope, receive, send)
+            return
+        await self._call_and_store(scope, receive, send, key, headers)
+
+    @staticmethod
+    async def _send(entry: CachedResponse, headers: dict, method: str, send, x_cache: bytes):
+        if_none_match = headers.get(b'if-none-match')
+        if if_none_match is not None and _etag_matches(if_none_match, entry.etag):
+            await send({'type': 'http.response.start', 'status': 304, 'headers': _not_modified_headers(entry)})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        await send({'type': 'http.response.start', 'status': entry.status,
+                    'headers': entry.headers + [(b'x-cache', x_cache)]})
+        await send({'type': 'http.response.body', 'body': entry.body if method == 'GET' else b''})
+
+    async def _call_and_store(self, scope, receive, send, key, headers: dict):
+        # 响应开始时路由已经匹配，接口函数在 scope['endpoint'] 中
+        # 在执行接口之前记录版本号，接口执行期间数据发生变化时，这个响应写入缓存后也不会命中
+        state = {'start': None, 'chunks': [], 'size': 0, 'policy': None, 'snapshot': self.cache.snapshot()}
+
+        async def flush():
+            """不缓存这个响应，把已经收到的部分原样发送"""
+            start, chunks = state['start'], state['chunks']
+            state['policy'] = None
+            await send(start)
+            for chunk in chunks:
+                await send(chunk)
+            chunks.clear()
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                policy = getattr(scope.get('endpoint'), _POLICY_ATTR, None)
+                if policy is None or message['status'] != 200 or not self._storable(message['headers']):
+                    await send(message)
+                    return
+                state['start'], state['policy'] = message, policy
+                return
+            if state['policy'] is None:
+                await send(message)
+                return
+            if message['type'] != 'http.response.body':
+                await flush()
+                await send(message)
+                return
+            state['chunks'].append(message)
+            state['size'] += len(message.get('body', b''))
+            if state['size'] > self.max_body:
+                await flush()
+                return
+            if not message.get('more_body', False):
+                body = b''.join(chunk.get('body', b'') for chunk in state['chunks'])
+                start = state['start']
+                entry = self.cache.set(key, state['policy'], state['snapshot'], headers, start['status'],
+                                       list(start['headers']), body, scope.get('route'))
+                state['policy'] = None
+                await self._send(entry, headers, 'GET', send, b'MISS')
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _storable(response_headers) -> bool:
+        for name, value in response_headers:
+            name = name.lower()
+            if name == b'set-cookie':
+                return False
+            if name == b'cache-control' and (b'no-store' in value or b'private' in value):
+                return False
+        return True
@@ -0,0 +1,130 @@
+"""
+快速 JSON 响应。
+
+FastAPI 默认用 jsonable_encoder 把返回值逐层转换为 Python 基本类型，再用标准库 json 序列化，数据量大时占用大量 CPU。
+这里提供：
+
+- FastJSONResponse：安装了 orjson 时使用 orjson 序列化，否则使用标准库 json；pydantic 模型直接调用 model_dump_json。
+- FastJSONRoute：没有响应模型的路由（返回 dict、list 或 pydantic 模型）跳过 jsonable_encoder，
+  返回值直接交给 FastJSONResponse 序列化。有响应模型的路由不变，仍然先按模型校验和过滤，
+  新版 FastAPI 对这类路由已经使用 pydantic 直接序列化为 JSON 字节串。
+
+使用方式：
+
+    app = FastAPI()
+    app.router.route_class = FastJSONRoute
+
+不要把 FastJSONResponse 设为 default_response_class：指定了响应类的路由不再使用 pydantic 的快速路径。
+单个接口也可以直接返回 FastJSONResponse(data)。
+"""
+import asyncio
+import dataclasses
+import datetime
+import decimal
+import enum
+import functools
+import json
+import uuid
+from typing import Any
+
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.routing import APIRoute
+from fastapi.utils import is_body_allowed_for_status_code
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj):
+    """orjson 和 json 不能直接序列化的类型"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode='json')
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8')
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _orjson_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(content: Any) -> bytes:
+        """把内容序列化为 JSON 字节串"""
+        return orjson.dumps(content, default=_default, option=_orjson_options)
+else:
+    def dumps(content: Any) -> bytes:
+        """把内容序列化为 JSON 字节串"""
+        return json.dumps(content, default=_default, ensure_ascii=False, allow_nan=False,
+                          separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json().encode('utf-8')
+        return dumps(content)
+
+
+def _uses_response_param(dependant) -> bool:
+    """路由或其依赖是否注入了 Response 参数（用于设置响应头和状态码）"""
+    if getattr(dependant, 'response_param_name', None) is not None:
+        return True
+    return any(_uses_response_param(sub) for sub in dependant.dependencies)
+
+
+def _returns_json(route: APIRoute) -> bool:
+    """路由的响应类是 JSON，并且状态码允许响应体（204、304 等不允许）"""
+    response_class = route.response_class
+    if isinstance(response_class, DefaultPlaceholder):
+        response_class = response_class.value
+    return response_class in (JSONResponse, FastJSONResponse) and is_body_allowed_for_status_code(route.status_code)
+
+
+def _wrap_endpoint(endpoint, status_code: int):
+    status_code = status_code or 200
+
+    def to_response(result):
+        if isinstance(result, Response):
+            return result
+        return FastJSONResponse(result, status_code=status_code)
+
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            return to_response(await endpoint(*args, **kwargs))
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            return to_response(endpoint(*args, **kwargs))
+    return wrapper
+
+
+class FastJSONRoute(APIRoute):
+    """
+    没有响应模型的路由把返回值直接包装为 FastJSONResponse，不经过 jsonable_encoder。
+    以下路由保持默认行为：
+    - 注入了 Response 参数：FastAPI 需要把该参数上设置的响应头合并到最终的响应中；
+    - 指定了非 JSON 的 response_class（PlainTextResponse、HTMLResponse 等）；
+    - 状态码不允许响应体（例如 status_code=204）。
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, endpoint, **kwargs)
+        if self.response_field is None and _returns_json(self) and not _uses_response_param(self.dependant):
+            # functools.wraps 保留了原函数的签名，FastAPI 按同样的参数重新构造路由
+            super().__init__(path, _wrap_endpoint(endpoint, self.status_code), **kwargs)
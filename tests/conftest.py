@@ -0,0 +1,17 @@
+import os
+import sys
+
+# 配置文件等路径相对于项目根目录，测试在项目根目录下运行
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# loguru 默认的控制台处理器保存了 pytest 捕获输出用的 stderr，退出时线程池等关闭日志会写入已经关闭的文件，
+# 测试中不需要控制台日志，日志仍然写入日志文件
+from loguru import logger  # noqa: E402
+
+logger.remove()
+
+# base 中的模块导入时会 from project import，先导入 project 完成初始化，测试模块可以按任意顺序导入它们
+import project  # noqa: E402,F401
@@ -0,0 +1,42 @@
+import threading
+
+import pytest
+
+from base.bootstrap import Bootstrap
+
+
+def test_run_without_threads_executes_in_calling_thread():
+    bootstrap = Bootstrap("test")
+    order = []
+    bootstrap.add_phase("a", lambda: order.append(("a", threading.current_thread().name)))
+    bootstrap.add_phase("b", lambda: order.append(("b", threading.current_thread().name)), depends=("a",))
+    bootstrap.run(parallel=False)
+    current = threading.current_thread().name
+    assert order == [("a", current), ("b", current)]
+
+
+def test_later_run_executes_only_new_phases_after_their_dependencies():
+    bootstrap = Bootstrap("test", max_workers=2)
+    calls = []
+    bootstrap.add_phase("core", lambda: calls.append("core"))
+    bootstrap.run(parallel=False)
+    bootstrap.add_phase("plugins", lambda: calls.append("plugins"), depends=("core",))
+    bootstrap.add_phase("tool", lambda: calls.append("tool"), depends=("plugins",))
+    bootstrap.run()
+    assert calls == ["core", "plugins", "tool"]
+
+
+def test_later_run_skips_phases_whose_dependency_failed():
+    bootstrap = Bootstrap("test")
+    bootstrap.add_phase("core", lambda: 1 / 0, required=False)
+    bootstrap.run(parallel=False)
+    bootstrap.add_phase("plugins", lambda: None, depends=("core",))
+    bootstrap.run()
+    assert bootstrap.phases["plugins"].status == 'skipped'
+
+
+def test_required_phase_failure_is_raised():
+    bootstrap = Bootstrap("test")
+    bootstrap.add_phase("core", lambda: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        bootstrap.run(parallel=False)
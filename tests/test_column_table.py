@@ -0,0 +1,96 @@
+import pytest
+
+from base.database import column_table
+from base.database.column_table import ColumnTable
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy':
+        if column_table.np is None:
+            pytest.skip("NumPy 没有安装")
+    else:
+        monkeypatch.setattr(column_table, 'np', None)
+    return request.param
+
+
+@pytest.fixture
+def table(tmp_path, backend):
+    table = ColumnTable(str(tmp_path / 'cpu.columns'), {'ts': 'float64', 'value': 'float32', 'core': 'int16'},
+                        key='ts')
+    table.extend((float(t), t / 10, t % 4) for t in range(10))
+    yield table
+    table.close()
+
+
+def test_append_and_extend(table):
+    table.append({'ts': 10.0, 'value': 1.0, 'core': 2})
+    table.extend([(11.0, 1.5, 3), {'ts': 11.0, 'value': 0.25, 'core': 0}])
+    assert len(table) == 13
+    assert table.row(-1) == {'ts': 11.0, 'value': 0.25, 'core': 0}
+    assert table.rows(10, 12) == [{'ts': 10.0, 'value': 1.0, 'core': 2}, {'ts': 11.0, 'value': 1.5, 'core': 3}]
+    assert list(table.column('core', 0, 4)) == [0, 1, 2, 3]
+
+
+def test_extend_rejects_non_monotonic_keys(table):
+    with pytest.raises(ValueError):
+        table.append((5.0, 0.0, 0))
+    with pytest.raises(ValueError):
+        table.extend([(20.0, 0.0, 0), (19.0, 0.0, 0)])
+    with pytest.raises(ValueError):
+        table.append({'ts': 30.0, 'value': 0.0})
+    assert len(table) == 10
+
+
+def test_key_range(table):
+    assert table.key_range(2.5, 5) == (3, 5)
+    assert table.key_range(None, 3) == (0, 3)
+    assert table.key_range(8) == (8, 10)
+    assert table.key_range(20, 30) == (10, 10)
+    assert table.key_range(5, 2) == (5, 5)
+    assert list(table.between(3, 5, columns=['core'])['core']) == [3, 0]
+
+
+def test_filter(table):
+    assert [int(i) for i in table.filter('core', '==', 1)] == [1, 5, 9]
+    assert [int(i) for i in table.filter('value', '>=', 0.75, low=5)] == [8, 9]
+    assert [int(i) for i in table.filter('core', '!=', 0, 3, 6)] == [3, 5]
+
+
+def test_aggregate(table):
+    assert table.aggregate('core', 'sum') == 13
+    assert table.aggregate('ts', 'mean', low=2, high=6) == 3.5
+    assert table.aggregate('core', 'max', 0, 3) == 2
+    assert table.aggregate('ts', 'min', low=4) == 4.0
+    assert table.aggregate('value', 'count', low=3, high=7) == 4
+    assert table.aggregate('value', 'sum', low=20) == 0
+    assert table.aggregate('value', 'mean', low=20) is None
+    with pytest.raises(ValueError):
+        table.aggregate('value', 'median')
+
+
+def test_reopen_existing_table(tmp_path, backend):
+    path = str(tmp_path / 'cpu.columns')
+    table = ColumnTable(path, [('ts', 'float64'), ('value', 'int32')], key='ts')
+    # 超过最小的文件大小，列文件需要扩展
+    table.extend((float(i), i) for i in range(2000))
+    table.close()
+    reopened = ColumnTable(path)
+    assert len(reopened) == 2000
+    assert reopened.key == 'ts'
+    assert reopened.columns == {'ts': 'float64', 'value': 'int32'}
+    assert reopened.aggregate('value', 'sum') == sum(range(2000))
+    reopened.append((2000.0, 1))
+    with pytest.raises(ValueError):
+        reopened.append((1.0, 1))
+    reopened.close()
+    with pytest.raises(ValueError):
+        ColumnTable(path, {'ts': 'float64'}, key='ts')
+    assert len(ColumnTable(path)) == 2001
+
+
+def test_missing_table_needs_columns(tmp_path):
+    with pytest.raises(ValueError):
+        ColumnTable(str(tmp_path / 'missing.columns'))
+    with pytest.raises(ValueError):
+        ColumnTable(str(tmp_path / 'bad.columns'), {'ts': 'float128'})
@@ -0,0 +1,17 @@
+from base.event import EventManager, emit_seconds
+
+
+def handler(*args, **kwargs):
+    return args
+
+
+def test_emit_seconds_is_labeled_by_first_path_segment():
+    ev = EventManager()
+    ev.register("table/users/insert", handler)
+    before = emit_seconds.snapshot("table")[0]
+    for name in ("users", "orders", "logs"):
+        ev.emit(f"table/{name}/insert", 1)
+    assert ev.emit_and_collect_results("table/users/insert", 1) == [(1,)]
+    assert emit_seconds.snapshot("table")[0] == before + 4
+    assert emit_seconds.snapshot("table/users/insert") == (0, 0.0)
+    assert all('/' not in labels[0] for labels in emit_seconds._values)
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import Counter
+
+from base.logger import AsyncFileSink
+
+
+def test_records_logged_after_stop_are_written(tmp_path):
+    sink = AsyncFileSink(tmp_path / 'app.log')
+    sink("before\n")
+    sink.stop()
+    sink("after\n")
+    assert (tmp_path / 'app.log').read_text().splitlines() == ["before", "after"]
+
+
+def test_stop_with_full_drop_oldest_queue_keeps_every_record(tmp_path):
+    sink = AsyncFileSink(tmp_path / 'app.log', queue_size=1, overflow_policy='drop_oldest')
+    # 写入线程取走第一条日志后等待写入锁，第二条日志占满队列
+    sink._write_lock.acquire()
+    sink("a\n")
+    while not sink._queue.empty():
+        pass
+    sink("b\n")
+    stopper = threading.Thread(target=sink.stop)
+    stopper.start()
+    while not sink._stopping:
+        pass
+    writer = threading.Thread(target=sink, args=("c\n",))
+    writer.start()
+    sink._write_lock.release()
+    stopper.join(5)
+    writer.join(5)
+    assert not stopper.is_alive()
+    assert sorted((tmp_path / 'app.log').read_text().splitlines()) == ["a", "b", "c"]
+
+
+def test_sink_without_rotation_keeps_one_file(tmp_path):
+    sink = AsyncFileSink(tmp_path / 'app.log', rotation=None)
+    for _ in range(100):
+        sink("x" * 100 + "\n")
+    sink.stop()
+    assert [path.name for path in tmp_path.iterdir()] == ['app.log']
+
+
+def test_set_log_level_does_not_duplicate_records(monkeypatch):
+    from base import logger as logger_module
+    level = logger_module.log_level
+    marker = f"switch-test-{time.time_ns()}-"
+    tokens = []
+    add_handlers = logger_module._add_handlers
+
+    def add_handlers_and_log(*args):
+        # 新旧两组处理器同时存在时记录日志
+        ids = add_handlers(*args)
+        tokens.append(f"{marker}{len(tokens)}")
+        logger_module.logger.critical(tokens[-1])
+        return ids
+
+    monkeypatch.setattr(logger_module, '_add_handlers', add_handlers_and_log)
+    logger_module.set_log_level('DEBUG')
+    logger_module.set_log_level(level)
+    with open(logger_module.log_file_path, encoding='utf-8') as f:
+        counts = Counter(line.rstrip('\n').rsplit(' - ', 1)[-1] for line in f if marker in line)
+    assert counts == Counter(tokens)
+
+
+def test_log_decorator_follows_level_changes(monkeypatch):
+    from base import logger as logger_module
+    records = []
+    handler_id = logger_module.loguru_logger.add(lambda message: records.append(message.record['message']),
+                                                 level='DEBUG')
+    level = logger_module.log_level
+    try:
+        logger_module.set_log_level('WARNING')
+
+        @logger_module.log_decorator('DEBUG')
+        def add(a, b):
+            return a + b
+
+        assert add(1, 2) == 3
+        assert records == []
+        logger_module.set_log_level('DEBUG')
+        assert add(3, 4) == 7
+        assert records == ["Calling add with args: 3, 4"]
+    finally:
+        logger_module.loguru_logger.remove(handler_id)
+        logger_module.set_log_level(level)
+
+
+def test_writer_survives_a_failed_write(tmp_path, capsys):
+    sink = AsyncFileSink(tmp_path / 'app.log', queue_size=2)
+    write_batch = sink._write_batch
+    failures = []
+
+    def fail_once(batch, flush=True):
+        if not failures:
+            failures.append(batch)
+            raise OSError("disk full")
+        write_batch(batch, flush)
+
+    sink._write_batch = fail_once
+    sink("lost\n")
+    while not failures:
+        time.sleep(0.01)
+    for i in range(10):
+        sink(f"{i}\n")
+    sink.stop()
+    assert (tmp_path / 'app.log').read_text().splitlines() == [str(i) for i in range(10)]
+    assert "disk full" in capsys.readouterr().err
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from base.object_manager import ObjectManager
+
+
+def make_manager():
+    om = ObjectManager()
+    om.store("int/var", "variable")
+    om.store("user_num", 42)
+    om.store("int/num", 10)
+    om.store("intx", 1.5)
+    om.store("int/list", [1])
+    return om
+
+
+def test_search_by_prefix_keeps_insertion_order():
+    om = make_manager()
+    assert om.search("int/") == ("variable", 10, [1])
+    assert om.search("int") == ("variable", 10, 1.5, [1])
+    assert om.search("") == ("variable", 42, 10, 1.5, [1])
+    assert om.search("missing") == ()
+
+
+def test_search_follows_changes():
+    om = make_manager()
+    assert om.search("int/") == ("variable", 10, [1])
+    # 修改已有的键保持原来的位置
+    om.update("int/var", 20)
+    assert om.search("int/") == (20, 10, [1])
+    om.delete("int/num")
+    om.store("int/a", "a")
+    assert om.search("int/") == (20, [1], "a")
+
+
+def test_get_by_type_keeps_insertion_order():
+    om = make_manager()
+    assert om.get_by_type(int) == (42, 10)
+    assert om.get_by_type((int, float)) == (42, 10, 1.5)
+    assert om.get_by_type(Sequence) == ("variable", [1])
+    om.update("int/var", 20)
+    assert om.get_by_type(int) == (20, 42, 10)
+    assert om.get_by_type(str) == ()
+    om.store("bool", True)
+    assert om.get_by_type(int) == (20, 42, 10, True)
+
+
+def test_factory_is_constructed_lazily():
+    om = ObjectManager()
+    calls = []
+    om.store("config", {"url": "sqlite://"})
+    om.register_factory("engine", lambda config: calls.append(config) or "engine", deps=("config",))
+    om.register_factory("session", lambda engine: f"session({engine})", deps=("engine",))
+    assert calls == []
+    assert om.search("") == ({"url": "sqlite://"},)
+    assert om.get("session") == "session(engine)"
+    assert om.get("engine") == "engine"
+    assert calls == [{"url": "sqlite://"}]
+    assert om.get_by_type(str) == ("engine", "session(engine)")
+
+
+def test_factory_runs_once_under_concurrency():
+    om = ObjectManager()
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def slow_engine():
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    om.register_factory("engine", slow_engine)
+    om.register_factory("a", lambda engine: ("a", engine), deps=("engine",))
+    om.register_factory("b", lambda engine, a: ("b", engine), deps=("engine", "a"))
+    results = []
+
+    def worker(key):
+        barrier.wait()
+        results.append(om.get(key)[1])
+
+    threads = [threading.Thread(target=worker, args=("ab"[i % 2],)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1
+    assert len(results) == 8 and all(engine is om.get("engine") for engine in results)
+
+
+def test_parallel_prewarm_of_dependent_factories():
+    om = ObjectManager()
+    om.register_factory("a", lambda: time.sleep(0.02) or "a")
+    om.register_factory("b", lambda a: a + "b", deps=("a",))
+    om.register_factory("c", lambda a, b: a + b + "c", deps=("a", "b"))
+    with ThreadPoolExecutor(3) as pool:
+        assert om.prewarm(["c", "b", "a"], pool) == {}
+    assert om.search("") == ("a", "ab", "aabc")
+
+
+def test_circular_dependency_is_rejected_at_registration():
+    om = ObjectManager()
+    om.register_factory("a", lambda b: b, deps=("b",))
+    om.register_factory("b", lambda c: c, deps=("c",))
+    with pytest.raises(RuntimeError, match="c -> a -> b -> c"):
+        om.register_factory("c", lambda a: a, deps=("a",))
+    with pytest.raises(RuntimeError):
+        om.register_factory("d", lambda d: d, deps=("d",))
+    assert "c" not in om._factories and "d" not in om._factories
+    # 替换工厂后不再构成循环
+    om.register_factory("c", lambda: "c")
+    assert om.get("a") == "c"
+
+
+def test_undeclared_circular_dependency_raises():
+    om = ObjectManager()
+    om.register_factory("a", lambda: om.get("b"))
+    om.register_factory("b", lambda: om.get("a"))
+    with pytest.raises(RuntimeError, match="a -> b -> a"):
+        om.get("a")
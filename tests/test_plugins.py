@@ -0,0 +1,56 @@
+import asyncio
+import gc
+
+from base import plugins as plugins_module
+from base.plugins import LazyPlugin, PluginManifest
+
+SPACE = '''
+import asyncio
+from base.plugins import PluginInfo, Plugin
+
+plugin_info = PluginInfo(name="{name}", version="0.0.1", info={{}})
+plugin = Plugin(plugin_info)
+events = []
+
+
+@plugin.on_startup
+async def startup():
+    await asyncio.sleep(0.05)
+    events.append("started")
+'''
+
+
+def make_lazy_plugin(tmp_path, name):
+    path = tmp_path / name
+    path.mkdir()
+    (path / 'space.py').write_text(SPACE.format(name=name))
+    return LazyPlugin(PluginManifest(name, str(path), version="0.0.1", lazy=True))
+
+
+def test_aload_waits_for_startup_inside_the_loop(tmp_path, monkeypatch):
+    lazy = make_lazy_plugin(tmp_path, "lazy_plugin_aload")
+
+    async def main():
+        monkeypatch.setattr(plugins_module, '_loop', asyncio.get_running_loop())
+        plugin = await lazy.aload()
+        return plugin.started
+
+    assert asyncio.run(main()) is True
+
+
+def test_lifecycle_task_is_kept_until_done(tmp_path, monkeypatch):
+    lazy = make_lazy_plugin(tmp_path, "lazy_plugin_task")
+
+    async def main():
+        monkeypatch.setattr(plugins_module, '_loop', asyncio.get_running_loop())
+        plugin = lazy.load()
+        # load() 在事件循环线程中只创建启动任务，任务由模块保持引用，垃圾回收后仍然会完成
+        assert not plugin.started
+        assert lazy._startup in plugins_module._lifecycle_tasks
+        lazy._startup = None
+        gc.collect()
+        while plugins_module._lifecycle_tasks:
+            await asyncio.sleep(0.01)
+        return plugin.started
+
+    assert asyncio.run(main()) is True
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, event, insert, select, update
+from sqlalchemy.orm import Session
+
+from base.cache import SingletonLRUCache
+from base.database.sql.query_cache import QueryCache
+
+metadata = MetaData()
+users = Table("users", metadata, Column("id", Integer, primary_key=True), Column("name", String))
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(users), [{"id": 1, "name": "alice"}])
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def cache(engine):
+    cache = QueryCache(cache=SingletonLRUCache(100), ttl=60, enabled=True)
+    cache.attach(engine)
+    return cache
+
+
+def names(cache, session):
+    return [row.name for row in cache.all(session, select(users.c.name).order_by(users.c.id))]
+
+
+def test_read_write_commit_read(engine, cache):
+    with Session(engine) as session:
+        assert names(cache, session) == ["alice"]
+        assert names(cache, session) == ["alice"]
+        assert cache.cache.stats()['hits'] == 1
+        session.execute(insert(users).values(id=2, name="bob"))
+        # 会话中有未提交的写入，不使用缓存
+        assert names(cache, session) == ["alice", "bob"]
+        session.commit()
+    with Session(engine) as session:
+        assert names(cache, session) == ["alice", "bob"]
+
+
+def test_read_during_commit_is_not_served_after_commit(engine, cache):
+    """提交过程中（commit 事件之后、数据库提交之前）的读查询缓存的旧数据在提交完成后不再命中"""
+    reads = []
+
+    def read_before_commit(conn):
+        with Session(engine) as reader:
+            reads.append(names(cache, reader))
+
+    event.listen(engine, "commit", read_before_commit)
+    with Session(engine) as session:
+        session.execute(update(users).where(users.c.id == 1).values(name="carol"))
+        session.commit()
+    event.remove(engine, "commit", read_before_commit)
+    assert reads == [["alice"]]
+    with Session(engine) as session:
+        assert names(cache, session) == ["carol"]
+
+
+def test_rollback_does_not_invalidate(engine, cache):
+    with Session(engine) as session:
+        names(cache, session)
+        session.execute(insert(users).values(id=3, name="dave"))
+        session.rollback()
+    with Session(engine) as session:
+        assert names(cache, session) == ["alice"]
+    assert cache.cache.stats()['hits'] == 1
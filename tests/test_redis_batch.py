@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from base.database.redis_db.batch import RedisBatcher, mget, mset, redis_batch
+from base.database.redis_db.fake_redis import FakeRedis
+
+
+@pytest.fixture
+def client():
+    return FakeRedis()
+
+
+def test_window_merges_commands_from_many_threads(client):
+    batcher = RedisBatcher(client, window=0.05)
+    threads = 16
+    barrier = threading.Barrier(threads)
+    results = [None] * threads
+
+    def worker(i):
+        barrier.wait()
+        results[i] = batcher.set(f"k{i}", i).result(timeout=5)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    batcher.close()
+    assert results == [True] * threads
+    assert client.round_trips < threads
+    assert [client.get(f"k{i}") for i in range(threads)] == [str(i).encode() for i in range(threads)]
+
+
+def test_max_commands_splits_pipelines(client):
+    batcher = RedisBatcher(client, window=0.05, max_commands=10)
+    futures = [batcher.incr("counter") for _ in range(25)]
+    assert [f.result(timeout=5) for f in futures] == list(range(1, 26))
+    batcher.close()
+    assert client.round_trips == 3
+
+
+def test_futures_get_their_own_results_and_errors(client):
+    client.set("text", "abc")
+    batcher = RedisBatcher(client, window=0.05)
+    ok = batcher.set("a", 1)
+    bad = batcher.incr("text")
+    value = batcher.get("a")
+    assert ok.result(timeout=5) is True
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+    assert value.result(timeout=5) == b"1"
+    batcher.close()
+
+
+def test_unknown_command_raises_immediately(client):
+    batcher = RedisBatcher(client)
+    with pytest.raises(AttributeError):
+        batcher.no_such_command("a")
+
+
+def test_redis_batch_sends_on_block_exit(client):
+    batcher = RedisBatcher(client)
+    with redis_batch(batcher) as batch:
+        batch.set("a", 1)
+        a = batch.get("a")
+        counter = batch.incr("counter")
+        assert client.round_trips == 0
+        assert not a.done()
+    assert client.round_trips == 1
+    assert a.result() == b"1"
+    assert counter.result() == 1
+
+
+def test_redis_batch_cancels_commands_on_error(client):
+    batcher = RedisBatcher(client)
+    with pytest.raises(RuntimeError):
+        with redis_batch(batcher) as batch:
+            future = batch.set("a", 1)
+            raise RuntimeError
+    assert future.cancelled()
+    assert client.round_trips == 0
+    assert client.get("a") is None
+
+
+def test_mget_mset_chunks_preserve_order(client):
+    mapping = {f"m{i}": i for i in range(1050)}
+    assert mset(client, mapping, chunk_size=100) == 1050
+    keys = [f"m{i}" for i in reversed(range(1050))] + ["missing"]
+    values = mget(client, keys, chunk_size=100)
+    assert values == [str(i).encode() for i in reversed(range(1050))] + [None]
+    assert client.round_trips == 2
+
+
+def test_mset_with_expiry(client):
+    mset(client, {"a": 1, "b": 2}, chunk_size=1, ex=60)
+    assert client.ttl("a") == 60
+    assert mget(client, ["b", "a"], chunk_size=1) == [b"2", b"1"]
@@ -0,0 +1,55 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from base.cache import get_singleton_cache
+from serve.response_cache import ResponseCache, ResponseCacheMiddleware, cache_response
+
+
+def make_client():
+    cache = ResponseCache()
+    app = FastAPI()
+    app.add_middleware(ResponseCacheMiddleware, cache=cache)
+    calls = []
+
+    @app.get("/cached")
+    @cache_response(ttl=60)
+    async def cached():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    @app.get("/plain")
+    async def plain():
+        return {"plain": True}
+
+    return TestClient(app), cache, calls
+
+
+def test_cached_route_is_served_from_cache():
+    client, cache, calls = make_client()
+    assert client.get("/cached").headers['x-cache'] == 'MISS'
+    response = client.get("/cached")
+    assert response.headers['x-cache'] == 'HIT'
+    assert response.json() == {"n": 1}
+    assert len(calls) == 1
+    assert cache.cache.stats()['hits'] == 1
+
+
+def test_paths_without_cached_entries_are_not_looked_up():
+    client, cache, _ = make_client()
+    for _ in range(10):
+        assert client.get("/missing").status_code == 404
+        assert 'x-cache' not in client.get("/plain").headers
+    assert cache.cache.stats()['hits'] == 0
+    assert cache.cache.stats()['misses'] == 0
+    assert cache.cache.stats()['size'] == 0
+
+
+def test_responses_do_not_use_the_shared_cache():
+    client, cache, _ = make_client()
+    shared = get_singleton_cache()
+    before = shared.stats()
+    client.get("/cached")
+    client.get("/cached")
+    client.get("/missing")
+    assert cache.cache is not shared
+    assert shared.stats() == before
@@ -0,0 +1,61 @@
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from fastapi.testclient import TestClient
+
+from serve.responses import FastJSONRoute
+
+
+def make_client():
+    app = FastAPI()
+    app.router.route_class = FastJSONRoute
+
+    @app.get("/json")
+    async def json_endpoint():
+        return {"a": 1}
+
+    @app.get("/text", response_class=PlainTextResponse)
+    async def text():
+        return "hello"
+
+    @app.get("/html", response_class=HTMLResponse)
+    def html():
+        return "<p>hello</p>"
+
+    @app.delete("/item", status_code=204)
+    async def delete_item():
+        return None
+
+    @app.post("/created", status_code=201)
+    async def created():
+        return {"id": 1}
+
+    return TestClient(app)
+
+
+def test_json_route_is_wrapped():
+    response = make_client().get("/json")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.json() == {"a": 1}
+
+
+def test_status_code_is_kept():
+    response = make_client().post("/created")
+    assert response.status_code == 201
+    assert response.json() == {"id": 1}
+
+
+def test_response_class_is_respected():
+    client = make_client()
+    text = client.get("/text")
+    assert text.headers["content-type"].startswith("text/plain")
+    assert text.text == "hello"
+    html = client.get("/html")
+    assert html.headers["content-type"].startswith("text/html")
+    assert html.text == "<p>hello</p>"
+
+
+def test_no_body_for_204():
+    response = make_client().delete("/item")
+    assert response.status_code == 204
+    assert response.content == b""
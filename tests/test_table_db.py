@@ -0,0 +1,128 @@
+import pickle
+
+import pytest
+
+import project
+from base.event import EventManager
+
+from base.database import table_db
+from base.database.table_db import TableDB, TableExpirer
+
+
+@pytest.fixture
+def expirer(monkeypatch):
+    # 不自动运行的 expirer，由测试调用 run_once
+    expirer = TableExpirer(interval=3600, batch=4)
+    monkeypatch.setattr(table_db, 'expirer', expirer)
+    yield expirer
+    expirer._stop.set()
+
+
+@pytest.fixture
+def db(tmp_path, expirer):
+    return TableDB(str(tmp_path / 'sessions.pkl'))
+
+
+def count_saves(db, monkeypatch):
+    saves = []
+    save_data = db._save_data
+
+    def counting_save(*args):
+        saves.append(args)
+        save_data(*args)
+
+    monkeypatch.setattr(db, '_save_data', counting_save)
+    return saves
+
+
+def test_get_and_ttl_after_expiry(db, tmp_path):
+    db.insert('live', 1, ttl=3600)
+    db.insert('dead', 2, ttl=0)
+    db.insert('plain', 3)
+    assert db.get('dead') is None
+    assert db.ttl('dead') is None
+    assert db.get('live') == 1
+    assert 3590 < db.ttl('live') <= 3600
+    assert db.ttl('plain') is None
+    db.flush()
+    reopened = TableDB(str(tmp_path / 'sessions.pkl'))
+    assert reopened.items() == [('live', 1), ('plain', 3)]
+
+
+def test_background_batches_save_once(db, expirer, monkeypatch):
+    for i in range(10):
+        db.insert(f"k{i}", i, ttl=0)
+    db.insert('live', 'x', ttl=3600)
+    saves = count_saves(db, monkeypatch)
+    assert expirer.run_once() == 4
+    assert len(saves) == 1
+    assert expirer.run_once() == 4
+    assert expirer.run_once() == 2
+    assert expirer.run_once() == 0
+    assert len(saves) == 3
+    assert db.data == {'live': 'x'}
+    assert saves == [('expire',)] * 3
+
+
+def test_persist_seconds_has_a_fixed_label_set(tmp_path, expirer):
+    for name in ("users", "orders"):
+        db = TableDB(str(tmp_path / f"{name}.pkl"))
+        db.insert('a', 1, ttl=0)
+        db.expire_due()
+    assert set(table_db.persist_seconds._values) <= {('write',), ('expire',)}
+
+
+def test_iterators_drop_expired_keys(db, monkeypatch):
+    for i in range(10):
+        db.insert(f"k{i}", i, ttl=0)
+    db.insert('live', 'x', ttl=3600)
+    db.insert('plain', 'y')
+    saves = count_saves(db, monkeypatch)
+    assert db.keys() == ['live', 'plain']
+    # 每次最多删除 expirer.batch 个过期键，其余的只是跳过，删除留给下一次写入文件
+    assert len(db.data) == 12 - 4
+    assert db.values() == ['x', 'y']
+    assert db.items() == [('live', 'x'), ('plain', 'y')]
+    assert sorted(db.data) == ['live', 'plain']
+    assert saves == []
+
+
+def test_events_are_emitted_after_persisting(db, monkeypatch):
+    ev = EventManager()
+    monkeypatch.setattr(project, 'ev', ev)
+    seen = []
+
+    def on_change(changes):
+        # 事件处理器中读取文件，修改已经写入
+        with open(db.filename, 'rb') as file:
+            stored = pickle.load(file)
+        seen.append(('table', [(c.op, c.key) for c in changes], dict(stored)))
+
+    def on_insert(changes):
+        with open(db.filename, 'rb') as file:
+            stored = pickle.load(file)
+        seen.append(('insert', [c.key for c in changes], dict(stored)))
+
+    ev.register("table/sessions", on_change)
+    ev.register("table/sessions/insert", on_insert)
+    db.insert('a', 1)
+    db.update('a', 2)
+    assert seen == [('insert', ['a'], {'a': 1}), ('table', [('insert', 'a')], {'a': 1}),
+                    ('table', [('update', 'a')], {'a': 2})]
+    assert [(c.seq, c.op, c.old, c.new) for c in db.changes_since(0)] == [(1, 'insert', None, 1), (2, 'update', 1, 2)]
+
+
+def test_changes_since_after_the_log_dropped_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(table_db, 'change_log_size', 3)
+    db = TableDB(str(tmp_path / 'small.pkl'))
+    for i in range(5):
+        db.insert(f"k{i}", i)
+    assert db.sequence == 5
+    # 只保留序号 3 到 5 的修改
+    assert [c.key for c in db.changes_since(2)] == ['k2', 'k3', 'k4']
+    assert [c.seq for c in db.changes_since(3)] == [4, 5]
+    assert db.changes_since(5) == []
+    with pytest.raises(ValueError):
+        db.changes_since(1)
+    with pytest.raises(ValueError):
+        db.changes_since(0)
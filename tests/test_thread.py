@@ -0,0 +1,176 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from base import thread as thread_module
+from base.thread import AdaptiveThreadPoolExecutor, tp
+
+
+def test_fixed_size_pool_has_no_tuner_until_bounds_widen():
+    executor = AdaptiveThreadPoolExecutor(2, 2)
+    try:
+        assert executor._tuner is None
+        assert [f.result(timeout=5) for f in [executor.submit(pow, 2, i) for i in range(5)]] == [1, 2, 4, 8, 16]
+        assert executor.stats()['workers'] <= 2
+        executor.set_bounds(2, 4)
+        assert executor._tuner is not None and executor._tuner.is_alive()
+        assert executor.stats()['max_workers'] == 4
+    finally:
+        executor.shutdown()
+
+
+def test_reconfigure_changes_fixed_pool_size(monkeypatch):
+    original = tp.stats()['max_workers']
+    executor = tp._executor
+    monkeypatch.setattr(thread_module, 'auto_tune', False)
+    monkeypatch.setattr(thread_module, 'pool_size', original + 3)
+    tp.reconfigure()
+    try:
+        assert tp._executor is executor
+        stats = tp.stats()
+        assert stats['max_workers'] == original + 3
+        assert stats['workers'] == stats['active'] + stats['idle']
+    finally:
+        monkeypatch.setattr(thread_module, 'pool_size', original)
+        tp.reconfigure()
+    assert tp.stats()['max_workers'] == original
+
+
+def test_invalid_config_change_does_not_stop_other_handlers(monkeypatch):
+    from base.event import EventManager
+    monkeypatch.setattr(thread_module, 'auto_tune', True)
+    monkeypatch.setattr(thread_module, 'auto_tune_min_workers', 4)
+    monkeypatch.setattr(thread_module, 'auto_tune_max_workers', 8)
+    executor = tp._executor
+    bounds = (executor._min_workers, executor._max_workers)
+    ev = EventManager()
+    seen = []
+
+    def later_handler(changes):
+        seen.append(changes)
+
+    ev.register("config/changed", thread_module.on_config_changed)
+    ev.register("config/changed", later_handler)
+    # 只修改了最多线程数，小于当前的最少线程数
+    changes = {('thread', 'auto_tune_max_workers'): (8, 2)}
+    ev.emit("config/changed", changes)
+    assert seen == [changes]
+    assert thread_module.auto_tune_max_workers == 8
+    assert (executor._min_workers, executor._max_workers) == bounds
+
+    def fail():
+        raise ValueError("bad bounds")
+
+    monkeypatch.setattr(tp, 'reconfigure', fail)
+    ev.emit("config/changed", {('thread', 'auto_tune_max_workers'): (8, 6)})
+    assert len(seen) == 2
+
+
+def test_pool_runs_tasks_from_many_threads():
+    results = []
+    lock = threading.Lock()
+
+    def task(i):
+        with lock:
+            results.append(i)
+
+    futures = [tp.submit_task(task, i) for i in range(100)]
+    for future in futures:
+        future.result(timeout=5)
+    assert sorted(results) == list(range(100))
+
+
+def make_tuner(target=4, min_workers=1, max_workers=8):
+    """调节线程不会自动运行的执行器，_tune 由测试直接调用"""
+    executor = AdaptiveThreadPoolExecutor(min_workers, max_workers, interval=3600)
+    executor._tuner_stop.set()
+    executor._target = target
+    executor._threads = {object() for _ in range(target)}
+    return executor
+
+
+def test_tune_keeps_workers_busy_with_long_tasks():
+    executor = make_tuner()
+    now = time.perf_counter()
+    executor._period_start = now - 1
+    # 所有线程执行的任务都开始于多个周期之前，本周期内没有任务完成
+    executor._running = {thread: now - 10 for thread in executor._threads}
+    executor._tune()
+    assert executor._target == 4
+
+
+def test_tune_shrinks_idle_pool():
+    executor = make_tuner()
+    executor._period_start = time.perf_counter() - 1
+    executor._busy_total = 0.2
+    executor._tune()
+    assert executor._target == 3
+
+
+def test_tune_grows_when_tasks_are_queued():
+    executor = make_tuner()
+    executor._period_start = time.perf_counter() - 1
+    executor._queued = 2
+    executor._completed = 100
+    executor._tune()
+    assert executor._target == 5
+
+
+def test_tune_backs_off_when_growing_lowers_throughput():
+    executor = make_tuner()
+    executor._period_start = time.perf_counter() - 1
+    executor._queued = 2
+    executor._completed = 100
+    executor._tune()
+    assert executor._target == 5
+    executor._threads.add(object())
+    executor._period_start = time.perf_counter() - 1
+    executor._completed = 50
+    executor._tune()
+    assert executor._target == 4
+
+
+def test_tune_respects_bounds():
+    executor = make_tuner(target=8)
+    executor._period_start = time.perf_counter() - 1
+    executor._queued = 5
+    executor._tune()
+    assert executor._target == 8
+
+
+def test_map_keeps_input_order_and_reads_input_lazily():
+    consumed = []
+
+    def numbers():
+        for i in range(100):
+            consumed.append(i)
+            yield i
+
+    results = tp.map(lambda x: x * x, numbers(), chunksize=3, max_in_flight=2)
+    assert next(results) == 0
+    # 两个任务块在线程池中，取走一个结果后再补充一个
+    assert len(consumed) <= 9
+    assert list(results) == [i * i for i in range(1, 100)]
+
+
+def test_map_unordered_returns_every_result():
+    assert sorted(tp.map(lambda x: x + 1, range(50), ordered=False)) == list(range(1, 51))
+
+
+def test_map_raises_task_errors():
+    def fail_on_three(x):
+        if x == 3:
+            raise ValueError(x)
+        return x
+
+    with pytest.raises(ValueError):
+        list(tp.map(fail_on_three, range(10)))
+
+
+def test_amap_keeps_input_order():
+    async def collect():
+        return [result async for result in tp.amap(lambda x: x * 2, range(20), chunksize=4)]
+
+    assert asyncio.run(collect()) == [i * 2 for i in range(20)]